@@ -0,0 +1,389 @@
+"""
+Activity management, putting entities far away from the player to sleep.
+
+Each round, the tilemap runs the autoruns and 'move()' of every entity,
+even the ones far away from the player, where nothing they do matters.
+With big tilemaps, this is most of the work done each round.
+
+An activity manager decides which entities are relevant each round.
+Entities are awake if they are close to a focus entity(usually the player),
+inside the view(plus a margin), or were recently woken up by an event.
+Everything else sleeps, and is skipped by the tilemap until it wakes up.
+
+Managers are optional, and are attached to a tilemap by setting 'BaseTileMap.activity'.
+Batched systems that move entities themselves(see 'RandomWalkers') ask 'is_awake()',
+so they skip the same entities the tilemap does.
+
+Sleeping is too coarse for some things, such as wanderers that should keep moving off screen.
+A detail manager instead updates far away regions less often,
+and lets entities catch up on the rounds they missed when their region is updated.
+
+We currently have the following:
+
+    > ActivityManager - Decides which entities are awake each round
+    > DetailManager - Updates far away regions less often, instead of putting them to sleep
+"""
+
+import numpy as np
+
+from engine.characters.input import Player
+
+
+class ActivityManager(object):
+
+    """
+    ActivityManager - Decides which entities are awake each round.
+
+    An entity is awake if any of the following are true:
+
+        - It is a focus entity
+        - It is within 'radius' of a focus entity(chebyshev distance)
+        - It is inside the view, grown by 'margin' on each side
+        - It was woken up in the last 'linger' rounds, by being close to a focus entity or by an event
+
+    Lingering keeps entities that just left the radius going for a while,
+    so trackers don't freeze the moment they fall behind.
+
+    Events wake entities up explicitly, either one at a time with 'wake()',
+    or everything around a position(such as a noise) with 'wake_around()'.
+    """
+
+    def __init__(self, radius=20, view=None, margin=5, linger=10, focus=Player):
+
+        """
+        :param radius: Distance from a focus entity where entities are awake
+        :type radius: int
+        :param view: Area of the tilemap on screen, as (x, y, width, height). None if there is no view
+        :type view: tuple, None
+        :param margin: Number of positions the view is grown by on each side
+        :type margin: int
+        :param linger: Number of rounds entities stay awake after being woken up
+        :type linger: int
+        :param focus: Type of the entities everything revolves around
+        :type focus: type
+        """
+
+        self.radius = radius  # Distance from a focus entity where entities are awake
+        self.view = view  # Area of the tilemap on screen, as (x, y, width, height)
+        self.margin = margin  # Number of positions the view is grown by on each side
+        self.linger = linger  # Number of rounds entities stay awake after being woken up
+        self.focus = focus  # Type of the entities everything revolves around
+
+        self.tick = 0  # Number of rounds we have filtered
+        self.awake = 0  # Number of entities awake last round
+        self.sleeping = 0  # Number of entities asleep last round
+
+        self._until = {}  # Round each woken up entity stays awake until, keyed by ID
+        self._noises = []  # Events waking up everything around a position, as (x, y, radius)
+        self._focus = []  # Positions of the focus entities this round
+        self._kept = set()  # IDs of the entities updated this round
+
+    def wake(self, entity, rounds=None):
+
+        """
+        Wakes up an entity.
+
+        :param entity: Entity to wake up
+        :type entity: EntityCharacter
+        :param rounds: Number of rounds to stay awake for, defaults to 'linger'
+        :type rounds: int, None
+        """
+
+        until = self.tick + (self.linger if rounds is None else rounds)
+
+        self._until[id(entity)] = max(self._until.get(id(entity), 0), until)
+
+    def wake_around(self, x, y, radius):
+
+        """
+        Wakes up every entity around a position next round.
+
+        :param x: X cordnet
+        :type x: int
+        :param y: Y cordnet
+        :type y: int
+        :param radius: Distance from the position to wake entities up in
+        :type radius: int
+        """
+
+        self._noises.append((x, y, radius))
+
+    def is_awake(self, entity):
+
+        """
+        Determines if an entity is updated this round.
+
+        Only valid after 'filter()' has been called for the round.
+
+        :param entity: Entity to check
+        :type entity: EntityCharacter
+        :return: True if the entity was kept by the last 'filter()'
+        :rtype: bool
+        """
+
+        return id(entity) in self._kept
+
+    def filter(self, cords):
+
+        """
+        Picks out the entities that are awake this round.
+
+        Invoked by the tilemap each round with the Tiles of every entity.
+        Dead entities are always kept, so the tilemap can clean them up.
+
+        :param cords: List of Tiles holding entities
+        :type cords: list
+        :return: List of Tiles holding entities that are awake, in the same order
+        :rtype: list
+        """
+
+        self.tick += 1
+
+        if not cords:
+
+            self._kept = set()
+
+            return cords
+
+        xs = np.array([tile.x for tile in cords])
+        ys = np.array([tile.y for tile in cords])
+
+        keep = self._select(cords, xs, ys)
+
+        final = []
+
+        for num, tile in enumerate(cords):
+
+            if keep[num] or not tile.obj.is_alive:
+
+                final.append(tile)
+
+        self._kept = {id(tile.obj) for tile in final}
+
+        self.awake = len(final)
+        self.sleeping = len(cords) - len(final)
+
+        if len(self._until) > 2 * len(cords):
+
+            # Forget about entities that have been asleep for a while:
+
+            self._until = {key: value for key, value in self._until.items() if value >= self.tick}
+
+        return final
+
+    def _select(self, cords, xs, ys):
+
+        """
+        Determines which entities are awake this round.
+
+        :param cords: List of Tiles holding entities
+        :type cords: list
+        :param xs: X cordnet of each entity
+        :type xs: np.ndarray
+        :param ys: Y cordnet of each entity
+        :type ys: np.ndarray
+        :return: Boolean array, True for each entity that is awake
+        :rtype: np.ndarray
+        """
+
+        close = np.zeros(len(cords), dtype=bool)
+
+        # Wake up everything around our focus entities:
+
+        self._focus = [(tile.x, tile.y) for tile in cords if isinstance(tile.obj, self.focus)]
+
+        for x, y in self._focus:
+
+            close |= np.maximum(np.abs(xs - x), np.abs(ys - y)) <= self.radius
+
+        # Wake up everything around our events:
+
+        for x, y, radius in self._noises:
+
+            close |= np.maximum(np.abs(xs - x), np.abs(ys - y)) <= radius
+
+        self._noises.clear()
+
+        awake = close.copy()
+
+        if self.view is not None:
+
+            x, y, width, height = self.view
+
+            awake |= ((xs >= x - self.margin) & (xs < x + width + self.margin)
+                      & (ys >= y - self.margin) & (ys < y + height + self.margin))
+
+        # Entities that are close stay awake for a while after they leave:
+
+        until = self.tick + self.linger
+
+        for num in np.flatnonzero(close).tolist():
+
+            self._until[id(cords[num].obj)] = until
+
+        for num, tile in enumerate(cords):
+
+            if not awake[num] and self._until.get(id(tile.obj), 0) >= self.tick:
+
+                awake[num] = True
+
+        return awake
+
+
+class DetailManager(ActivityManager):
+
+    """
+    DetailManager - Updates far away regions less often, instead of putting them to sleep.
+
+    Entities that the activity manager would keep awake are updated every round.
+    Everything else is grouped into square regions of 'size' positions,
+    and each region is updated at the rate of the first tier it falls into.
+    Tiers are (distance, every) pairs, sorted by distance:
+    regions within 'distance' of a focus entity are updated every 'every' rounds.
+    Regions past the last tier use the rate of the last tier.
+
+    Regions in the same tier are spread out over the rounds,
+    so we don't update all of them at once every few rounds.
+
+    When an entity is updated after being skipped,
+    we first call its 'catch_up()' method with the number of rounds it missed,
+    so it can jump to where it would have likely ended up(see 'scatter()').
+    This also happens when a region becomes active again as the player approaches.
+    Catching up waits until every entity has been picked, so they are all picked from where they were,
+    and we keep the tiles of the entities that jumped pointing at where they ended up.
+    Random walkers only move on the rounds they are updated,
+    so the rounds they catch up on are never walked twice.
+    """
+
+    def __init__(self, radius=20, view=None, margin=5, linger=10, focus=Player, tiers=((60, 4), (120, 16)), size=16):
+
+        """
+        :param tiers: List of (distance, every) pairs, sorted by distance
+        :type tiers: tuple
+        :param size: Width and height of each region
+        :type size: int
+        """
+
+        super().__init__(radius=radius, view=view, margin=margin, linger=linger, focus=focus)
+
+        self.tiers = tiers  # Update rate of regions by distance, as (distance, every) pairs
+        self.size = size  # Width and height of each region
+
+        self.caught = 0  # Number of entities that caught up last round
+
+        self._last = {}  # Round each entity was last updated, keyed by ID
+        self._missed = {}  # Rounds each entity picked this round has to catch up on, keyed by ID
+
+    def filter(self, cords):
+
+        """
+        Picks out the entities that are updated this round, and lets the skipped ones catch up.
+
+        Catching up moves entities, so we watch the tilemap while they do,
+        and move the tiles of any entity that moved along with it.
+
+        :param cords: List of Tiles holding entities
+        :type cords: list
+        :return: List of Tiles holding entities that are updated, in the same order
+        :rtype: list
+        """
+
+        self._missed = {}
+
+        final = super().filter(cords)
+
+        self.caught = 0
+
+        if not self._missed:
+
+            return final
+
+        tilemap = cords[0].obj.tilemap
+        moved = {}
+
+        def track(obj, x, y, delta):
+
+            # Moves are a removal followed by an addition, entities that were only removed are left alone:
+
+            moved[id(obj)] = (x, y) if delta > 0 else None
+
+        tilemap.watch_mutations(track)
+
+        try:
+
+            for tile in final:
+
+                missed = self._missed.get(id(tile.obj))
+
+                if missed is not None and tile.obj.is_alive:
+
+                    tile.obj.catch_up(missed)
+
+                    self.caught += 1
+
+        finally:
+
+            tilemap.unwatch(track)
+
+        for tile in cords:
+
+            pos = moved.get(id(tile.obj))
+
+            if pos is not None:
+
+                tile.relocate(pos[0], pos[1], tilemap.tilemap[pos[1]][pos[0]])
+
+        return final
+
+    def _select(self, cords, xs, ys):
+
+        """
+        Determines which entities are updated this round, and which of them have rounds to catch up on.
+        """
+
+        awake = super()._select(cords, xs, ys)
+
+        # Work out the distance from each region to the closest focus entity:
+
+        rx = xs // self.size
+        ry = ys // self.size
+
+        distance = np.full(len(cords), np.iinfo(np.int64).max, dtype=np.int64)
+
+        for x, y in self._focus:
+
+            dx = np.maximum(np.maximum(rx * self.size - x, x - (rx * self.size + self.size - 1)), 0)
+            dy = np.maximum(np.maximum(ry * self.size - y, y - (ry * self.size + self.size - 1)), 0)
+
+            distance = np.minimum(distance, np.maximum(dx, dy))
+
+        # Find the rate of each region:
+
+        every = np.full(len(cords), self.tiers[-1][1], dtype=np.int64)
+
+        for limit, rate in reversed(self.tiers):
+
+            every[distance <= limit] = rate
+
+        # Spread regions out over the rounds, and pick the ones that are due:
+
+        phase = (rx * 7 + ry * 13) % every
+
+        due = awake | ((self.tick + phase) % every == 0)
+
+        for num in np.flatnonzero(due).tolist():
+
+            entity = cords[num].obj
+            missed = self.tick - self._last.get(id(entity), self.tick - 1) - 1
+
+            self._last[id(entity)] = self.tick
+
+            if missed > 0:
+
+                self._missed[id(entity)] = missed
+
+        if len(self._last) > 2 * len(cords):
+
+            self._last = {key: value for key, value in self._last.items() if self.tick - value <= self.tiers[-1][1]}
+
+        return due
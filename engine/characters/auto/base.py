@@ -56,6 +56,34 @@ class BaseAutoRun(object):
 
         raise NotImplementedError("Should be overridden in child class!")
 
+    def catch_up(self, rounds):
+
+        """
+        Function invoked when our character was skipped for a number of rounds.
+
+        This happens when the character is in a region that is updated less often.
+        Instead of running all of the missed rounds,
+        autoruns can approximate where they would have ended up.
+        By default, we do nothing.
+
+        :param rounds: Number of rounds we missed
+        :type rounds: int
+        """
+
+        pass
+
+    def release(self):
+
+        """
+        Function invoked when our character is removed from the tilemap.
+
+        Autoruns holding onto anything on the tilemap(such as planners watching it)
+        should let go of it here, so it doesn't stay around forever.
+        By default, we do nothing.
+        """
+
+        pass
+
 
 class AutoRunHandler:
 
@@ -84,6 +112,14 @@ class AutoRunHandler:
         self._runs = []  # List of autoruns attached to the Handler
         self.char = char  # Instance of the character we are bound to
 
+    def __len__(self):
+
+        return len(self._runs)
+
+    def __getitem__(self, index):
+
+        return self._runs[index]
+
     def _get_priority(self, run):
 
         """
@@ -143,3 +179,26 @@ class AutoRunHandler:
 
             run.run()
 
+    def catch_up(self, rounds):
+
+        """
+        Lets each autorun catch up on the rounds it missed.
+
+        :param rounds: Number of rounds we missed
+        :type rounds: int
+        """
+
+        for run in self._runs:
+
+            run.catch_up(rounds)
+
+    def release(self):
+
+        """
+        Lets each autorun let go of what it holds on the tilemap.
+        """
+
+        for run in self._runs:
+
+            run.release()
+
@@ -4,21 +4,38 @@ This file will contain built in autoruns managing entity movement.
 We currently have the following:
 
     > RandomMove - Randomly moves the entity to a position around it
+    > TrackerMove - Moves the entity towards a target
+    > DesireMove - Moves the entity downhill on a shared desire map(fleeing, mixing goals)
 """
 
 import random
 
 from engine.characters.auto.base import BaseAutoRun
+from engine.characters.auto.walkers import scatter
+from engine.pathfinding.desire import DesireMaps
+from engine.pathfinding.dstar import DStarLite
+from engine.pathfinding.smoothing import LineOfSight, smooth
 
 
 class RandomMove(BaseAutoRun):
 
     """
     RandomMove - Randomly moves the character to a position around it.
+
+    If the tilemap has a batched random walk system,
+    we simply join it, and it moves us along with every other walker.
     """
 
     def run(self):
-        
+
+        if self.char.tilemap.walkers is not None:
+
+            # Let the batched walkers move us:
+
+            self.char.tilemap.walkers.add(self.char)
+
+            return
+
         # Find ourselves:
 
         entity = self.char.tilemap.find_object(self.char)
@@ -35,17 +52,48 @@ class RandomMove(BaseAutoRun):
 
         self.char.tilemap.move(self.char, choice[0].x, choice[0].y)
 
+    def catch_up(self, rounds):
+
+        """
+        Jumps to where our random walk would likely have ended up.
+        """
+
+        scatter(self.char, rounds)
+
 
 class TrackerMove(BaseAutoRun):
 
     """
     Move towards a target
+
+    By default we flood the tilemap each round to find our way.
+    If 'incremental' is enabled, we instead keep a D* Lite planner around,
+    and only repair it as we and our target move.
+
+    Otherwise, if the tilemap has a pathfinding service,
+    we submit our requests to it and follow the last path we got back.
+
+    If the tilemap has a reservation table, it takes precedence over both.
+    We plan cooperatively with the other trackers, so we queue up instead of bumping into each other.
+
+    If 'smooth' is enabled, paths we get back from the service are pulled tight,
+    so we walk in straight lines instead of zig-zagging.
+    Paths on tilemaps with move costs are left alone, as a straight line may cross expensive terrain.
+
+    Either way, we don't search at all if the target can't be reached.
+    Our planner watches the tilemap, so it is closed once we stop using it,
+    or when our character is removed(see 'release()').
     """
 
-    def __init__(self, target) -> None:
+    def __init__(self, target, incremental=False, smooth=False) -> None:
         super().__init__()
 
         self.target = target  # Target of the pathfinding, WILL BE A CHARACTER!
+        self.incremental = incremental  # Determines if we use the incremental planner
+        self.smooth = smooth  # Determines if we smooth the paths we get back from the service
+        self.planner = None  # Incremental planner, created on our first run
+        self.ticket = None  # Ticket of our latest request to the pathfinding service
+        self.path = []  # Path we are currently following
 
     def find_quickest_path(self, targObj, blocked=False):
 
@@ -1193,8 +1241,206 @@ class TrackerMove(BaseAutoRun):
 
         return surroundingTiles
 
+    def release(self):
+
+        """
+        Lets go of our planner and reservations.
+
+        Invoked when our character is removed from the tilemap, or has nothing to track.
+        """
+
+        self._close_planner()
+
+        if self.char is not None and self.char.tilemap is not None and self.char.tilemap.reservations is not None:
+
+            self.char.tilemap.reservations.release(self)
+
+    def _close_planner(self):
+
+        """
+        Closes our planner, so it stops watching the tilemap.
+
+        A new one is created if we run incrementally again.
+        """
+
+        if self.planner is not None:
+
+            self.planner.close()
+
+            self.planner = None
+
+    def run_incremental(self, start, goal):
+
+        """
+        Moves one step towards the target using our incremental planner.
+
+        The planner is created the first time we run,
+        and is simply told where we and our target are each round after that.
+
+        :param start: Our position
+        :type start: tuple
+        :param goal: Position of our target
+        :type goal: tuple
+        """
+
+        tilemap = self.char.tilemap
+
+        if self.planner is None:
+
+            self.planner = DStarLite(tilemap, start, goal)
+
+        else:
+
+            self.planner.move_start(start)
+            self.planner.move_goal(goal)
+
+        step = self.planner.next_step()
+
+        if step is not None and step != goal and self.char.check_tile(*step):
+
+            tilemap.move(self.char, *step)
+
+    def run_cooperative(self, start, goal):
+
+        """
+        Moves one step towards the target using the reservation table of the tilemap.
+
+        Our route avoids the positions other trackers have claimed,
+        and we may wait in place for a round if someone is in our way.
+
+        :param start: Our position
+        :type start: tuple
+        :param goal: Position of our target
+        :type goal: tuple
+        """
+
+        tilemap = self.char.tilemap
+
+        route = tilemap.reservations.plan(self, start, goal, self.char.check_tile)
+
+        if route and route[0] != start:
+
+            tilemap.move(self.char, *route[0])
+
+    def run_service(self, start, goal):
+
+        """
+        Moves one step towards the target using the pathfinding service.
+
+        We keep following our current path while a request is in flight,
+        and submit a new request once our last one comes back.
+        If we run out of path before then, we follow the partial path of the request instead.
+
+        :param start: Our position
+        :type start: tuple
+        :param goal: Position of our target
+        :type goal: tuple
+        """
+
+        tilemap = self.char.tilemap
+
+        if self.ticket is not None and self.ticket.done:
+
+            # Our request came back, start following it:
+
+            self.path = list(self.ticket.path)
+
+            if self.smooth and self.path and tilemap.cost_grid() is None:
+
+                # Pull the path tight from where we are now, not where we asked from:
+
+                if start in self.path:
+
+                    del self.path[:self.path.index(start) + 1]
+
+                if tilemap.sight is None:
+
+                    tilemap.sight = LineOfSight(tilemap)
+
+                self.path = smooth(self.path, start, tilemap.sight)
+
+            self.ticket = None
+
+        elif self.ticket is not None and not self.path and self.ticket.partial:
+
+            # Still searching, head towards the best position found so far:
+
+            self.path = list(self.ticket.partial)
+
+        if self.ticket is None:
+
+            self.ticket = tilemap.paths.submit(start, goal)
+
+        # Skip any positions we have already passed:
+
+        if start in self.path:
+
+            del self.path[:self.path.index(start) + 1]
+
+        if not self.path:
+
+            return
+
+        step = self.path[0]
+
+        if step != goal and max(abs(step[0] - start[0]), abs(step[1] - start[1])) == 1 and self.char.check_tile(*step):
+
+            tilemap.move(self.char, *step)
+
+            del self.path[0]
+
     def run(self):
 
+        tilemap = self.char.tilemap
+
+        selfTile = tilemap.find_object(self.char)
+        targTile = tilemap.find_object_type(self.target)
+
+        if selfTile is None or targTile is None:
+
+            # Nothing to track:
+
+            self.release()
+
+            return
+
+        start = (selfTile.x, selfTile.y)
+        goal = (targTile.x, targTile.y)
+
+        if not tilemap.reachable(start, goal):
+
+            # Target is walled off, don't bother searching:
+
+            if tilemap.reservations is not None:
+
+                tilemap.reservations.release(self)
+
+            return
+
+        if tilemap.reservations is not None or not self.incremental:
+
+            # We won't be using our planner, stop it from watching the tilemap:
+
+            self._close_planner()
+
+        if tilemap.reservations is not None:
+
+            self.run_cooperative(start, goal)
+
+            return
+
+        if self.incremental:
+
+            self.run_incremental(start, goal)
+
+            return
+
+        if tilemap.paths is not None:
+
+            self.run_service(start, goal)
+
+            return
+
         if self.char.debug_move:
 
             selfTile = self.tilemap.find_object(self)
@@ -1339,3 +1585,58 @@ class TrackerMove(BaseAutoRun):
                     else:
 
                         dictCopy.remove(smallestNum)
+
+
+class DesireMove(BaseAutoRun):
+
+    """
+    DesireMove - Moves the entity downhill on a shared desire map.
+
+    We are given terms, which are (type, weight) pairs(see 'DesireMaps').
+    Positive weights pull us towards objects of that type, negative weights push us away.
+    For example, 'DesireMove([(Player, -1.2)])' flees the player.
+
+    Desire maps are built once each round by the tilemap,
+    and shared by every DesireMove using the same terms,
+    so fleeing never needs a search for each entity.
+    If the tilemap has no desire maps yet, we attach them.
+    """
+
+    def __init__(self, terms) -> None:
+        super().__init__()
+
+        self.terms = tuple(terms)  # Terms of the desire map we follow
+
+    def run(self):
+
+        tilemap = self.char.tilemap
+
+        if tilemap.desires is None:
+
+            tilemap.desires = DesireMaps(tilemap)
+
+        selfTile = tilemap.find_object(self.char)
+
+        if selfTile is None:
+
+            return
+
+        values = tilemap.desires.get(self.terms)
+
+        # Find the most desirable position around us that we can move to:
+
+        best = None
+        lowest = values[selfTile.y][selfTile.x]
+
+        for y in range(max(selfTile.y - 1, 0), min(selfTile.y + 2, tilemap.height)):
+
+            for x in range(max(selfTile.x - 1, 0), min(selfTile.x + 2, tilemap.width)):
+
+                if values[y][x] < lowest and self.char.check_tile(x, y):
+
+                    best = (x, y)
+                    lowest = values[y][x]
+
+        if best is not None:
+
+            tilemap.move(self.char, *best)
@@ -0,0 +1,323 @@
+"""
+Batched random walking for crowds of entities.
+
+Moving a random walker one at a time means finding it on the tilemap,
+gathering the tiles around it, and choosing one, all in python.
+With thousands of ambient wanderers, this dominates each round.
+
+Instead, walkers register with a RandomWalkers system attached to the tilemap.
+We keep every walker's position in arrays,
+draw every direction at once with NumPy, mask them against the passability grid,
+and then commit the moves in one pass.
+
+The system is attached to a tilemap by setting 'BaseTileMap.walkers'.
+The tilemap steps it at the start of each round,
+and the RandomMove autorun(along with NPCs) join it automatically when it is present.
+
+We currently have the following:
+
+    > RandomWalkers - Moves every registered walker at once
+    > scatter - Moves an entity to where a random walk would likely end up
+"""
+
+import math
+import random
+
+import numpy as np
+
+# Offsets of the positions around a position, as X and Y arrays:
+
+DX = np.array([-1, 0, 1, -1, 1, -1, 0, 1])
+DY = np.array([-1, -1, -1, 0, 0, 1, 1, 1])
+
+STEP_VARIANCE = 0.75  # Variance along each axis of one random step(6 of the 8 steps move along it)
+
+
+def scatter(entity, rounds, chance=1.0):
+
+    """
+    Moves an entity to where a random walk would likely end up after a number of rounds.
+
+    Used to catch up entities that were skipped for a while.
+    After many steps, a random walk spreads out like a normal distribution,
+    so we draw the offset along each axis from one instead of taking each step.
+    If the position we draw is blocked or can't be reached, we try again closer by,
+    and stay put if nothing works out.
+
+    :param entity: Entity to move
+    :type entity: EntityCharacter
+    :param rounds: Number of rounds the entity missed
+    :type rounds: int
+    :param chance: Chance of the entity moving each round
+    :type chance: float
+    """
+
+    tilemap = entity.tilemap
+    tile = tilemap.find_object(entity) if rounds > 0 else None
+
+    if tile is None:
+
+        return
+
+    spread = math.sqrt(rounds * chance * STEP_VARIANCE)
+
+    for _ in range(4):
+
+        x = tile.x + max(-rounds, min(rounds, round(random.gauss(0, spread))))
+        y = tile.y + max(-rounds, min(rounds, round(random.gauss(0, spread))))
+
+        if (x, y) != (tile.x, tile.y) and entity.check_tile(x, y) and tilemap.reachable((tile.x, tile.y), (x, y)):
+
+            tilemap.move(entity, x, y, src=(tile.x, tile.y))
+
+            return
+
+        spread /= 2
+
+
+class RandomWalkers(object):
+
+    """
+    RandomWalkers - Moves every registered walker at once.
+
+    Each round, every walker rolls against its chance to move,
+    and then picks a random free position around it.
+    If the tilemap has an activity manager, only the walkers it updates this round move,
+    the rest stay put like every other sleeping entity(see 'ActivityManager.is_awake()').
+    A position is free if it is passable, and no walker is standing there.
+    If several walkers pick the same position, one of them(chosen at random) gets it.
+
+    Other entities(such as the player) are not tracked by us,
+    so each move is checked with 'check_tile()' before it is committed.
+    """
+
+    def __init__(self, tilemap, seed=None):
+
+        """
+        :param tilemap: Tilemap our walkers are on
+        :type tilemap: BaseTileMap
+        :param seed: Seed for our random generator, None for a random seed
+        :type seed: int, None
+        """
+
+        self.tilemap = tilemap  # Tilemap our walkers are on
+        self.rng = np.random.default_rng(seed)  # Random generator used for all of our draws
+
+        self.walkers = []  # Entities that are walking
+        self.xs = np.zeros(0, dtype=np.int64)  # X cordnet of each walker
+        self.ys = np.zeros(0, dtype=np.int64)  # Y cordnet of each walker
+        self.chances = np.zeros(0)  # Chance of each walker moving each round
+
+        self.moved = 0  # Number of walkers moved last round
+
+        self._index = {}  # Index of each walker in our arrays, keyed by ID
+
+    def __len__(self):
+
+        return len(self.walkers)
+
+    def add(self, entity, chance=1.0):
+
+        """
+        Registers a walker.
+
+        Registering a walker twice does nothing,
+        so autoruns can simply call this each time they run.
+
+        :param entity: Entity to walk around
+        :type entity: EntityCharacter
+        :param chance: Chance of the entity moving each round, between 0 and 1
+        :type chance: float
+        """
+
+        if id(entity) in self._index:
+
+            return
+
+        tile = self.tilemap.find_object(entity)
+
+        if tile is None:
+
+            return
+
+        self._index[id(entity)] = len(self.walkers)
+        self.walkers.append(entity)
+
+        self.xs = np.append(self.xs, tile.x)
+        self.ys = np.append(self.ys, tile.y)
+        self.chances = np.append(self.chances, chance)
+
+    def remove(self, entity):
+
+        """
+        Stops walking an entity.
+
+        :param entity: Entity to stop walking
+        :type entity: EntityCharacter
+        """
+
+        self._drop([self._index[id(entity)]] if id(entity) in self._index else [])
+
+    def update(self):
+
+        """
+        Moves every walker at once.
+
+        Method invoked by the tilemap at the start of each round,
+        after its activity manager has picked out the entities that are awake.
+        """
+
+        self.moved = 0
+
+        self._sync()
+
+        count = len(self.walkers)
+
+        if not count:
+
+            return
+
+        height = self.tilemap.height
+        width = self.tilemap.width
+
+        # Positions that are passable, and not taken by a walker:
+
+        free = self.tilemap.passability().copy()
+        free[self.ys, self.xs] = False
+
+        # Work out which moves are allowed for each walker:
+
+        near_x = self.xs[:, None] + DX
+        near_y = self.ys[:, None] + DY
+
+        allowed = (near_x >= 0) & (near_x < width) & (near_y >= 0) & (near_y < height)
+        allowed[allowed] = free[near_y[allowed], near_x[allowed]]
+
+        moving = self.rng.random(count) < self.chances
+
+        if self.tilemap.activity is not None:
+
+            # Walkers that are asleep stay put:
+
+            moving &= np.array([self.tilemap.activity.is_awake(entity) for entity in self.walkers], dtype=bool)
+
+        allowed &= moving[:, None]
+
+        # Pick a random allowed move for each walker:
+
+        pick = np.argmax(self.rng.random((count, 8)) * allowed, axis=1)
+        movers = np.flatnonzero(allowed.any(axis=1))
+
+        if movers.size == 0:
+
+            return
+
+        target_x = near_x[movers, pick[movers]]
+        target_y = near_y[movers, pick[movers]]
+
+        # Only one walker gets each position, shuffle so it is a random one:
+
+        order = self.rng.permutation(movers.size)
+        _, first = np.unique((target_y * width + target_x)[order], return_index=True)
+        keep = order[first]
+
+        # Commit the moves:
+
+        for num, x, y in zip(movers[keep].tolist(), target_x[keep].tolist(), target_y[keep].tolist()):
+
+            entity = self.walkers[num]
+
+            if not entity.check_tile(x, y):
+
+                # Someone we don't track is standing there:
+
+                continue
+
+            self.tilemap.move(entity, x, y, src=(int(self.xs[num]), int(self.ys[num])))
+
+            self.xs[num] = x
+            self.ys[num] = y
+            self.moved += 1
+
+    def refresh(self, tiles):
+
+        """
+        Brings the positions of the given tiles up to date with where our walkers are.
+
+        The tilemap finds its entities at the start of each round, before we move anyone,
+        so the tiles of walkers we moved are out of date.
+        We fix them in place, so the tilemap(and its perception service) can keep using them
+        instead of searching the tilemap again.
+
+        :param tiles: Tiles found on the tilemap at the start of the round
+        :type tiles: list
+        """
+
+        for tile in tiles:
+
+            num = self._index.get(id(tile.obj))
+
+            if num is None:
+
+                continue
+
+            x = int(self.xs[num])
+            y = int(self.ys[num])
+
+            if (tile.x, tile.y) != (x, y):
+
+                tile.relocate(x, y, self.tilemap.tilemap[y][x])
+
+    def _sync(self):
+
+        """
+        Makes sure our walkers are still where we think they are.
+
+        Walkers may have been moved by something else, removed, or killed since last round.
+        Checking the list at one position is cheap,
+        so we only search the tilemap for walkers that are not where we left them.
+        """
+
+        gone = []
+
+        for num, entity in enumerate(self.walkers):
+
+            x = int(self.xs[num])
+            y = int(self.ys[num])
+
+            if entity.is_alive and any(obj is entity for obj in self.tilemap.tilemap[y][x]):
+
+                continue
+
+            tile = self.tilemap.find_object(entity) if entity.is_alive else None
+
+            if tile is None:
+
+                gone.append(num)
+
+                continue
+
+            self.xs[num] = tile.x
+            self.ys[num] = tile.y
+
+        self._drop(gone)
+
+    def _drop(self, indices):
+
+        """
+        Removes the walkers at the given indices from our arrays.
+        """
+
+        if not indices:
+
+            return
+
+        keep = np.ones(len(self.walkers), dtype=bool)
+        keep[indices] = False
+
+        self.walkers = [entity for num, entity in enumerate(self.walkers) if keep[num]]
+        self.xs = self.xs[keep]
+        self.ys = self.ys[keep]
+        self.chances = self.chances[keep]
+
+        self._index = {id(entity): num for num, entity in enumerate(self.walkers)}
@@ -53,6 +53,9 @@ class BaseCharacter(object):
         self.priority = 20  # Value determining object stacking priority
         self.can_move = False  # Determines if this character can move
         self.move_priority = 20  # Determines order of movement
+        self.move_cost = 0  # Extra cost for entities moving onto our position, used by the pathfinders
+        self.blocks_sight = False  # Determines if we block line of sight, used by the vision system
+        self.light = 0  # Radius we light up around us, 0 if we don't give off light
 
         self.is_alive = True  # Determines if this object is alive
 
@@ -111,6 +114,17 @@ class BaseCharacter(object):
 
         pass
 
+    def release(self):
+
+        """
+        Method called when we are removed from the tilemap.
+
+        Characters holding onto anything on the tilemap(such as watchers or reservations)
+        should let go of it here. By default, we do nothing.
+        """
+
+        pass
+
     def get_input(self, block=True, timeout=None, return_ascii=False):
 
         """
@@ -198,6 +212,30 @@ class EntityCharacter(BaseCharacter):
 
         self.auto.run()
 
+    def catch_up(self, rounds):
+
+        """
+        Method called when we were skipped for a number of rounds,
+        and are about to be updated again.
+
+        By default, we let our autoruns catch up.
+
+        :param rounds: Number of rounds we missed
+        :type rounds: int
+        """
+
+        self.auto.catch_up(rounds)
+
+    def release(self):
+
+        """
+        Method called when we are removed from the tilemap.
+
+        By default, we let our autoruns let go of what they hold.
+        """
+
+        self.auto.release()
+
     def move(self):
 
         """
@@ -15,6 +15,7 @@ import random
 from engine.characters.base import EntityCharacter
 from engine.characters.items import *
 from engine.characters.tiles import *
+from engine.vision.fov import field_of_view
 
 logging
 
@@ -41,7 +42,7 @@ class Player(EntityCharacter):
         self.hp = 100
         self.active_weapon = None
 
-        self.radius = 3
+        self.radius = 3  # Distance we can see, see 'look()'
 
         self.keys = ['w', 'a', 's', 'd', 'q', 'e', 'z', 'c', 'p', 'i', 'l', 'o', 'y', ",", "."]
 
@@ -118,3 +119,22 @@ class Player(EntityCharacter):
 
             if self.check_tile(playerTile.x + 1, playerTile.y + 1):
                 self.tilemap.move(self, playerTile.x + 1, playerTile.y + 1)
+
+    def look(self):
+
+        """
+        Gets the positions we can see from where we are standing, out to our radius.
+
+        If the tilemap has a field of view cache, we look through it.
+
+        :return: 2D boolean array(height, width), True where the position is visible
+        :rtype: np.ndarray
+        """
+
+        tile = self.tilemap.find_object(self)
+
+        if self.tilemap.vision is not None:
+
+            return self.tilemap.vision.get(tile.x, tile.y, self.radius)
+
+        return field_of_view(self.tilemap, tile.x, tile.y, self.radius)
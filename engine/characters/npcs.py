@@ -9,6 +9,8 @@ of all types.
 
 import random
 
+from engine.characters.auto.move import RandomMove
+from engine.characters.auto.walkers import scatter
 from engine.characters.base import EntityCharacter
 from engine.characters.input import Player
 
@@ -26,8 +28,17 @@ class NPC(EntityCharacter):
 
         """
         Moves across the screen randomly.
+
+        If the tilemap has a batched random walk system,
+        we join it instead, and it moves us one in four rounds.
         """
 
+        if self.tilemap.walkers is not None:
+
+            self.tilemap.walkers.add(self, chance=0.25)
+
+            return
+
         shouldMove = random.choice([True, False, False, False])
 
         if shouldMove:
@@ -55,6 +66,21 @@ class NPC(EntityCharacter):
 
                 self.tilemap.move(self, choice[0], choice[1])
 
+    def catch_up(self, rounds):
+
+        """
+        Jumps to where our wandering would likely have ended up.
+
+        If a 'RandomMove' autorun is attached, it catches up on the wandering itself,
+        so we leave it at that instead of scattering twice.
+        """
+
+        super().catch_up(rounds)
+
+        if not any(isinstance(run, RandomMove) for run in self.auto):
+
+            scatter(self, rounds, chance=0.25)
+
 
 class Traveler(NPC):
 
@@ -32,7 +32,7 @@ from engine.characters.items import *
 class Wall(BaseCharacter):
     
     """
-    Represents a wall. Player can't move past it.
+    Represents a wall. Player can't move or see past it.
     """
 
     def start(self):
@@ -45,6 +45,10 @@ class Wall(BaseCharacter):
 
         self.can_traverse = False
 
+        # Walls can't be seen through:
+
+        self.blocks_sight = True
+
 
 class Chest(BaseCharacter):
 
@@ -91,8 +95,50 @@ class Floor(BaseCharacter):
         self.attrib.append(random.choice(["gray_blue_one", "gray_blue_two"]))
 
 
+class Mud(BaseCharacter):
+
+    """
+    Represents mud. Player can move over it, but it is slow going.
+    """
+
+    def start(self):
+
+        self.char = '~'
+        self.name = 'Mud'
+        self.attrib.append("brown")
+
+        # Wading through costs extra, so pathfinders go around if they can:
+
+        self.move_cost = 3
+
+
+class Torch(BaseCharacter):
+
+    """
+    Represents a torch. Lights up the area around it.
+    """
+
+    def start(self):
+
+        self.char = 'i'
+        self.name = 'Torch'
+        self.attrib.append("orange")
+        self.priority = 19
+
+        # Lighting up the area around us:
+
+        self.light = 6
+
+
 class Fog(BaseCharacter):
 
+    """
+    Legacy fog object, used by the archived 'look()' in dump.py.
+
+    Adding and clearing these means mutating every hidden position,
+    use 'FogOfWar' from engine/vision/fog.py instead.
+    """
+
     def start(self):
 
         self.char = ' '
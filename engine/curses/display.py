@@ -14,13 +14,14 @@ so they should be used with MasterWindow to prevent any conflicts.
 import curses
 import threading
 
+import numpy as np
+
 from queue import Queue
 from math import ceil
 
-from engine.curses.base import BaseWindow
+from engine.curses.base import BaseWindow, Color
 from engine.tilemaps import BaseTileMap
-from engine.characters.tiles import Fog
-
+from engine.vision.lighting import DARK
 
 
 class DisplayWindow(BaseWindow):
@@ -48,28 +49,346 @@ class DisplayWindow(BaseWindow):
 
         self.thread = None  # Treading instance of the input loop
 
+        self.drawn = 0  # Number of positions drawn to the screen last frame
+        self.composed = 0  # Number of positions composed into the back buffer last frame
+        self.writes = 0  # Number of strings written to the screen last frame
+
+        self._dirty = set()  # Positions that changed since the last frame, as (x, y)
+        self._full = True  # Determines if we compose everything next frame
+        self._watching = None  # Tilemap we are receiving mutations from
+        self._mask = None  # Fog of war mask we last composed with
+        self._bright = None  # Brightness grid we last composed with
+        self._dark = None  # Positions that were too dark last frame
+
+        self._front = None  # Glyphs and attribute IDs on the screen, as a pair of arrays
+        self._back = None  # Glyphs and attribute IDs of the frame being composed, as a pair of arrays
+        self._attribs = [((), False)]  # Attributes and dim flag of each attribute ID
+        self._attrib_ids = {((), False): 0}  # Attribute ID of each set of attributes and dim flag
+
+    def mark_dirty(self, x, y):
+
+        """
+        Marks a position to be composed again next frame.
+
+        Adding, removing and moving objects is noticed automatically,
+        but changing how an object looks(such as its char) is not, so call this afterwards.
+
+        :param x: X cordnet
+        :type x: int
+        :param y: Y cordnet
+        :type y: int
+        """
+
+        self._dirty.add((x, y))
+
+    def redraw(self):
+
+        """
+        Composes and draws everything next frame, even if it is already on the screen.
+        """
+
+        self._full = True
+        self._front = None
+
+    def _mutated(self, obj, x, y, delta):
+
+        """
+        Marks positions dirty as the tilemap changes.
+        """
+
+        self._dirty.add((x, y))
+
     def _render(self):
 
         """
         Renders the tilemap content based on the display area of camera to our screen.
+
+        We render in two steps:
+
+            1. Compose the frame into the back buffer, a pair of arrays holding the glyph and attributes of each position
+            2. Compare the back buffer with the front buffer(what is on the screen), and draw only what differs
+
+        Composing only looks at positions that changed since the last frame.
+        The tilemap tells us about every object added or removed(see 'BaseTileMap.watch_mutations()'),
+        and we compare the fog of war and light map with what we last composed with.
+        Comparing the buffers is done in bulk with NumPy,
+        so positions that changed and changed back, or a full recompose(see 'redraw()'),
+        only draw what is actually different on the screen.
+        If nothing changed, we don't draw or refresh anything at all.
+
+        We only draw the top(most relevant) object at each position.
+        If the tilemap has fog of war, positions hidden by it are left blank,
+        unless the tilemap remembers them, in which case we draw what it remembers dimmed.
+        If the tilemap has a light map, positions too dark to see clearly are also dimmed.
+        """
+
+        if self._watching is not self.tilemap:
+
+            # New tilemap, start listening to it:
+
+            if self._watching is not None:
+
+                self._watching.unwatch(self._mutated)
+
+            self.tilemap.watch_mutations(self._mutated)
+
+            self._watching = self.tilemap
+            self._full = True
+
+        shape = (self.tilemap.height, self.tilemap.width)
+
+        if self._back is None or self._back[0].shape != shape:
+
+            # Tilemap changed size, start over with a blank screen:
+
+            self._back = (np.full(shape, ' ', dtype='<U1'), np.zeros(shape, dtype=np.int32))
+            self._front = (np.full(shape, ' ', dtype='<U1'), np.zeros(shape, dtype=np.int32))
+            self._full = True
+
+            self.clear()
+
+        if self._front is None:
+
+            # Nothing we know of is on the screen, so every position differs:
+
+            self._front = (np.full(shape, '', dtype='<U1'), np.full(shape, -1, dtype=np.int32))
+
+        mask = None if self.tilemap.fog is None else self.tilemap.fog.mask()
+
+        if mask is not self._mask:
+
+            # Fog moved, compose what came into and went out of view:
+
+            if mask is None or self._mask is None:
+
+                self._full = True
+
+            else:
+
+                self._changed(mask != self._mask)
+
+            self._mask = mask
+
+        bright = None if self.tilemap.lights is None else self.tilemap.lights.brightness()
+
+        if bright is not self._bright:
+
+            # Lights changed, compose what got brighter or darker:
+
+            dark = None if bright is None else bright < DARK
+
+            if dark is None or self._dark is None:
+
+                self._full = True
+
+            else:
+
+                self._changed(dark != self._dark)
+
+            self._bright = bright
+            self._dark = dark
+
+        if self._full:
+
+            cells = [(x, y) for y in range(self.tilemap.height) for x in range(self.tilemap.width)]
+
+        else:
+
+            cells = self._dirty
+
+        glyphs, attribs = self._back
+
+        for x, y in cells:
+
+            if 0 <= x < self.tilemap.width and 0 <= y < self.tilemap.height:
+
+                char, attrib, dim = self._compose(x, y, mask, self._dark)
+
+                glyphs[y, x] = char
+                attribs[y, x] = self._attrib_id(attrib, dim)
+
+        self.composed = len(cells)
+
+        self._dirty = set()
+        self._full = False
+
+        self._flush()
+
+    def _flush(self):
+
         """
+        Draws the positions where the back buffer differs from the front buffer,
+        and brings the front buffer up to date.
+
+        Drawing each position on its own is one curses call per position,
+        even though long runs of floor share the same attributes.
+        Instead, we split each row into spans of positions with the same attributes,
+        and draw each span that has changes with one string,
+        from its first changed position to its last.
+        Unchanged positions in between are drawn again, which is harmless as they look the same.
+        """
+
+        glyphs, attribs = self._back
+        front_glyphs, front_attribs = self._front
+
+        changed = (glyphs != front_glyphs) | (attribs != front_attribs)
+
+        self.drawn = int(np.count_nonzero(changed))
+        self.writes = 0
+
+        if not self.drawn:
+
+            # Screen is already up to date:
+
+            return
+
+        width = attribs.shape[1]
+
+        # Number each span of the same attributes, starting a new one at the start of each row:
+
+        starts = np.ones(attribs.shape, dtype=bool)
+        starts[:, 1:] = attribs[:, 1:] != attribs[:, :-1]
 
-        self.clear()
+        spans = np.cumsum(starts.ravel())
 
-        for x, y, z, obj in self.tilemap._iterate():
+        # Find the first and last changed position of each span with changes:
 
-            # Render the character at specified position. We don't care about secondary characters!
+        flat = np.flatnonzero(changed)
 
-            self.tilemap.tilemap[y][x].sort(key=self.tilemap._get_priority)
+        ids, first = np.unique(spans[flat], return_index=True)
+        last = np.append(first[1:], flat.size) - 1
 
-            self.addstr(obj.char, y, x, attrib=obj.attrib)
+        rows = glyphs.tolist()
+        flat_attribs = attribs.ravel()
 
-            continue
+        for begin, end in zip(flat[first].tolist(), flat[last].tolist()):
+
+            y, x = divmod(begin, width)
+
+            self.addstr(''.join(rows[y][x:end - y * width + 1]), y, x,
+                        attrib=[self._attribute(*self._attribs[flat_attribs[begin]])])
+
+        self.writes = ids.size
+
+        front_glyphs[changed] = glyphs[changed]
+        front_attribs[changed] = attribs[changed]
 
         # Refresh the window:
 
         self.refresh()
 
+    def _changed(self, changed):
+
+        """
+        Marks every position set in a boolean grid as dirty.
+        """
+
+        ys, xs = np.nonzero(changed)
+
+        self._dirty.update(zip(xs.tolist(), ys.tolist()))
+
+    def _attrib_id(self, attrib, dim=False):
+
+        """
+        Gets the attribute ID of a set of attributes, giving it one if it is new.
+
+        :param attrib: Tuple of attributes
+        :type attrib: tuple
+        :param dim: Determines if the attributes are drawn dimmed
+        :type dim: bool
+        :return: Attribute ID
+        :rtype: int
+        """
+
+        key = (attrib, dim)
+        num = self._attrib_ids.get(key)
+
+        if num is None:
+
+            num = len(self._attribs)
+
+            self._attribs.append(key)
+            self._attrib_ids[key] = num
+
+        return num
+
+    def _attribute(self, attrib, dim=False):
+
+        """
+        Combines a set of attributes into the single attribute curses accepts.
+
+        Curses only takes one attribute per call,
+        so we resolve color pair names and Color objects to their values,
+        and OR everything together, along with 'curses.A_DIM' if we are dimmed.
+        Color pairs may be added after the attributes are first seen(see 'init_colors()'),
+        so this is done when drawing.
+
+        :param attrib: Tuple of attributes
+        :type attrib: tuple
+        :param dim: Determines if the attributes are drawn dimmed
+        :type dim: bool
+        :return: Combined attribute
+        :rtype: int
+        """
+
+        final = curses.A_DIM if dim else curses.A_NORMAL
+
+        for targ in attrib:
+
+            if type(targ) == str:
+
+                targ = self.colorPairs[targ]
+
+            if isinstance(targ, Color):
+
+                targ = targ.resolvedColor
+
+            final |= targ
+
+        return final
+
+    def _compose(self, x, y, visible, dark):
+
+        """
+        Works out what to draw at a position.
+
+        :param x: X cordnet
+        :type x: int
+        :param y: Y cordnet
+        :type y: int
+        :param visible: Fog of war mask, None if there is no fog
+        :type visible: np.ndarray, None
+        :param dark: Grid of positions too dark to see clearly, None if there are no lights
+        :type dark: np.ndarray, None
+        :return: Char, tuple of attributes, and if they are drawn dimmed
+        :rtype: tuple
+        """
+
+        if visible is not None and not visible[y, x]:
+
+            # Hidden by fog, draw what we remember dimmed:
+
+            glyph = None if self.tilemap.memory is None else self.tilemap.memory.glyph(x, y)
+
+            if glyph is None:
+
+                return ' ', (), False
+
+            return glyph[0] or ' ', tuple(glyph[1]), True
+
+        cell = self.tilemap.tilemap[y][x]
+
+        if not cell:
+
+            return ' ', (), False
+
+        # Objects are sorted by relevance, so the first one is on top,
+        # and is dimmed if it is too dark to see clearly:
+
+        obj = cell[0]
+
+        return obj.char or ' ', tuple(obj.attrib), dark is not None and bool(dark[y, x])
+
     def display(self):
 
         """
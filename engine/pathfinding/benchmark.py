@@ -0,0 +1,802 @@
+"""
+Headless pathfinding benchmarks.
+
+Watching trackers chase the player around in curses is no way to measure pathfinding.
+Instead, we build a corpus of canonical maps at several sizes,
+and run every pathfinding mode over each of them, reporting:
+
+    - Nodes expanded(where the mode has a meaningful count)
+    - Wall time in milliseconds
+    - Path length and cost, and how the cost compares to the optimal cost
+
+The optimal cost is taken from a distance map of the whole tilemap(with move costs, if any),
+so every mode is checked against the same answer.
+Every step of a path must also be walkable:
+next to the position before it, on the tilemap, and passable.
+Any mode returning a path that can't be walked, costs more than it should,
+or leads to an unreachable target fails the run,
+so this doubles as the regression gate for pathfinding work:
+
+    python -m engine.pathfinding.benchmark
+    python -m engine.pathfinding.benchmark --sizes 32 64 --maps maze rooms
+
+We also time whole tilemap distance maps against the plain python searches they replace,
+checking the maps match and the speedup hasn't slipped below what we promise(see SPEEDUPS):
+
+    python -m engine.pathfinding.benchmark --wavefront --sizes 256
+
+We currently have the following maps:
+
+    > open - Open field without any walls
+    > walls - Random runs of walls on each row, like 'look_test()' in test.py
+    > rooms - Rooms on a grid, joined by corridors with doors
+    > maze - Perfect maze, with exactly one path between any two positions
+    > unreachable - Open field with the target walled in
+    > swamp - Random runs of walls, with patches of mud that cost extra to wade through
+"""
+
+import argparse
+import heapq
+import random
+import statistics
+import sys
+import time
+
+from collections import deque
+
+import numpy as np
+
+from engine.characters.tiles import Mud, Wall
+from engine.pathfinding.dstar import DStarLite, chebyshev
+from engine.pathfinding.landmarks import LandmarkIndex
+from engine.pathfinding.reservations import ReservationTable
+from engine.pathfinding.search import astar
+from engine.pathfinding.service import BatchedPathService, ProcessPathService, SlicedPathService
+from engine.pathfinding.smoothing import LineOfSight, smooth
+from engine.pathfinding.wavefront import METRICS, distance_map, follow, UNREACHABLE
+from engine.tilemaps import BaseTileMap
+
+
+def _tilemap(size, walls):
+
+    """
+    Creates a square tilemap with walls at the given positions.
+    """
+
+    tilemap = BaseTileMap(size, size, None)
+
+    for x, y in walls:
+
+        tilemap.add(Wall(), x, y)
+
+    return tilemap
+
+
+def open_field(size, rng):
+
+    """
+    Open field without any walls.
+    """
+
+    return _tilemap(size, ())
+
+
+def random_walls(size, rng):
+
+    """
+    Random runs of walls on each row, like 'look_test()' in test.py.
+
+    Half of the rows get a run of walls, starting at a random position
+    and running for up to half of the width.
+    """
+
+    walls = []
+
+    for y in range(size):
+
+        if rng.random() < 0.5:
+
+            start = rng.randrange(size)
+
+            walls.extend((x, y) for x in range(start, min(start + rng.randrange(2, size // 2), size)))
+
+    return _tilemap(size, walls)
+
+
+def rooms(size, rng, room=8):
+
+    """
+    Rooms on a grid, joined by corridors with doors.
+
+    Each room is surrounded by walls,
+    and gets a door to the room on its right and the room below it.
+    """
+
+    walls = set()
+
+    for y in range(0, size, room):
+
+        for x in range(size):
+
+            walls.add((x, y))
+
+    for x in range(0, size, room):
+
+        for y in range(size):
+
+            walls.add((x, y))
+
+    # Knock out a door in each wall between two rooms:
+
+    for top in range(0, size, room):
+
+        for left in range(0, size, room):
+
+            if left + room < size:
+
+                walls.discard((left + room, min(top + rng.randrange(1, room), size - 1)))
+
+            if top + room < size:
+
+                walls.discard((min(left + rng.randrange(1, room), size - 1), top + room))
+
+    return _tilemap(size, walls)
+
+
+def maze(size, rng):
+
+    """
+    Perfect maze, carved out with a randomized depth first search.
+    """
+
+    carved = {(1, 1)}
+    stack = [(1, 1)]
+
+    while stack:
+
+        x, y = stack[-1]
+
+        options = [(x + dx, y + dy, dx, dy) for dx, dy in ((2, 0), (-2, 0), (0, 2), (0, -2))
+                   if 0 < x + dx < size - 1 and 0 < y + dy < size - 1 and (x + dx, y + dy) not in carved]
+
+        if not options:
+
+            stack.pop()
+
+            continue
+
+        near_x, near_y, dx, dy = rng.choice(options)
+
+        carved.add((x + dx // 2, y + dy // 2))
+        carved.add((near_x, near_y))
+
+        stack.append((near_x, near_y))
+
+    return _tilemap(size, [(x, y) for y in range(size) for x in range(size) if (x, y) not in carved])
+
+
+def unreachable(size, rng):
+
+    """
+    Open field with the target walled in.
+
+    The target is placed in the far corner by '_endpoints()',
+    so we wrap that corner in walls.
+    """
+
+    return _tilemap(size, [(size - 3, size - 3), (size - 2, size - 3), (size - 1, size - 3),
+                           (size - 3, size - 2), (size - 3, size - 1)])
+
+
+def swamp(size, rng):
+
+    """
+    Random runs of walls, with patches of mud that cost extra to wade through.
+
+    Paths have to weigh going around the mud against wading through it,
+    so this is the map that checks move costs are respected.
+    """
+
+    tilemap = random_walls(size, rng)
+    passable = tilemap.passability()
+
+    mud = set()
+
+    for _ in range(size // 2):
+
+        left = rng.randrange(size)
+        top = rng.randrange(size)
+        width = rng.randrange(2, max(3, size // 4))
+        height = rng.randrange(2, max(3, size // 4))
+
+        mud.update((x, y) for y in range(top, min(top + height, size)) for x in range(left, min(left + width, size)))
+
+    for x, y in sorted(mud):
+
+        if passable[y, x]:
+
+            tilemap.add(Mud(), x, y)
+
+    return tilemap
+
+
+MAPS = {
+    'open': open_field,
+    'walls': random_walls,
+    'rooms': rooms,
+    'maze': maze,
+    'unreachable': unreachable,
+    'swamp': swamp,
+}
+
+
+def _endpoints(tilemap):
+
+    """
+    Picks the start and target of a benchmark.
+
+    The start is the first passable position from the top left,
+    and the target is the last passable position from the bottom right if it can't be reached,
+    otherwise it is the reachable position furthest from the start.
+
+    :return: Start and target positions
+    :rtype: tuple
+    """
+
+    passable = tilemap.passability()
+
+    cells = [(x, y) for y in range(tilemap.height) for x in range(tilemap.width) if passable[y, x]]
+    start = cells[0]
+
+    dist = distance_map(passable, [start])
+
+    if dist[cells[-1][1], cells[-1][0]] == UNREACHABLE:
+
+        return start, cells[-1]
+
+    far = max(cells, key=lambda pos: dist[pos[1], pos[0]])
+
+    return start, far
+
+
+def _costs(tilemap):
+
+    """
+    Gets the move costs of the tilemap as lists, None if every move costs 1.
+    """
+
+    costs = tilemap.cost_grid()
+
+    return None if costs is None else costs.tolist()
+
+
+def _valid(tilemap, start, path):
+
+    """
+    Determines if a path can actually be walked.
+
+    Each position must be next to the one before it(starting with the start),
+    on the tilemap, and passable.
+
+    :return: True if every step of the path is walkable
+    :rtype: bool
+    """
+
+    passable = tilemap.passability()
+    last = start
+
+    for x, y in path:
+
+        if chebyshev(last, (x, y)) != 1:
+
+            return False
+
+        if not (0 <= x < tilemap.width and 0 <= y < tilemap.height) or not passable[y, x]:
+
+            return False
+
+        last = (x, y)
+
+    return True
+
+
+def _resolve(service, start, goal):
+
+    """
+    Submits one request to a service, and updates it until it is done.
+    """
+
+    ticket = service.submit(start, goal)
+
+    while not ticket.done:
+
+        service.update()
+
+    return ticket.path
+
+
+def mode_astar(tilemap, start, goal):
+
+    """
+    Plain A*, with the chebyshev distance heuristic.
+    """
+
+    stats = {}
+    path = astar(tilemap.passability().tolist(), start, goal, costs=_costs(tilemap), stats=stats)
+
+    return path, stats.get('expanded')
+
+
+def mode_alt(tilemap, start, goal):
+
+    """
+    A* with landmark(ALT) heuristics.
+
+    Building the landmarks is included in the time,
+    as it is what a fresh tilemap would pay.
+    """
+
+    landmarks = LandmarkIndex(tilemap, background=False)
+
+    try:
+
+        stats = {}
+        path = astar(tilemap.passability().tolist(), start, goal, costs=_costs(tilemap),
+                     heuristic=landmarks.heuristic(goal), stats=stats)
+
+    finally:
+
+        landmarks.close()
+
+    return path, stats.get('expanded')
+
+
+def mode_dstar(tilemap, start, goal):
+
+    """
+    Initial D* Lite plan.
+    """
+
+    planner = DStarLite(tilemap, start, goal)
+
+    try:
+
+        path = planner.path()
+
+    finally:
+
+        planner.close()
+
+    return path, planner.expanded
+
+
+def mode_wavefront(tilemap, start, goal):
+
+    """
+    Distance map from the target, followed downhill from the start.
+
+    Every position the wavefront reached counts as expanded.
+    """
+
+    dist = distance_map(tilemap.passability(), [goal], costs=tilemap.cost_grid())
+
+    return follow(dist.tolist(), *start, costs=_costs(tilemap)), int((dist != UNREACHABLE).sum())
+
+
+def mode_sliced(tilemap, start, goal):
+
+    """
+    Time-sliced searches, resolved over as many rounds as it takes.
+    """
+
+    return _resolve(SlicedPathService(tilemap), start, goal), None
+
+
+def mode_batched(tilemap, start, goal):
+
+    """
+    Batched distance maps, shared by requests with the same target.
+    """
+
+    return _resolve(BatchedPathService(tilemap), start, goal), None
+
+
+def mode_process(tilemap, start, goal):
+
+    """
+    Searches offloaded to a worker process, including the round trip.
+    """
+
+    service = ProcessPathService(tilemap, workers=1, deadline=1)
+
+    try:
+
+        return _resolve(service, start, goal), None
+
+    finally:
+
+        service.close()
+
+
+def mode_reservation(tilemap, start, goal):
+
+    """
+    Cooperative planning with a reservation table, one move each round.
+
+    Like a tracker, we plan a window ahead from where we are each round,
+    take the first move, and stop once we are next to the target.
+    Nobody else holds reservations, so every move should be on an optimal path.
+    """
+
+    table = ReservationTable(tilemap)
+    owner = object()
+
+    pos = start
+    path = []
+
+    for _ in range(tilemap.width * tilemap.height):
+
+        if chebyshev(pos, goal) <= 1:
+
+            # Next to the target, step onto it:
+
+            return path + [goal], None
+
+        table.update()
+
+        route = table.plan(owner, pos, goal)
+
+        if not route:
+
+            return [], None
+
+        pos = route[0]
+        path.append(pos)
+
+    return path, None
+
+
+def mode_smoothed(tilemap, start, goal):
+
+    """
+    A* followed by line of sight smoothing.
+
+    Smoothing pulls the path straight without looking at move costs,
+    so on weighted maps we only check that the path can be walked.
+    """
+
+    stats = {}
+    path = astar(tilemap.passability().tolist(), start, goal, costs=_costs(tilemap), stats=stats)
+
+    return smooth(path, start, LineOfSight(tilemap)), stats.get('expanded')
+
+
+MODES = {
+    'astar': mode_astar,
+    'alt': mode_alt,
+    'dstar': mode_dstar,
+    'wavefront': mode_wavefront,
+    'sliced': mode_sliced,
+    'batched': mode_batched,
+    'process': mode_process,
+    'reservation': mode_reservation,
+    'smoothed': mode_smoothed,
+}
+
+UNWEIGHTED = {'smoothed'}  # Modes that ignore move costs, only checked for walkable paths on weighted maps
+
+
+def run(maps=None, sizes=(32, 64, 128), modes=None, seed=0):
+
+    """
+    Runs every mode over every map at every size.
+
+    :param maps: Names of the maps to run, None for all of them
+    :type maps: list, None
+    :param sizes: Width and height of each map
+    :type sizes: tuple
+    :param modes: Names of the modes to run, None for all of them
+    :type modes: list, None
+    :param seed: Seed for the map generators, so runs are comparable
+    :type seed: int
+    :return: List of results, as dictionaries
+    :rtype: list
+    """
+
+    final = []
+
+    for name in maps or MAPS:
+
+        for size in sizes:
+
+            tilemap = MAPS[name](size, random.Random(seed))
+            start, goal = _endpoints(tilemap)
+
+            costs = tilemap.cost_grid()
+
+            optimal = distance_map(tilemap.passability(), [goal], costs=costs)[start[1], start[0]]
+            optimal = None if optimal == UNREACHABLE else int(optimal)
+
+            for mode in modes or MODES:
+
+                began = time.perf_counter()
+                path, expanded = MODES[mode](tilemap, start, goal)
+                elapsed = time.perf_counter() - began
+
+                cost = sum(tilemap.move_cost(x, y) for x, y in path)
+
+                if optimal is None:
+
+                    ok = not path
+
+                else:
+
+                    ok = (bool(path) and path[-1] == goal and _valid(tilemap, start, path)
+                          and (cost == optimal or (costs is not None and mode in UNWEIGHTED)))
+
+                final.append({'map': name, 'size': size, 'mode': mode, 'expanded': expanded, 'ms': elapsed * 1000,
+                              'steps': len(path), 'cost': cost, 'optimal': optimal, 'ok': ok})
+
+    return final
+
+
+# Lowest speedup of 'distance_map()' over the plain python searches we accept, for each map and metric.
+# These are about half of what we measure on 256x256 maps, so a noisy machine doesn't fail the run:
+#
+#   - Chebyshev maps are a breadth first wavefront, and come in at 6-12x on open maps
+#   - Octile maps go through Dial's algorithm, which needs more trips through python, and come in at 3-5x
+#   - Move costs(swamp) spread the distances out over many more windows, so we only just beat python
+#
+# Mazes are missing on purpose! Their wavefront is a single position wide for thousands of steps,
+# so we pay for a trip through NumPy per position, and plain python is faster.
+
+SPEEDUPS = {
+    'open': {'chebyshev': 5, 'octile': 2},
+    'walls': {'chebyshev': 3, 'octile': 1.5},
+    'rooms': {'chebyshev': 4, 'octile': 2},
+    'swamp': {'chebyshev': 1, 'octile': 1},
+}
+
+WAVEFRONT_METRICS = ('chebyshev', 'octile')  # Metrics we time, chebyshev is how entities move
+
+
+def python_distances(passable, goal, metric='chebyshev', costs=None):
+
+    """
+    Builds a distance map position by position in plain python, like we did before 'distance_map()'.
+
+    Unit costs use a breadth first search, anything else uses Dijkstra's algorithm.
+    Like 'distance_map()', each move costs the move cost of the position moved onto,
+    walking from each position to the goal.
+
+    :param passable: Passability grid, as lists of rows
+    :type passable: list
+    :param goal: Position to measure distance from
+    :type goal: tuple
+    :param metric: Name of the metric to use, see METRICS in wavefront.py
+    :type metric: str
+    :param costs: Move costs, as lists of rows, None if every move costs the same
+    :type costs: list, None
+    :return: Distances as lists of rows, UNREACHABLE where the goal can't be reached
+    :rtype: list
+    """
+
+    straight, diagonal = METRICS[metric]
+
+    height = len(passable)
+    width = len(passable[0])
+
+    moves = [(0, -1, straight), (-1, 0, straight), (1, 0, straight), (0, 1, straight)]
+
+    if diagonal is not None:
+
+        moves.extend([(-1, -1, diagonal), (1, -1, diagonal), (-1, 1, diagonal), (1, 1, diagonal)])
+
+    dist = [[UNREACHABLE] * width for _ in range(height)]
+    dist[goal[1]][goal[0]] = 0
+
+    if costs is None and straight == diagonal:
+
+        queue = deque([goal])
+
+        while queue:
+
+            x, y = queue.popleft()
+            new = dist[y][x] + straight
+
+            for dx, dy, _ in moves:
+
+                near_x = x + dx
+                near_y = y + dy
+
+                if 0 <= near_x < width and 0 <= near_y < height and passable[near_y][near_x] \
+                        and dist[near_y][near_x] == UNREACHABLE:
+
+                    dist[near_y][near_x] = new
+
+                    queue.append((near_x, near_y))
+
+        return dist
+
+    heap = [(0, goal)]
+
+    while heap:
+
+        current, (x, y) = heapq.heappop(heap)
+
+        if current > dist[y][x]:
+
+            continue
+
+        weight = 1 if costs is None else costs[y][x]
+
+        for dx, dy, cost in moves:
+
+            near_x = x + dx
+            near_y = y + dy
+
+            if 0 <= near_x < width and 0 <= near_y < height and passable[near_y][near_x]:
+
+                new = current + cost * weight
+                old = dist[near_y][near_x]
+
+                if old == UNREACHABLE or new < old:
+
+                    dist[near_y][near_x] = new
+
+                    heapq.heappush(heap, (new, (near_x, near_y)))
+
+    return dist
+
+
+def _median(call, repeat):
+
+    """
+    Runs the call a few times, returning the median wall time in milliseconds and the last result.
+    """
+
+    times = []
+
+    for _ in range(repeat):
+
+        began = time.perf_counter()
+        final = call()
+        times.append(time.perf_counter() - began)
+
+    return statistics.median(times) * 1000, final
+
+
+def run_wavefront(maps=None, sizes=(256,), metrics=WAVEFRONT_METRICS, seed=0, repeat=5):
+
+    """
+    Times 'distance_map()' against 'python_distances()' over every map at every size.
+
+    The python searches get the grids as lists of rows, which is the fastest they can be,
+    and the conversion isn't timed.
+    A result is only ok if both maps match, and the speedup is at least what SPEEDUPS promises.
+    Maps missing from SPEEDUPS are only checked for matching maps.
+
+    :param maps: Names of the maps to run, None for every map in SPEEDUPS
+    :type maps: list, None
+    :param sizes: Width and height of each map
+    :type sizes: tuple
+    :param metrics: Names of the metrics to run
+    :type metrics: tuple
+    :param seed: Seed for the map generators, so runs are comparable
+    :type seed: int
+    :param repeat: Number of times to run each search, we report the median
+    :type repeat: int
+    :return: List of results, as dictionaries
+    :rtype: list
+    """
+
+    final = []
+
+    for name in maps or SPEEDUPS:
+
+        for size in sizes:
+
+            tilemap = MAPS[name](size, random.Random(seed))
+            _, goal = _endpoints(tilemap)
+
+            passable = tilemap.passability()
+            costs = tilemap.cost_grid()
+
+            rows = passable.tolist()
+            cost_rows = _costs(tilemap)
+
+            for metric in metrics:
+
+                fast, dist = _median(lambda: distance_map(passable, [goal], metric, costs=costs), repeat)
+                slow, expected = _median(lambda: python_distances(rows, goal, metric, cost_rows), repeat)
+
+                speedup = slow / fast
+                floor = SPEEDUPS.get(name, {}).get(metric, 0)
+
+                final.append({'map': name, 'size': size, 'metric': metric, 'ms': fast, 'python': slow,
+                              'speedup': speedup, 'ok': np.array_equal(dist, np.array(expected)) and speedup >= floor})
+
+    return final
+
+
+def report_wavefront(results, out=sys.stdout):
+
+    """
+    Prints the results of 'run_wavefront()' as a table.
+
+    :param results: Results from 'run_wavefront()'
+    :type results: list
+    :param out: File to print to
+    :type out: file
+    """
+
+    out.write('{:<12}{:>6}  {:<12}{:>11}{:>11}{:>9}  {}\n'.format(
+        'map', 'size', 'metric', 'ms', 'python', 'speedup', 'result'))
+
+    for result in results:
+
+        out.write('{:<12}{:>6}  {:<12}{:>11.2f}{:>11.2f}{:>8.1f}x  {}\n'.format(
+            result['map'], result['size'], result['metric'], result['ms'], result['python'], result['speedup'],
+            'ok' if result['ok'] else 'FAIL'))
+
+
+def report(results, out=sys.stdout):
+
+    """
+    Prints the results as a table.
+
+    :param results: Results from 'run()'
+    :type results: list
+    :param out: File to print to
+    :type out: file
+    """
+
+    out.write('{:<12}{:>6}  {:<12}{:>10}{:>11}{:>8}{:>8}{:>9}  {}\n'.format(
+        'map', 'size', 'mode', 'expanded', 'ms', 'steps', 'cost', 'optimal', 'result'))
+
+    for result in results:
+
+        out.write('{:<12}{:>6}  {:<12}{:>10}{:>11.2f}{:>8}{:>8}{:>9}  {}\n'.format(
+            result['map'], result['size'], result['mode'],
+            '-' if result['expanded'] is None else result['expanded'], result['ms'], result['steps'], result['cost'],
+            '-' if result['optimal'] is None else result['optimal'], 'ok' if result['ok'] else 'FAIL'))
+
+
+def main(args=None):
+
+    """
+    Runs the benchmarks from the command line.
+
+    :return: Exit code, 1 if any mode failed
+    :rtype: int
+    """
+
+    parser = argparse.ArgumentParser(description='Headless pathfinding benchmarks')
+
+    parser.add_argument('--maps', nargs='+', choices=list(MAPS), help='Maps to run, defaults to all of them')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[32, 64, 128], help='Width and height of each map')
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), help='Modes to run, defaults to all of them')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the map generators')
+    parser.add_argument('--wavefront', action='store_true',
+                        help='Time distance maps against plain python searches instead')
+
+    args = parser.parse_args(args)
+
+    if args.wavefront:
+
+        results = run_wavefront(args.maps, args.sizes, seed=args.seed)
+
+        report_wavefront(results)
+
+        return 0 if all(result['ok'] for result in results) else 1
+
+    results = run(args.maps, args.sizes, args.modes, args.seed)
+
+    report(results)
+
+    return 0 if all(result['ok'] for result in results) else 1
+
+
+if __name__ == '__main__':
+
+    sys.exit(main())
@@ -0,0 +1,380 @@
+"""
+Connected component labelling of passable positions.
+
+Two positions are in the same component if an entity can walk from one to the other.
+By giving each component a label, we can tell if a goal is reachable in O(1),
+and skip searches that could never succeed(such as when the player is walled off).
+
+The labels are kept up to date as obstacles are added and removed:
+
+    - When a position opens up, we merge the components around it,
+      relabelling the smaller ones into the largest.
+    - When a position is blocked, its component may split.
+      We flood out from each side at the same time, and stop as soon as only one side is still growing.
+      The sides that finished are the pieces that broke off, and get new labels.
+
+Either way, the work done is proportional to the smaller components, not the whole tilemap.
+
+We currently have the following:
+
+    > ComponentIndex - Component labels bound to a tilemap
+"""
+
+from collections import deque
+
+from engine.pathfinding.dstar import NEIGHBORS
+
+# Offsets of the positions around a position, in order around the ring:
+
+RING = ((0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1))
+
+BLOCKED = -1  # Label given to positions that can't be walked through
+
+
+class ComponentIndex(object):
+
+    """
+    ComponentIndex - Component labels of passable positions, bound to a tilemap.
+
+    We label the whole tilemap when created,
+    and watch it for passability changes after that.
+    """
+
+    def __init__(self, tilemap):
+
+        self.tilemap = tilemap  # Tilemap we are labelling
+
+        self.labels = [[BLOCKED] * tilemap.width for _ in range(tilemap.height)]  # Label of each position
+        self.sizes = {}  # Number of positions in each component
+        self._next = 0  # Next label to give out
+
+        for y in range(tilemap.height):
+
+            for x in range(tilemap.width):
+
+                if self.labels[y][x] == BLOCKED and tilemap.is_passable(x, y):
+
+                    self._flood((x, y), BLOCKED, self._label())
+
+        tilemap.watch(self._notify)
+
+    def close(self):
+
+        """
+        Stops listening to the tilemap.
+        """
+
+        self.tilemap.unwatch(self._notify)
+
+    def label(self, x, y):
+
+        """
+        Gets the component label of a position.
+
+        :param x: X cordnet
+        :type x: int
+        :param y: Y cordnet
+        :type y: int
+        :return: Label of the position, BLOCKED if it can't be walked through
+        :rtype: int
+        """
+
+        return self.labels[y][x]
+
+    def connected(self, start, goal):
+
+        """
+        Determines if the goal can be reached from the start.
+
+        Either position is allowed to be blocked, like the goal of a search usually is.
+        In that case we check the components of the passable positions around it.
+
+        :param start: Position to start at
+        :type start: tuple
+        :param goal: Position to reach
+        :type goal: tuple
+        :return: True if there is a path between the positions
+        :rtype: bool
+        """
+
+        if max(abs(start[0] - goal[0]), abs(start[1] - goal[1])) <= 1:
+
+            # Right next to each other:
+
+            return True
+
+        return not self._touching(*start).isdisjoint(self._touching(*goal))
+
+    def _touching(self, x, y):
+
+        """
+        Gets the labels a position belongs to.
+
+        This is just its own label, unless it is blocked,
+        in which case it is the labels of the positions around it.
+        """
+
+        if self.labels[y][x] != BLOCKED:
+
+            return {self.labels[y][x]}
+
+        return {self.labels[near[1]][near[0]] for near in self._around(x, y)} - {BLOCKED}
+
+    def _label(self):
+
+        """
+        Gives out a fresh label.
+        """
+
+        self._next += 1
+
+        return self._next - 1
+
+    def _around(self, x, y, offsets=NEIGHBORS):
+
+        """
+        Generator yielding all in bounds positions around a position.
+        """
+
+        for dx, dy in offsets:
+
+            near_x = x + dx
+            near_y = y + dy
+
+            if 0 <= near_x < self.tilemap.width and 0 <= near_y < self.tilemap.height:
+
+                yield near_x, near_y
+
+    def _flood(self, pos, old, new):
+
+        """
+        Relabels every position connected to the given one that has the old label.
+
+        :return: Number of positions relabelled
+        :rtype: int
+        """
+
+        self.labels[pos[1]][pos[0]] = new
+
+        queue = deque([pos])
+        count = 1
+
+        while queue:
+
+            x, y = queue.popleft()
+
+            for near_x, near_y in self._around(x, y):
+
+                if self.labels[near_y][near_x] == old and (old != BLOCKED or self.tilemap.is_passable(near_x, near_y)):
+
+                    self.labels[near_y][near_x] = new
+                    queue.append((near_x, near_y))
+                    count += 1
+
+        self.sizes[new] = self.sizes.get(new, 0) + count
+
+        if old != BLOCKED:
+
+            self.sizes[old] -= count
+
+            if not self.sizes[old]:
+
+                del self.sizes[old]
+
+        return count
+
+    def _notify(self, x, y):
+
+        """
+        Callback invoked by the tilemap when a position changes passability.
+
+        :param x: X cordnet
+        :type x: int
+        :param y: Y cordnet
+        :type y: int
+        """
+
+        if self.tilemap.is_passable(x, y):
+
+            self._open(x, y)
+
+        else:
+
+            self._block(x, y)
+
+    def _open(self, x, y):
+
+        """
+        A position opened up, merge the components around it.
+        """
+
+        around = {self.labels[near_y][near_x] for near_x, near_y in self._around(x, y)} - {BLOCKED}
+
+        if not around:
+
+            # On its own, give it a fresh label:
+
+            new = self._label()
+
+            self.labels[y][x] = new
+            self.sizes[new] = 1
+
+            return
+
+        # Keep the largest label, and relabel the rest into it:
+
+        keep = max(around, key=self.sizes.get)
+
+        self.labels[y][x] = keep
+        self.sizes[keep] += 1
+
+        for near_x, near_y in self._around(x, y):
+
+            old = self.labels[near_y][near_x]
+
+            if old != BLOCKED and old != keep:
+
+                self._flood((near_x, near_y), old, keep)
+
+    def _block(self, x, y):
+
+        """
+        A position was blocked, split its component if needed.
+        """
+
+        old = self.labels[y][x]
+
+        if old == BLOCKED:
+
+            return
+
+        self.labels[y][x] = BLOCKED
+        self.sizes[old] -= 1
+
+        # Find each run of passable positions around the ring.
+        # Positions next to each other in the ring are also next to each other on the tilemap,
+        # so each run stays connected without us:
+
+        ring = [(x + dx, y + dy) for dx, dy in RING]
+        inside = [0 <= near_x < self.tilemap.width and 0 <= near_y < self.tilemap.height
+                  and self.labels[near_y][near_x] == old for near_x, near_y in ring]
+
+        seeds = [ring[num] for num in range(8) if inside[num] and not inside[num - 1]]
+
+        if not seeds and all(inside):
+
+            # Completely surrounded, nothing can split:
+
+            return
+
+        if len(seeds) <= 1:
+
+            if not self.sizes[old]:
+
+                del self.sizes[old]
+
+            return
+
+        self._split(seeds, old)
+
+    def _split(self, seeds, old):
+
+        """
+        Floods out from each seed at the same time, until only one is still growing.
+
+        Floods that run into each other are merged, as they are on the same piece.
+        Floods that run out of positions have found a piece that broke off.
+        """
+
+        parent = list(range(len(seeds)))  # Union-find over the floods
+
+        def find(num):
+
+            while parent[num] != num:
+
+                parent[num] = parent[parent[num]]
+                num = parent[num]
+
+            return num
+
+        owner = {seed: num for num, seed in enumerate(seeds)}  # Flood that reached each position first
+        queues = {num: deque([seed]) for num, seed in enumerate(seeds)}  # Frontier of each growing flood
+        finished = []  # Floods that ran out of positions
+
+        while len(queues) > 1:
+
+            for num in list(queues):
+
+                if num not in queues:
+
+                    # Merged into another flood this pass:
+
+                    continue
+
+                queue = queues[num]
+
+                if not queue:
+
+                    # Ran out of positions, this piece broke off:
+
+                    finished.append(num)
+                    del queues[num]
+
+                    continue
+
+                pos = queue.popleft()
+
+                for near in self._around(*pos):
+
+                    if self.labels[near[1]][near[0]] != old:
+
+                        continue
+
+                    other = owner.get(near)
+
+                    if other is None:
+
+                        owner[near] = num
+                        queue.append(near)
+
+                        continue
+
+                    other = find(other)
+
+                    if other != num and other in queues:
+
+                        # Ran into another flood, we are the same piece:
+
+                        parent[other] = num
+                        queue.extend(queues.pop(other))
+
+        # Gather the positions of each piece that broke off:
+
+        pieces = {num: [] for num in finished}
+
+        for pos, flood in owner.items():
+
+            flood = find(flood)
+
+            if flood in pieces:
+
+                pieces[flood].append(pos)
+
+        if not queues:
+
+            # Every flood finished, the largest piece keeps the old label:
+
+            del pieces[max(pieces, key=lambda num: len(pieces[num]))]
+
+        # Give the pieces that broke off their new labels:
+
+        for positions in pieces.values():
+
+            new = self._label()
+
+            for pos in positions:
+
+                self.labels[pos[1]][pos[0]] = new
+
+            self.sizes[new] = len(positions)
+            self.sizes[old] -= len(positions)
@@ -0,0 +1,148 @@
+"""
+Desire maps, built once each round and shared by every entity that reads them.
+
+A desire map gives every position a value, where lower values are more desirable.
+Entities simply step to the neighbor with the lowest value,
+so fleeing, wandering towards points of interest, or mixing several goals
+never needs a search for each entity.
+
+Maps are described by terms, which are (type, weight) pairs.
+Each term is a distance map to every object of that type, multiplied by the weight:
+
+    - A positive weight pulls entities towards the objects
+    - A negative weight pushes entities away from them
+
+For example, '((Player, -1.2), (Item, 0.5))' flees the player,
+while still being drawn to items.
+The weighted distance maps are summed,
+and then relaxed so entities walk around walls instead of into corners(see 'relax()').
+
+Desire maps are attached to a tilemap by setting 'BaseTileMap.desires'.
+The tilemap updates them at the start of each round,
+and any map asked for during the round is only built once.
+
+We currently have the following:
+
+    > DesireMaps - Per round cache of desire maps for a tilemap
+"""
+
+import numpy as np
+
+from engine.pathfinding.wavefront import distance_map, relax, UNREACHABLE
+
+SCALE = 10  # Desire values are fixed point, so weights can be fractional
+
+AVOID = 2 ** 40  # Value given to positions that can't be walked through
+
+
+class DesireMaps(object):
+
+    """
+    DesireMaps - Per round cache of desire maps for a tilemap.
+
+    The distance map to each type of object is also cached,
+    so maps sharing a term(such as fleeing the player) only flood the tilemap once.
+    """
+
+    def __init__(self, tilemap):
+
+        self.tilemap = tilemap  # Tilemap we build maps for
+        self.tick = 0  # Number of rounds we have been updated
+        self.builds = 0  # Number of desire maps built this round
+
+        self._distances = {}  # Distance map to each type of object, for this round
+        self._maps = {}  # Desire map for each set of terms, for this round
+
+    def update(self):
+
+        """
+        Method invoked by the tilemap at the start of each round.
+
+        Objects have moved since last round, so we forget our maps.
+        """
+
+        self.tick += 1
+        self.builds = 0
+
+        self._distances.clear()
+        self._maps.clear()
+
+    def get(self, terms):
+
+        """
+        Gets the desire map for the given terms.
+
+        :param terms: Tuple of (type, weight) pairs
+        :type terms: tuple
+        :return: Desire map as a list of rows, where lower values are more desirable
+        :rtype: list
+        """
+
+        final = self._maps.get(terms)
+
+        if final is None:
+
+            final = self._build(terms)
+
+            self._maps[terms] = final
+            self.builds += 1
+
+        return final
+
+    def distances(self, target):
+
+        """
+        Gets the distance map to every object of a type.
+
+        :param target: Type of object to measure distance to
+        :type target: type
+        :return: Distance map, or None if there are no objects of that type
+        :rtype: np.ndarray, None
+        """
+
+        if target not in self._distances:
+
+            tiles = self.tilemap.find_object_type(target, findall=True)
+
+            if tiles is None:
+
+                self._distances[target] = None
+
+            else:
+
+                goals = [(tile.x, tile.y) for tile in tiles]
+
+                self._distances[target] = distance_map(self.tilemap.passability(), goals,
+                                                       costs=self.tilemap.cost_grid())
+
+        return self._distances[target]
+
+    def _build(self, terms):
+
+        """
+        Sums the weighted distance maps of each term, and relaxes the result.
+        """
+
+        passable = self.tilemap.passability()
+        costs = self.tilemap.cost_grid()
+
+        total = np.zeros(passable.shape, dtype=np.int64)
+
+        for target, weight in terms:
+
+            dist = self.distances(target)
+
+            if dist is None:
+
+                # Nothing of this type around:
+
+                continue
+
+            # Positions that can't reach the objects don't care about them:
+
+            total += np.where(dist == UNREACHABLE, 0, dist) * int(round(weight * SCALE))
+
+        total = relax(passable, total, costs, SCALE)
+        total[~passable] = AVOID
+
+        return total.tolist()
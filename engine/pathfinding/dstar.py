@@ -0,0 +1,411 @@
+"""
+Incremental pathfinding using D* Lite.
+
+Trackers follow targets that move one position each round,
+and most rounds only a handful of positions change passability.
+Searching from scratch each round throws all of the previous work away.
+
+D* Lite keeps its search around, and only repairs the parts that are affected by a change.
+We search backwards from the goal, so each position knows its distance to the goal.
+When the searcher moves, we simply adjust our keys,
+and when the goal moves or positions change passability,
+we only revisit the positions whose distances could have changed.
+
+We currently have the following:
+
+    > DStarLite - Incremental planner bound to a tilemap
+"""
+
+import heapq
+
+# Offsets of the positions around a position, diagonals included:
+
+NEIGHBORS = ((-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1))
+
+INF = float('inf')
+
+
+def chebyshev(a, b):
+
+    """
+    Chebyshev distance between two positions.
+
+    Diagonal moves cost the same as straight ones,
+    so this is the exact distance on an empty tilemap.
+
+    :param a: First position
+    :type a: tuple
+    :param b: Second position
+    :type b: tuple
+    :return: Distance between the positions
+    :rtype: int
+    """
+
+    return max(abs(a[0] - b[0]), abs(a[1] - b[1]))
+
+
+class DStarLite(object):
+
+    """
+    DStarLite - Incremental planner that repairs its previous search.
+
+    We are bound to a tilemap, and watch it for passability and cost changes.
+    Changed positions are collected as they happen,
+    and are dealt with the next time a path is requested.
+
+    The searcher(usually the entity we are attached to) is the 'start',
+    and the position we are heading to is the 'goal'.
+    Both can be moved with 'move_start()' and 'move_goal()'.
+
+    Goal moves are handled like the goal positions changing cost,
+    so only positions whose keys fall below the start key are revisited.
+    Once you are done with a planner, be sure to call 'close()'
+    so the tilemap stops notifying us!
+    """
+
+    def __init__(self, tilemap, start, goal):
+
+        self.tilemap = tilemap  # Tilemap we are planning on
+        self.start = start  # Position we are searching from
+        self.goal = goal  # Position we are heading to
+        self.last = start  # Start position when the keys were last adjusted
+
+        self.km = 0  # Key modifier, accumulates the distance the start has moved
+        self.g = {}  # Distance to goal for each position
+        self.rhs = {}  # One step lookahead distance for each position
+
+        self._open = {}  # Current key of each position in the queue
+        self._heap = []  # Priority queue, stale entries are skipped
+        self._changed = set()  # Positions that changed passability or cost since our last plan
+
+        self.expanded = 0  # Number of positions expanded during the last plan
+
+        self.rhs[goal] = 0
+        self._push(goal)
+
+        # Start listening to the tilemap:
+
+        tilemap.watch(self._notify, costs=True)
+
+    def close(self):
+
+        """
+        Stops listening to the tilemap.
+        """
+
+        self.tilemap.unwatch(self._notify)
+
+    def move_start(self, start):
+
+        """
+        Moves the searcher to a new position.
+
+        We add the distance moved to our key modifier,
+        so the keys already in the queue stay valid.
+
+        :param start: New start position
+        :type start: tuple
+        """
+
+        if start == self.start:
+
+            return
+
+        self.km += chebyshev(self.last, start)
+        self.last = start
+        self.start = start
+
+    def move_goal(self, goal):
+
+        """
+        Moves the goal to a new position.
+
+        The old goal becomes a normal position, and the new one is pinned to zero.
+        Only these two positions change, the rest is repaired by the next plan.
+
+        :param goal: New goal position
+        :type goal: tuple
+        """
+
+        if goal == self.goal:
+
+            return
+
+        old = self.goal
+        self.goal = goal
+
+        self.rhs[goal] = 0
+        self._update(goal)
+
+        self.rhs[old] = self._lookahead(old)
+        self._update(old)
+
+    def plan(self):
+
+        """
+        Brings our search up to date.
+
+        We first deal with any passability or cost changes,
+        and then repair the search until the start position is consistent.
+
+        :return: Distance from the start to the goal, infinity if it can't be reached
+        :rtype: int, float
+        """
+
+        self.expanded = 0
+
+        for pos in self._changed:
+
+            # Every position around the change could route through it:
+
+            for near in self._neighbors(pos):
+
+                if near != self.goal:
+
+                    self.rhs[near] = self._lookahead(near)
+                    self._update(near)
+
+            if pos != self.goal:
+
+                self.rhs[pos] = self._lookahead(pos)
+                self._update(pos)
+
+        self._changed.clear()
+
+        self._compute()
+
+        return self.g.get(self.start, INF)
+
+    def next_step(self):
+
+        """
+        Plans and returns the next position to move to.
+
+        :return: Position to move to, or None if the goal can't be reached
+        :rtype: tuple, None
+        """
+
+        if self.plan() == INF or self.start == self.goal:
+
+            return None
+
+        return self._best(self.start)
+
+    def path(self):
+
+        """
+        Plans and returns the full path from the start to the goal.
+
+        The start position is not included, the goal is.
+
+        :return: List of positions, empty if the goal can't be reached
+        :rtype: list
+        """
+
+        if self.plan() == INF:
+
+            return []
+
+        final = []
+        pos = self.start
+
+        while pos != self.goal:
+
+            pos = self._best(pos)
+            final.append(pos)
+
+        return final
+
+    def _notify(self, x, y):
+
+        """
+        Callback invoked by the tilemap when a position changes passability or cost.
+
+        :param x: X cordnet
+        :type x: int
+        :param y: Y cordnet
+        :type y: int
+        """
+
+        self._changed.add((x, y))
+
+    def _cost(self, a, b):
+
+        """
+        Cost of moving between two neighboring positions.
+
+        :return: Move cost of the second position if both are passable, infinity otherwise
+        :rtype: int, float
+        """
+
+        if self.tilemap.is_passable(*a) and self.tilemap.is_passable(*b):
+
+            return self.tilemap.move_cost(*b)
+
+        return INF
+
+    def _neighbors(self, pos):
+
+        """
+        Generator yielding all in bounds positions around a position.
+        """
+
+        width = self.tilemap.width
+        height = self.tilemap.height
+
+        for dx, dy in NEIGHBORS:
+
+            x = pos[0] + dx
+            y = pos[1] + dy
+
+            if 0 <= x < width and 0 <= y < height:
+
+                yield x, y
+
+    def _lookahead(self, pos):
+
+        """
+        Computes the best distance to the goal through any neighbor.
+        """
+
+        best = INF
+
+        for near in self._neighbors(pos):
+
+            best = min(best, self._cost(pos, near) + self.g.get(near, INF))
+
+        return best
+
+    def _best(self, pos):
+
+        """
+        Gets the neighbor that leads to the goal the quickest.
+        """
+
+        return min(self._neighbors(pos), key=lambda near: (self._cost(pos, near) + self.g.get(near, INF),
+                                                           chebyshev(near, self.goal)))
+
+    def _key(self, pos):
+
+        """
+        Calculates the queue key of a position.
+        """
+
+        best = min(self.g.get(pos, INF), self.rhs.get(pos, INF))
+
+        return best + chebyshev(self.start, pos) + self.km, best
+
+    def _push(self, pos):
+
+        """
+        Adds(or re-adds) a position to the queue with a fresh key.
+        """
+
+        key = self._key(pos)
+
+        self._open[pos] = key
+
+        heapq.heappush(self._heap, (key, pos))
+
+    def _top(self):
+
+        """
+        Gets the key and position at the top of the queue, skipping stale entries.
+        """
+
+        while self._heap:
+
+            key, pos = self._heap[0]
+
+            if self._open.get(pos) == key:
+
+                return key, pos
+
+            heapq.heappop(self._heap)
+
+        return (INF, INF), None
+
+    def _update(self, pos):
+
+        """
+        Places a position in the queue if it is inconsistent, and removes it otherwise.
+        """
+
+        if self.g.get(pos, INF) != self.rhs.get(pos, INF):
+
+            self._push(pos)
+
+        else:
+
+            self._open.pop(pos, None)
+
+    def _compute(self):
+
+        """
+        Repairs the search until the start position is consistent.
+        """
+
+        while True:
+
+            key, pos = self._top()
+
+            if pos is None:
+
+                # Nothing left to repair:
+
+                return
+
+            if key >= self._key(self.start) and self.rhs.get(self.start, INF) == self.g.get(self.start, INF):
+
+                # Start is consistent, we are done:
+
+                return
+
+            self.expanded += 1
+
+            new = self._key(pos)
+
+            if key < new:
+
+                # Key is out of date, re-queue it:
+
+                self._push(pos)
+                continue
+
+            g = self.g.get(pos, INF)
+            rhs = self.rhs.get(pos, INF)
+
+            del self._open[pos]
+
+            if g > rhs:
+
+                # Overconsistent, we have found a shorter distance:
+
+                self.g[pos] = rhs
+
+                for near in self._neighbors(pos):
+
+                    if near != self.goal:
+
+                        self.rhs[near] = min(self.rhs.get(near, INF), self._cost(near, pos) + rhs)
+                        self._update(near)
+
+            else:
+
+                # Underconsistent, our distance went up:
+
+                self.g[pos] = INF
+
+                for near in self._neighbors(pos):
+
+                    if near != self.goal and self.rhs.get(near, INF) == self._cost(near, pos) + g:
+
+                        self.rhs[near] = self._lookahead(near)
+
+                    self._update(near)
+
+                if pos != self.goal:
+
+                    self.rhs[pos] = self._lookahead(pos)
+
+                self._update(pos)
@@ -0,0 +1,312 @@
+"""
+Landmark(ALT) heuristics, precomputed for each tilemap.
+
+A* is only as quick as its heuristic is tight.
+Chebyshev distance ignores walls completely,
+so in maze like dungeons A* ends up expanding most of the tilemap.
+
+Instead, we pick a few landmark positions spread out over the tilemap,
+and store the distance from every position to each of them.
+By the triangle inequality, the distance from a position to the goal is at least
+the difference between their distances to any landmark,
+which is usually far tighter than the straight line distance.
+
+Landmarks are optional, and are attached to a tilemap by setting 'BaseTileMap.landmarks'.
+Searches that are given our heuristic expand far fewer positions,
+and find paths just as short.
+
+We currently have the following:
+
+    > LandmarkIndex - Landmark distance tables bound to a tilemap
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from engine.pathfinding.dstar import chebyshev
+from engine.pathfinding.wavefront import distance_map, UNREACHABLE
+
+
+def _build(passable, costs, count):
+
+    """
+    Picks landmarks and builds their distance tables.
+
+    Landmarks are picked by farthest point sampling,
+    each new landmark is the position furthest away from the ones we already have.
+    This runs off the main thread, so we only ever work with the given snapshots.
+
+    :param passable: Passability grid snapshot
+    :type passable: np.ndarray
+    :param costs: Cost grid snapshot, None if every move costs 1
+    :type costs: np.ndarray, None
+    :param count: Number of landmarks to pick
+    :type count: int
+    :return: List of landmark positions, and a list of distance tables(lists of rows)
+    :rtype: tuple
+    """
+
+    free = np.argwhere(passable)
+
+    if free.size == 0:
+
+        return [], []
+
+    # Start from the position furthest away from the middle passable position:
+
+    y, x = free[len(free) // 2]
+    dist = distance_map(passable, [(int(x), int(y))], costs=costs)
+
+    nearest = np.where(dist == UNREACHABLE, -1, dist)
+
+    landmarks = []
+    tables = []
+
+    for _ in range(count):
+
+        y, x = np.unravel_index(np.argmax(nearest), nearest.shape)
+
+        if nearest[y, x] <= 0 and landmarks:
+
+            # Every position is already a landmark, or next to one:
+
+            break
+
+        landmark = (int(x), int(y))
+        dist = distance_map(passable, [landmark], costs=costs)
+
+        landmarks.append(landmark)
+        tables.append(dist.tolist())
+
+        if len(landmarks) == 1:
+
+            nearest = np.where(dist == UNREACHABLE, -1, dist)
+
+        else:
+
+            nearest = np.where(dist == UNREACHABLE, nearest, np.minimum(nearest, dist))
+
+    return landmarks, tables
+
+
+class LandmarkIndex(object):
+
+    """
+    LandmarkIndex - Landmark distance tables bound to a tilemap.
+
+    We watch the tilemap for passability and cost changes,
+    and rebuild our tables in a background thread when they happen.
+    Until the rebuild is done, we keep handing out the old tables,
+    as blocking positions or raising costs can only make paths longer,
+    so the old tables still never overestimate.
+    If a position opened up or got cheaper, the old tables may overestimate,
+    so searches fall back to chebyshev distance until the rebuild is done.
+    """
+
+    def __init__(self, tilemap, count=8, background=True):
+
+        """
+        :param tilemap: Tilemap to build landmarks for
+        :type tilemap: BaseTileMap
+        :param count: Number of landmarks to pick
+        :type count: int
+        :param background: Determines if rebuilds run in a background thread
+        :type background: bool
+        """
+
+        self.tilemap = tilemap  # Tilemap we build landmarks for
+        self.count = count  # Number of landmarks to pick
+        self.background = background  # Determines if rebuilds run in a background thread
+
+        self.landmarks = []  # Positions of the landmarks
+        self.tables = []  # Distance to each landmark, as lists of rows
+        self.builds = 0  # Number of times the tables have been built
+
+        self._snapshot = None  # Versions, passability grid, and cost grid the tables are being built against
+        self._built = None  # Versions the current tables were built against
+        self._stale = True  # Determines if the tilemap changed since the tables were built
+        self._loose = True  # Determines if the current tables may overestimate
+        self._symmetric = True  # Determines if the current tables were built without move costs
+        self._pool = None  # Background thread, created the first time we need it
+        self._future = None  # Rebuild in progress
+
+        tilemap.watch(self._notify, costs=True)
+
+    def close(self):
+
+        """
+        Stops listening to the tilemap, and shuts down our background thread.
+        """
+
+        self.tilemap.unwatch(self._notify)
+
+        if self._pool is not None:
+
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+            self._pool = None
+
+    def ready(self):
+
+        """
+        Brings our tables up to date, as far as we can without waiting.
+
+        We adopt any rebuild that finished, and start a new one if the tilemap changed.
+        Without a background thread, we simply rebuild right here.
+
+        :return: True if our tables can be used as a heuristic
+        :rtype: bool
+        """
+
+        if self._future is not None and self._future.done():
+
+            self._adopt(self._future.result())
+
+        if self._stale and self._future is None:
+
+            self._start()
+
+        return bool(self.tables) and not self._loose
+
+    def heuristic(self, goal):
+
+        """
+        Gets a heuristic function for searches heading to the given goal.
+
+        The function takes a position, and returns a lower bound on its distance to the goal.
+        We take the largest bound over every landmark, and never go below chebyshev distance.
+
+        :param goal: Position the search is heading to
+        :type goal: tuple
+        :return: Heuristic function, or None if our tables are not usable right now
+        :rtype: function, None
+        """
+
+        if not self.ready():
+
+            return None
+
+        symmetric = self._symmetric
+
+        # Only keep the landmarks the goal can reach:
+
+        pairs = [(table, table[goal[1]][goal[0]]) for table in self.tables
+                 if table[goal[1]][goal[0]] != UNREACHABLE]
+
+        def estimate(pos):
+
+            best = chebyshev(pos, goal)
+
+            for table, towards in pairs:
+
+                value = table[pos[1]][pos[0]]
+
+                if value == UNREACHABLE:
+
+                    continue
+
+                # With move costs, distances are one way, so only one bound holds:
+
+                bound = abs(value - towards) if symmetric else value - towards
+
+                if bound > best:
+
+                    best = bound
+
+            return best
+
+        return estimate
+
+    def _start(self):
+
+        """
+        Starts rebuilding our tables against the current state of the tilemap.
+        """
+
+        passable = self.tilemap.passability()
+        costs = self.tilemap.cost_grid()
+
+        self._snapshot = ((self.tilemap.version, self.tilemap.cost_version), passable, costs)
+        self._stale = False
+
+        if not self.background:
+
+            self._adopt(_build(passable, costs, self.count))
+
+            return
+
+        if self._pool is None:
+
+            self._pool = ThreadPoolExecutor(max_workers=1)
+
+        self._future = self._pool.submit(_build, passable, costs, self.count)
+
+    def _adopt(self, result):
+
+        """
+        Starts using freshly built tables.
+        """
+
+        self.landmarks, self.tables = result
+        self.builds += 1
+
+        self._built = self._snapshot[0]
+        self._symmetric = self._snapshot[2] is None
+        self._future = None
+
+        # The tilemap may have changed while we were building:
+
+        self._loose = self._built != (self.tilemap.version, self.tilemap.cost_version) and self._loosened()
+
+    def _loosened(self):
+
+        """
+        Determines if any position opened up or got cheaper since our snapshot.
+
+        We only get here when a change happened during a rebuild, so we compare the whole grid.
+        """
+
+        _, passable, old = self._snapshot
+        costs = self.tilemap.cost_grid()
+
+        if np.any(self.tilemap.passability() & ~passable):
+
+            return True
+
+        if old is None:
+
+            return False
+
+        return costs is None or bool(np.any(costs < old))
+
+    def _notify(self, x, y):
+
+        """
+        Callback invoked by the tilemap when a position changes passability or cost.
+
+        :param x: X cordnet
+        :type x: int
+        :param y: Y cordnet
+        :type y: int
+        """
+
+        self._stale = True
+
+        if self._loose or not self.tables:
+
+            return
+
+        _, passable, costs = self._snapshot
+
+        if self.tilemap.is_passable(x, y) and not passable[y, x]:
+
+            # Position opened up, paths may have gotten shorter:
+
+            self._loose = True
+
+        elif self.tilemap.move_cost(x, y) < (1 if costs is None else costs[y, x]):
+
+            # Position got cheaper:
+
+            self._loose = True
@@ -0,0 +1,329 @@
+"""
+Cooperative pathfinding using a space-time reservation table.
+
+When many trackers close in on the same target, they all want the same positions.
+Planning each path on its own means they bump into each other,
+fail to move, and replan over and over.
+
+Instead, trackers planning in the same round share a reservation table.
+Each tracker plans a short window of moves through space and time(windowed hierarchical cooperative A*),
+avoiding positions other trackers have already claimed for that round,
+and then claims the positions along its own route.
+Waiting in place is a valid move, so crowds queue up and flow instead of colliding.
+
+Past the window, we simply trust the distance to the goal,
+which is taken from a distance map shared by every tracker heading to the same goal.
+
+Tables are optional, and are attached to a tilemap by setting 'BaseTileMap.reservations'.
+The tilemap updates the table at the start of each round.
+
+We currently have the following:
+
+    > ReservationTable - Space-time reservations, and cooperative planning against them
+"""
+
+import heapq
+
+from engine.pathfinding.dstar import NEIGHBORS, chebyshev
+from engine.pathfinding.wavefront import distance_map, UNREACHABLE
+
+# Moves allowed each round, waiting in place included:
+
+MOVES = ((0, 0),) + NEIGHBORS
+
+
+class ReservationTable(object):
+
+    """
+    ReservationTable - Space-time reservations, and cooperative planning against them.
+
+    Reservations are stored as (x, y, round) mapped to the owner that claimed it.
+    Owners are usually the autoruns doing the planning,
+    and each owner only ever holds the reservations of its latest route.
+    """
+
+    def __init__(self, tilemap, window=8):
+
+        """
+        :param tilemap: Tilemap to plan on
+        :type tilemap: BaseTileMap
+        :param window: Number of rounds each route looks ahead
+        :type window: int
+        """
+
+        self.tilemap = tilemap  # Tilemap we plan on
+        self.window = window  # Number of rounds each route looks ahead
+        self.tick = 0  # Number of rounds we have been updated
+
+        self.waits = 0  # Number of routes that had to wait or detour around a reservation this round
+
+        self._cells = {}  # Owner of each reserved (x, y, round)
+        self._owned = {}  # Reservations held by each owner
+        self._maps = {}  # Distance maps for each goal, along with the versions they were built at
+
+    def update(self):
+
+        """
+        Method invoked by the tilemap at the start of each round.
+
+        We move on to the next round, and forget about reservations in the past.
+        """
+
+        self.tick += 1
+        self.waits = 0
+
+        for owner, keys in list(self._owned.items()):
+
+            keep = [key for key in keys if key[2] >= self.tick]
+
+            for key in keys:
+
+                if key[2] < self.tick and self._cells.get(key) is owner:
+
+                    del self._cells[key]
+
+            if keep:
+
+                self._owned[owner] = keep
+
+            else:
+
+                del self._owned[owner]
+
+    def owner(self, x, y, tick):
+
+        """
+        Gets the owner of a reservation.
+
+        :param x: X cordnet
+        :type x: int
+        :param y: Y cordnet
+        :type y: int
+        :param tick: Round to check
+        :type tick: int
+        :return: Owner of the reservation, None if nobody claimed it
+        :rtype: object, None
+        """
+
+        return self._cells.get((x, y, tick))
+
+    def release(self, owner):
+
+        """
+        Drops every reservation held by an owner.
+
+        Be sure to call this when a tracker is removed,
+        so others don't route around a ghost!
+
+        :param owner: Owner to release
+        :type owner: object
+        """
+
+        for key in self._owned.pop(owner, ()):
+
+            if self._cells.get(key) is owner:
+
+                del self._cells[key]
+
+    def reserve(self, owner, route):
+
+        """
+        Claims the positions along a route, replacing any previous reservations of the owner.
+
+        The first position of the route is claimed for this round, the second for the next, and so on.
+        The last position is also claimed for the round after, so others don't walk into us when we stop.
+
+        :param owner: Owner making the claim
+        :type owner: object
+        :param route: List of positions, one for each round starting with this one
+        :type route: list
+        """
+
+        self.release(owner)
+
+        keys = [(pos[0], pos[1], self.tick + num) for num, pos in enumerate(route)]
+
+        if route:
+
+            keys.append((route[-1][0], route[-1][1], self.tick + len(route)))
+
+        for key in keys:
+
+            self._cells[key] = owner
+
+        self._owned[owner] = keys
+
+    def plan(self, owner, start, goal, free=None):
+
+        """
+        Plans and reserves a route towards the goal, avoiding the reservations of others.
+
+        We search through space and time for 'window' rounds,
+        where each round we can move to a position around us or wait where we are.
+        A move is not allowed onto a position someone else reserved for that round,
+        or onto a position whose owner is moving onto ours(we would swap through each other).
+
+        The route stops once we are next to the goal, as the goal is usually where our target is standing.
+        Our move this round must also pass the 'free' check if given,
+        as positions can be occupied by entities that have not moved yet.
+
+        :param owner: Owner planning the route
+        :type owner: object
+        :param start: Position we are at
+        :type start: tuple
+        :param goal: Position we are heading to
+        :type goal: tuple
+        :param free: Callable taking (x, y) that determines if we can move there right now
+        :type free: function, None
+        :return: List of positions, one for each round starting with this one. Empty if the goal can't be reached
+        :rtype: list
+        """
+
+        dist, costs = self._distances(goal)
+
+        if dist[start[1]][start[0]] == UNREACHABLE:
+
+            self.release(owner)
+
+            return []
+
+        width = self.tilemap.width
+        height = self.tilemap.height
+
+        came = {(start, 0): None}  # State we came from for each (position, round) state
+        cost = {(start, 0): 0}  # Best known cost to reach each state
+
+        heap = [(dist[start[1]][start[0]], 0, start, 0)]
+        final = (start, 0)
+
+        while heap:
+
+            _, g, pos, step = heapq.heappop(heap)
+
+            if step == self.window or chebyshev(pos, goal) <= 1:
+
+                # Out of window, or next to the goal:
+
+                final = (pos, step)
+                break
+
+            if g > cost[(pos, step)]:
+
+                continue
+
+            tick = self.tick + step
+
+            for dx, dy in MOVES:
+
+                x = pos[0] + dx
+                y = pos[1] + dy
+
+                if not (0 <= x < width and 0 <= y < height) or dist[y][x] == UNREACHABLE or (x, y) == goal:
+
+                    continue
+
+                if not self._allowed(owner, pos, (x, y), tick):
+
+                    continue
+
+                if step == 0 and (dx or dy) and free is not None and not free(x, y):
+
+                    continue
+
+                state = ((x, y), step + 1)
+                new = g + (costs[y][x] if costs is not None and (dx or dy) else 1)
+
+                if new < cost.get(state, new + 1):
+
+                    cost[state] = new
+                    came[state] = (pos, step)
+
+                    heapq.heappush(heap, (new + dist[y][x], new, (x, y), step + 1))
+
+        route = []
+
+        while final is not None:
+
+            route.append(final[0])
+            final = came[final]
+
+        route.reverse()
+
+        if len(route) > 1 and route[1] == start:
+
+            # We are waiting on someone:
+
+            self.waits += 1
+
+        self.reserve(owner, route)
+
+        return route[1:] or [start]
+
+    def _allowed(self, owner, a, b, tick):
+
+        """
+        Determines if we can move from one position to another during a round.
+
+        :param owner: Owner making the move
+        :type owner: object
+        :param a: Position we are moving from, at the given round
+        :type a: tuple
+        :param b: Position we are moving to, at the round after
+        :type b: tuple
+        :param tick: Round we are moving from
+        :type tick: int
+        :return: True if the move doesn't run into anyone else
+        :rtype: bool
+        """
+
+        other = self._cells.get((b[0], b[1], tick + 1))
+
+        if other is not None and other is not owner:
+
+            # Someone will be standing there:
+
+            return False
+
+        if a == b:
+
+            return True
+
+        other = self._cells.get((b[0], b[1], tick))
+
+        # Make sure we don't swap places with someone:
+
+        return other is None or other is owner or self._cells.get((a[0], a[1], tick + 1)) is not other
+
+    def _distances(self, goal):
+
+        """
+        Gets the distance map for a goal as lists, along with the move costs it was built with.
+
+        Maps are shared by every route heading to the same goal,
+        and are only rebuilt when the passability or cost version of the tilemap changes.
+
+        :param goal: Position to measure distance from
+        :type goal: tuple
+        :return: Distance map as a list of rows, and the costs as a list of rows(None if unweighted)
+        :rtype: tuple
+        """
+
+        versions = (self.tilemap.version, self.tilemap.cost_version)
+        cached = self._maps.get(goal)
+
+        if cached is None or cached[0] != versions:
+
+            grid = self.tilemap.cost_grid()
+            dist = distance_map(self.tilemap.passability(), [goal], costs=grid).tolist()
+
+            cached = (versions, dist, None if grid is None else grid.tolist())
+
+            if len(self._maps) > 16:
+
+                # Goals move around, don't hold onto old ones forever:
+
+                self._maps.clear()
+
+            self._maps[goal] = cached
+
+        return cached[1], cached[2]
@@ -0,0 +1,205 @@
+"""
+Plain A* searches over a passability grid.
+
+Unlike the planners bound to a tilemap, these searches only need a grid,
+so they can be shipped anywhere(such as another process) and ran there.
+
+The grid is a list of rows, where each row is a list of booleans marking passable positions.
+Move costs, if any, are given the same way(see 'BaseTileMap.move_cost()').
+Lists are used instead of NumPy arrays,
+as reading single positions from python lists is much faster.
+
+We currently have the following:
+
+    > search - Resumable A* search, which can be spread out over many rounds
+    > astar - Finds the shortest path between two positions
+"""
+
+import heapq
+
+from engine.pathfinding.dstar import NEIGHBORS, chebyshev
+
+
+def search(grid, start, goal, budget=None, costs=None, heuristic=None, stats=None):
+
+    """
+    Resumable A* search between two positions.
+
+    This is a generator, so a long search can be spread out over many rounds.
+    Every 'budget' expansions we pause, and yield the path to the best position found so far
+    (the expanded position closest to the goal), so entities have somewhere to head in the meantime.
+    Once the search is done, the full path is returned through 'StopIteration.value'.
+
+    Moves are allowed in all eight directions.
+    Each costs 1, unless move costs are given, in which case moving onto a position costs its move cost.
+    The goal is allowed to be blocked(it is usually where our target is standing).
+
+    By default, we estimate the distance to the goal with chebyshev distance.
+    A tighter heuristic(such as 'LandmarkIndex.heuristic()') can be given instead,
+    as long as it never overestimates.
+
+    :param grid: List of rows of booleans, True where passable
+    :type grid: list
+    :param start: Position to start at
+    :type start: tuple
+    :param goal: Position to reach
+    :type goal: tuple
+    :param budget: Number of expansions between each pause, None to never pause
+    :type budget: int, None
+    :param costs: List of rows of move costs(at least 1), None if every move costs 1
+    :type costs: list, None
+    :param heuristic: Callable taking a position and estimating its distance to the goal
+    :type heuristic: function, None
+    :param stats: Dictionary we keep the number of positions 'expanded' in, for benchmarking
+    :type stats: dict, None
+    :return: List of positions from the start to the goal, not including the start. Empty if unreachable
+    :rtype: list
+    """
+
+    if stats is None:
+
+        stats = {}
+
+    if heuristic is None:
+
+        def heuristic(pos):
+
+            return chebyshev(pos, goal)
+
+    height = len(grid)
+    width = len(grid[0])
+
+    came = {start: None}  # Position we came from for each position
+    cost = {start: 0}  # Best known cost to reach each position
+
+    heap = [(heuristic(start), 0, start)]
+
+    best = start  # Expanded position closest to the goal
+    closest = chebyshev(start, goal)
+    expanded = 0
+
+    while heap:
+
+        _, g, pos = heapq.heappop(heap)
+
+        if pos == goal:
+
+            # Found it, walk back to the start:
+
+            stats['expanded'] = expanded
+
+            return _walk(came, start, pos)
+
+        if g > cost[pos]:
+
+            # Stale entry, we already found a better way here:
+
+            continue
+
+        if budget is not None and expanded and expanded % budget == 0:
+
+            # Out of budget, let the caller know where we are at:
+
+            stats['expanded'] = expanded
+
+            yield _walk(came, start, best)
+
+        expanded += 1
+
+        if chebyshev(pos, goal) < closest:
+
+            best = pos
+            closest = chebyshev(pos, goal)
+
+        for dx, dy in NEIGHBORS:
+
+            x = pos[0] + dx
+            y = pos[1] + dy
+
+            if not (0 <= x < width and 0 <= y < height):
+
+                continue
+
+            near = (x, y)
+
+            if not grid[y][x] and near != goal:
+
+                continue
+
+            new = g + (costs[y][x] if costs is not None else 1)
+
+            if new < cost.get(near, new + 1):
+
+                cost[near] = new
+                came[near] = pos
+
+                heapq.heappush(heap, (new + heuristic(near), new, near))
+
+    # Could not reach the goal:
+
+    stats['expanded'] = expanded
+
+    return []
+
+
+def astar(grid, start, goal, costs=None, heuristic=None, stats=None):
+
+    """
+    Finds the shortest path between two positions using A*.
+
+    This simply runs 'search()' to completion.
+
+    :param grid: List of rows of booleans, True where passable
+    :type grid: list
+    :param start: Position to start at
+    :type start: tuple
+    :param goal: Position to reach
+    :type goal: tuple
+    :param costs: List of rows of move costs(at least 1), None if every move costs 1
+    :type costs: list, None
+    :param heuristic: Callable taking a position and estimating its distance to the goal
+    :type heuristic: function, None
+    :param stats: Dictionary we keep the number of positions 'expanded' in, for benchmarking
+    :type stats: dict, None
+    :return: List of positions from the start to the goal, not including the start. Empty if unreachable
+    :rtype: list
+    """
+
+    gen = search(grid, start, goal, costs=costs, heuristic=heuristic, stats=stats)
+
+    try:
+
+        while True:
+
+            next(gen)
+
+    except StopIteration as done:
+
+        return done.value
+
+
+def _walk(came, start, pos):
+
+    """
+    Walks back from a position to the start, and returns the path in order.
+
+    :param came: Position we came from for each position
+    :type came: dict
+    :param start: Position the search started at
+    :type start: tuple
+    :param pos: Position to walk back from
+    :type pos: tuple
+    :return: List of positions from the start to the position, not including the start
+    :rtype: list
+    """
+
+    final = []
+
+    while pos != start:
+
+        final.append(pos)
+        pos = came[pos]
+
+    final.reverse()
+
+    return final
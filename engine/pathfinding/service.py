@@ -0,0 +1,463 @@
+"""
+Pathfinding services that resolve path requests for autoruns.
+
+With hundreds of trackers, searching for paths inside each autorun
+eats up the thread that updates the tilemap.
+Instead, autoruns can submit their requests to a service,
+and pick up the path once it is ready, which may be a few rounds later.
+
+Services are optional, and are attached to a tilemap by setting 'BaseTileMap.paths'.
+The tilemap updates the service at the start of each round.
+
+We currently have the following:
+
+    > PathTicket - Handle representing a submitted request
+    > PathService - Base class all services must inherit
+    > ProcessPathService - Resolves requests in parallel using a process pool
+    > SlicedPathService - Advances many searches a little each round
+    > BatchedPathService - Answers every request for the same goal with one search
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+
+from engine.pathfinding.search import astar, search
+from engine.pathfinding.wavefront import distance_map, follow
+
+
+class PathTicket(object):
+
+    """
+    PathTicket - Handle representing a submitted path request.
+
+    Autoruns keep the ticket around, and check if it is done each round.
+    Once done, 'path' contains the positions to walk through,
+    not including the start, and is empty if the goal can't be reached.
+    """
+
+    def __init__(self, start, goal):
+
+        self.start = start  # Position to search from
+        self.goal = goal  # Position to search to
+        self.path = None  # Resolved path, None until we are done
+        self.partial = []  # Path to the best position found so far, for searches still in flight
+        self.done = False  # Determines if the request has been resolved
+
+        self.submitted = 0  # Round the request was submitted in
+        self.finished = 0  # Round the request was resolved in
+        self.version = 0  # Passability version the path was computed against
+
+    def resolve(self, path, tick, version):
+
+        """
+        Marks the ticket as done with the given path.
+
+        :param path: List of positions to walk through
+        :type path: list
+        :param tick: Round we were resolved in
+        :type tick: int
+        :param version: Passability version the path was computed against
+        :type version: int
+        """
+
+        self.path = path
+        self.finished = tick
+        self.version = version
+        self.done = True
+
+
+class PathService(object):
+
+    """
+    PathService - Base class all path services will inherit!
+
+    We keep a queue of pending tickets,
+    and child services define how they are resolved in 'update()'.
+    """
+
+    def __init__(self, tilemap):
+
+        self.tilemap = tilemap  # Tilemap we resolve paths on
+        self.tick = 0  # Number of rounds we have been updated
+
+        self._pending = []  # Tickets waiting to be handled
+
+    def submit(self, start, goal):
+
+        """
+        Submits a path request.
+
+        If the goal can't be reached, the ticket is resolved right away with an empty path.
+
+        :param start: Position to search from
+        :type start: tuple
+        :param goal: Position to search to
+        :type goal: tuple
+        :return: Ticket representing the request
+        :rtype: PathTicket
+        """
+
+        ticket = PathTicket(start, goal)
+        ticket.submitted = self.tick
+
+        if not self.tilemap.reachable(start, goal):
+
+            # Hopeless, no need to search:
+
+            ticket.resolve([], self.tick, self.tilemap.version)
+
+            return ticket
+
+        self._pending.append(ticket)
+
+        return ticket
+
+    def update(self):
+
+        """
+        Method invoked by the tilemap at the start of each round.
+
+        Your relevant code should be kept here.
+        i.e - The code that resolves the pending tickets.
+        """
+
+        raise NotImplementedError("Should be overridden in child class!")
+
+    def close(self):
+
+        """
+        Releases any resources held by the service.
+        """
+
+        pass
+
+
+def _solve(shape, packed, costs, requests):
+
+    """
+    Resolves a chunk of requests inside a worker process.
+
+    :param shape: Shape of the passability grid
+    :type shape: tuple
+    :param packed: Passability grid packed into bits
+    :type packed: bytes
+    :param costs: Move cost grid as raw 32 bit integers, None if every move costs 1
+    :type costs: bytes, None
+    :param requests: List of (start, goal) pairs
+    :type requests: list
+    :return: List of paths, one for each request
+    :rtype: list
+    """
+
+    height, width = shape
+
+    grid = np.unpackbits(np.frombuffer(packed, dtype=np.uint8), count=height * width).reshape(shape)
+    grid = grid.astype(bool).tolist()
+
+    if costs is not None:
+
+        costs = np.frombuffer(costs, dtype=np.int32).reshape(shape).tolist()
+
+    return [astar(grid, start, goal, costs) for start, goal in requests]
+
+
+class ProcessPathService(PathService):
+
+    """
+    ProcessPathService - Resolves path requests in parallel using a process pool.
+
+    Each round, we pack the passability grid into bits(one bit per position)
+    and ship it to the workers along with the pending requests, split into one chunk per worker.
+    If the tilemap has move costs, the cost grid is shipped along with it.
+    The grids are only packed again when the passability or cost version changes.
+
+    We then wait for the workers, but never longer than our deadline.
+    Anything that misses the deadline is handed back on a later round,
+    so the display loop never stalls waiting for paths.
+    """
+
+    def __init__(self, tilemap, workers=None, deadline=0.005):
+
+        """
+        :param tilemap: Tilemap to resolve paths on
+        :type tilemap: BaseTileMap
+        :param workers: Number of worker processes, defaults to the CPU count
+        :type workers: int, None
+        :param deadline: Maximum number of seconds to wait for results each round
+        :type deadline: float
+        """
+
+        super().__init__(tilemap)
+
+        self.workers = workers or os.cpu_count() or 1  # Number of worker processes
+        self.deadline = deadline  # Maximum number of seconds to wait each round
+
+        self._pool = None  # Process pool, created the first time we need it
+        self._running = {}  # Futures still being worked on, mapped to their tickets and version
+        self._snapshot = None  # Packed passability and cost grids, along with the versions they were built at
+
+    def update(self):
+
+        """
+        Dispatches pending requests, and waits for results until our deadline.
+        """
+
+        self.tick += 1
+
+        end = time.perf_counter() + self.deadline
+
+        if self._pending:
+
+            self._dispatch()
+
+        while self._running:
+
+            remaining = end - time.perf_counter()
+
+            if remaining <= 0:
+
+                # Out of time, we will pick up the rest next round:
+
+                break
+
+            done, _ = wait(self._running, timeout=remaining, return_when=FIRST_COMPLETED)
+
+            for future in done:
+
+                tickets, version = self._running.pop(future)
+
+                for ticket, path in zip(tickets, future.result()):
+
+                    ticket.resolve(path, self.tick, version)
+
+    def close(self):
+
+        """
+        Shuts down our process pool.
+
+        Any requests still running are dropped.
+        """
+
+        if self._pool is not None:
+
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+            self._pool = None
+
+        self._running.clear()
+
+    def _dispatch(self):
+
+        """
+        Splits the pending tickets into chunks and submits them to the pool.
+        """
+
+        if self._pool is None:
+
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+
+        version, shape, packed, costs = self._pack()
+
+        for num in range(self.workers):
+
+            tickets = self._pending[num::self.workers]
+
+            if not tickets:
+
+                continue
+
+            future = self._pool.submit(_solve, shape, packed, costs, [(ticket.start, ticket.goal) for ticket in tickets])
+
+            self._running[future] = (tickets, version)
+
+        self._pending = []
+
+    def _pack(self):
+
+        """
+        Packs the passability grid of the tilemap into bits, and the cost grid into bytes.
+
+        :return: Passability version, shape of the grid, the packed grid, and the packed costs(None if unweighted)
+        :rtype: tuple
+        """
+
+        versions = (self.tilemap.version, self.tilemap.cost_version)
+
+        if self._snapshot is None or self._snapshot[0] != versions:
+
+            grid = self.tilemap.passability()
+            costs = self.tilemap.cost_grid()
+
+            if costs is not None:
+
+                costs = costs.tobytes()
+
+            self._snapshot = (versions, grid.shape, np.packbits(grid).tobytes(), costs)
+
+        return (self.tilemap.version,) + self._snapshot[1:]
+
+
+class SlicedPathService(PathService):
+
+    """
+    SlicedPathService - Advances many searches a little each round.
+
+    Searches are ran as resumable generators(see 'search()'),
+    so a long search across a maze never freezes the round.
+    Each round we go through the searches in flight,
+    giving each one 'budget' expansions until we have spent 'total' expansions.
+    We start where we left off last round, so every search gets its turn.
+
+    While a search is in flight, its ticket holds the path to the best position found so far,
+    so entities can keep moving instead of standing still.
+
+    If the tilemap has landmarks, new searches use their heuristic,
+    which cuts down on expansions in maze like dungeons.
+    """
+
+    def __init__(self, tilemap, budget=64, total=2048):
+
+        """
+        :param tilemap: Tilemap to resolve paths on
+        :type tilemap: BaseTileMap
+        :param budget: Number of expansions each search gets at a time
+        :type budget: int
+        :param total: Number of expansions we can spend each round
+        :type total: int
+        """
+
+        super().__init__(tilemap)
+
+        self.budget = budget  # Number of expansions each search gets at a time
+        self.total = total  # Number of expansions we can spend each round
+
+        self._running = []  # Searches in flight, as (ticket, generator, version)
+        self._grid = None  # Passability and cost grids as lists, along with the versions they were built at
+
+    def update(self):
+
+        """
+        Starts pending searches, and advances the searches in flight until we are out of expansions.
+        """
+
+        self.tick += 1
+
+        if self._pending:
+
+            version, grid, costs = self._lists()
+
+            landmarks = self.tilemap.landmarks
+
+            for ticket in self._pending:
+
+                heuristic = None if landmarks is None else landmarks.heuristic(ticket.goal)
+                gen = search(grid, ticket.start, ticket.goal, self.budget, costs, heuristic)
+
+                self._running.append((ticket, gen, version))
+
+            self._pending = []
+
+        spent = 0
+
+        while self._running and spent < self.total:
+
+            ticket, gen, version = self._running.pop(0)
+
+            spent += self.budget
+
+            try:
+
+                ticket.partial = next(gen)
+
+            except StopIteration as done:
+
+                ticket.resolve(done.value, self.tick, version)
+
+                continue
+
+            # Not done yet, back of the line:
+
+            self._running.append((ticket, gen, version))
+
+    def _lists(self):
+
+        """
+        Gets the passability and cost grids of the tilemap as lists.
+
+        :return: Passability version, the grid as a list of rows, and the costs as a list of rows(None if unweighted)
+        :rtype: tuple
+        """
+
+        versions = (self.tilemap.version, self.tilemap.cost_version)
+
+        if self._grid is None or self._grid[0] != versions:
+
+            costs = self.tilemap.cost_grid()
+
+            if costs is not None:
+
+                costs = costs.tolist()
+
+            self._grid = (versions, self.tilemap.passability().tolist(), costs)
+
+        return (self.tilemap.version,) + self._grid[1:]
+
+
+class BatchedPathService(PathService):
+
+    """
+    BatchedPathService - Answers every request for the same goal with one search.
+
+    In crowded scenes, many entities ask for a path to the same goal(usually the player)
+    from neighboring positions in the same round.
+    Instead of searching once for each of them,
+    we group the pending requests by goal and build one distance map from each goal.
+    Every requester then simply walks downhill from its start.
+
+    All requests are resolved in the round they are handled.
+    """
+
+    def __init__(self, tilemap):
+
+        super().__init__(tilemap)
+
+        self.searches = 0  # Number of searches ran last round
+
+    def update(self):
+
+        """
+        Groups the pending requests by goal, and resolves each group with one search.
+        """
+
+        self.tick += 1
+
+        groups = {}
+
+        for ticket in self._pending:
+
+            groups.setdefault(ticket.goal, []).append(ticket)
+
+        self._pending = []
+        self.searches = len(groups)
+
+        if not groups:
+
+            return
+
+        passable = self.tilemap.passability()
+        costs = self.tilemap.cost_grid()
+        lists = None if costs is None else costs.tolist()
+
+        for goal, tickets in groups.items():
+
+            dist = distance_map(passable, [goal], costs=costs).tolist()
+            steps = {}  # Shared between the requesters, so overlapping paths are only walked once
+
+            for ticket in tickets:
+
+                path = follow(dist, *ticket.start, costs=lists, steps=steps)
+
+                ticket.resolve(path, self.tick, self.tilemap.version)
@@ -0,0 +1,199 @@
+"""
+Path smoothing using line of sight checks.
+
+Grid searches happily zig-zag, as every path with the same number of steps is just as short to them.
+Entities following such paths look like they are stumbling around.
+
+Smoothing pulls the path tight like a string:
+we skip ahead to the furthest position on the path we can see in a straight line,
+and walk the straight line(a Bresenham ray) there instead.
+A ray is never longer than the part of the path it replaces,
+so smoothed paths take at most as many steps as the original.
+
+Casting rays is the expensive part, so rays are cached for each (origin, target) pair,
+and thrown away once the passability version of the tilemap changes.
+
+We currently have the following:
+
+    > bresenham - Positions along a straight line between two positions
+    > LineOfSight - Cached line of sight checks bound to a tilemap
+    > smooth - Pulls a path tight
+"""
+
+
+def bresenham(a, b):
+
+    """
+    Gets the positions along a straight line between two positions.
+
+    :param a: Position to start at
+    :type a: tuple
+    :param b: Position to end at
+    :type b: tuple
+    :return: List of positions from the start to the end, not including the start
+    :rtype: list
+    """
+
+    x, y = a
+    dx = abs(b[0] - x)
+    dy = -abs(b[1] - y)
+    sx = 1 if b[0] > x else -1
+    sy = 1 if b[1] > y else -1
+    error = dx + dy
+
+    final = []
+
+    while (x, y) != b:
+
+        double = 2 * error
+
+        if double >= dy:
+
+            error += dy
+            x += sx
+
+        if double <= dx:
+
+            error += dx
+            y += sy
+
+        final.append((x, y))
+
+    return final
+
+
+class LineOfSight(object):
+
+    """
+    LineOfSight - Cached line of sight checks bound to a tilemap.
+
+    A ray is clear if every position between its ends is passable,
+    the ends themselves are not checked(the target is usually standing at one of them).
+    We cache the ray between each pair of positions, or None if it is blocked,
+    and clear the cache whenever the passability version of the tilemap changes.
+    """
+
+    def __init__(self, tilemap, limit=65536):
+
+        """
+        :param tilemap: Tilemap to check line of sight on
+        :type tilemap: BaseTileMap
+        :param limit: Maximum number of rays to cache
+        :type limit: int
+        """
+
+        self.tilemap = tilemap  # Tilemap we check line of sight on
+        self.limit = limit  # Maximum number of rays to cache
+
+        self.hits = 0  # Number of checks answered from the cache
+        self.casts = 0  # Number of rays cast
+
+        self._rays = {}  # Ray between each (origin, target) pair, None if blocked
+        self._version = tilemap.version  # Passability version our cache was built at
+
+    def ray(self, origin, target):
+
+        """
+        Gets the clear ray between two positions.
+
+        :param origin: Position to start at
+        :type origin: tuple
+        :param target: Position to end at
+        :type target: tuple
+        :return: List of positions to the target, not including the origin. None if the ray is blocked
+        :rtype: list, None
+        """
+
+        if self._version != self.tilemap.version or len(self._rays) >= self.limit:
+
+            # Out of date, or too big:
+
+            self._rays.clear()
+            self._version = self.tilemap.version
+
+        key = (origin, target)
+
+        if key in self._rays:
+
+            self.hits += 1
+
+            return self._rays[key]
+
+        self.casts += 1
+
+        final = bresenham(origin, target)
+
+        for x, y in final[:-1]:
+
+            if not self.tilemap.is_passable(x, y):
+
+                final = None
+                break
+
+        self._rays[key] = final
+
+        return final
+
+    def clear(self, origin, target):
+
+        """
+        Determines if there is a clear line of sight between two positions.
+
+        :param origin: Position to start at
+        :type origin: tuple
+        :param target: Position to end at
+        :type target: tuple
+        :return: True if nothing is in the way
+        :rtype: bool
+        """
+
+        return self.ray(origin, target) is not None
+
+
+def smooth(path, start, sight):
+
+    """
+    Pulls a path tight.
+
+    From each corner, we look ahead for the furthest position on the path we can see,
+    and replace everything in between with the straight ray there.
+
+    The start doesn't have to be on the path(such as when we moved since the path was found),
+    we simply head for the furthest position on the path we can see from it.
+    If we can't see any of the path, it is returned as is.
+
+    :param path: List of positions to walk through, not including the start
+    :type path: list
+    :param start: Position to start at
+    :type start: tuple
+    :param sight: Line of sight checker to use
+    :type sight: LineOfSight
+    :return: Smoothed list of positions, not including the start
+    :rtype: list
+    """
+
+    final = []
+    anchor = start
+    num = 0
+
+    while num < len(path):
+
+        # Find the furthest position we can see from our anchor.
+        # Positions next to each other can always see each other, so we only fail on the start:
+
+        far = num - 1
+
+        while far + 1 < len(path) and sight.clear(anchor, path[far + 1]):
+
+            far += 1
+
+        if far < num:
+
+            return path
+
+        final.extend(sight.ray(anchor, path[far]))
+
+        anchor = path[far]
+        num = far + 1
+
+    return final
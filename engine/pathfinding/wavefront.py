@@ -0,0 +1,511 @@
+"""
+Distance maps built with whole array wavefront expansion.
+
+A distance map stores the distance from every position to the closest goal.
+They are useful for a lot of things:
+
+    - Trackers can walk downhill to reach the goal
+    - Fleeing AI can walk uphill to get away from it
+    - Any position with a negative distance can't reach the goal at all
+
+Flooding the tilemap position by position in python is slow,
+so we expand the whole wavefront at once using NumPy.
+The passability grid is padded with a blocked border and flattened,
+so the neighbors of every position in the wavefront are simple index offsets.
+
+We still make one trip through python per wavefront, so how much we win depends on how wide it is.
+On 256x256 maps with open space, rooms or scattered walls,
+chebyshev maps come in at 6-12x faster than a breadth first search in plain python,
+and octile maps at 3-5x faster than a plain python Dijkstra.
+Move costs spread the distances out, and only just beat python.
+Mazes are the worst case, a wavefront a single position wide is slower than plain python!
+'python -m engine.pathfinding.benchmark --wavefront' measures all of this.
+
+We support the following metrics:
+
+    > 'manhattan' - Straight moves only, each costing 1
+    > 'chebyshev' - Straight and diagonal moves, each costing 1. This is how entities move!
+    > 'octile' - Straight moves cost 10, diagonal moves cost 14
+"""
+
+import numpy as np
+
+# Move costs for each metric, as (straight, diagonal).
+# A diagonal cost of None means diagonal moves are not allowed:
+
+METRICS = {
+    'manhattan': (1, None),
+    'chebyshev': (1, 1),
+    'octile': (10, 14),
+}
+
+UNREACHABLE = -1  # Distance given to positions that can't reach a goal
+
+
+def distance_map(passable, goals, metric='chebyshev', limit=None, costs=None):
+
+    """
+    Builds a distance map from the given goals.
+
+    With unit costs this is a plain breadth first wavefront,
+    and with weighted costs we run Dial's algorithm(a bucketed Dijkstra).
+    Either way, each wavefront or bucket is expanded as a whole array.
+    See the top of this file for how this compares to searching in plain python.
+
+    Goals are always given a distance of 0, even if they are not passable,
+    so you can use the position of a blocked target as a goal.
+
+    If move costs are given(see 'BaseTileMap.cost_grid()'),
+    the cost of each move is multiplied by the cost of the position moved onto.
+    Distance maps are built outwards from the goals,
+    so this measures the cost of walking from each position to the goal.
+
+    :param passable: 2D boolean array(height, width) marking traversable positions
+    :type passable: np.ndarray
+    :param goals: List of (x, y) positions to measure distance from
+    :type goals: list
+    :param metric: Name of the metric to use, see METRICS
+    :type metric: str
+    :param limit: Maximum distance to expand to, positions further away are unreachable
+    :type limit: int, None
+    :param costs: 2D integer array(height, width) of move costs, None if every move costs the same
+    :type costs: np.ndarray, None
+    :return: 2D integer array(height, width) of distances, UNREACHABLE where the goals can't be reached
+    :rtype: np.ndarray
+    """
+
+    straight, diagonal = METRICS[metric]
+
+    height, width = passable.shape
+    stride = width + 2
+
+    # Pad the grid with a blocked border, so we never have to bounds check:
+
+    free = np.zeros((height + 2, stride), dtype=bool)
+    free[1:-1, 1:-1] = passable
+    free = free.ravel()
+
+    dist = np.full(free.shape, UNREACHABLE, dtype=np.int32)
+    owner = np.empty(free.shape, dtype=np.int64)
+
+    # Determine the neighbor offsets for each cost:
+
+    steps = [(straight, np.array([-stride, -1, 1, stride]))]
+
+    if diagonal is not None:
+
+        steps.append((diagonal, np.array([-stride - 1, -stride + 1, stride - 1, stride + 1])))
+
+    if diagonal == straight:
+
+        # Every move costs the same, merge the offsets:
+
+        steps = [(straight, np.concatenate([offsets for _, offsets in steps]))]
+
+    # Place our goals:
+
+    front = np.unique(np.array([(y + 1) * stride + x + 1 for x, y in goals], dtype=np.int64))
+
+    dist[front] = 0
+    free[front] = False
+
+    weight = None
+
+    if costs is not None:
+
+        # Pad the costs the same way as the grid:
+
+        weight = np.ones((height + 2, stride), dtype=np.int32)
+        weight[1:-1, 1:-1] = costs
+        weight = weight.ravel()
+
+    if len(steps) == 1 and weight is None:
+
+        _wavefront(free, dist, owner, front, steps[0], limit)
+
+    else:
+
+        _buckets(free, dist, owner, front, steps, limit, weight)
+
+        if limit is not None:
+
+            # Positions past the limit may have been given a distance, but were never expanded:
+
+            dist[dist > limit] = UNREACHABLE
+
+    return dist.reshape(height + 2, stride)[1:-1, 1:-1].copy()
+
+
+def _unique(near, owner):
+
+    """
+    Removes duplicate positions from an array of flat indices.
+
+    Each position records the index of the last entry that wrote to it,
+    and only that entry is kept.
+    This is much cheaper than sorting the array with 'np.unique()'.
+
+    :param near: Array of flat indices
+    :type near: np.ndarray
+    :param owner: Scratch array as large as the padded grid
+    :type owner: np.ndarray
+    :return: Array of unique flat indices
+    :rtype: np.ndarray
+    """
+
+    order = np.arange(near.size)
+
+    owner[near] = order
+
+    return near[owner[near] == order]
+
+
+def _wavefront(free, dist, owner, front, step, limit):
+
+    """
+    Breadth first wavefront expansion, used when every move costs the same.
+
+    Positions are marked as taken as soon as the wavefront reaches them,
+    so each one is only ever visited once.
+    """
+
+    cost, offsets = step
+    current = 0
+
+    while front.size:
+
+        current += cost
+
+        if limit is not None and current > limit:
+
+            return
+
+        near = (front[:, None] + offsets).ravel()
+        near = near[free[near]]
+
+        if near.size == 0:
+
+            return
+
+        near = _unique(near, owner)
+
+        free[near] = False
+        dist[near] = current
+
+        front = near
+
+
+def _buckets(free, dist, owner, seeds, steps, limit, weight=None):
+
+    """
+    Dial's algorithm, used when moves have different costs.
+
+    Positions are kept in buckets by distance, and the closest bucket is expanded each time.
+    We start from the given seeds, flat indices that already have their starting distance.
+    A position may be placed into a bucket and improved later,
+    such entries are skipped when the bucket is expanded.
+
+    Giving every distance its own bucket costs a trip through python for each one,
+    which is most of them with the octile metric(moves cost 10 and 14).
+    Instead, each bucket holds a window of distances as wide as the cheapest move.
+    Nothing in a window can improve anything else in it,
+    so the whole window is final at once, and we make about as many trips as a breadth first wavefront.
+
+    If a weight is given, each move cost is multiplied by the weight of the position moved onto
+    (the position we are expanding from, as we are walking backwards),
+    so the positions reached from one window may land in many buckets.
+    """
+
+    # Expand every move at once, with the cost of each offset lined up next to it:
+
+    offsets = np.concatenate([part for _, part in steps])
+    costs = np.concatenate([np.full(part.size, cost, dtype=np.int64) for cost, part in steps])
+
+    # Cheapest move we can make, which is how wide each window can be:
+
+    width = int(costs.min())
+
+    if weight is not None:
+
+        width *= max(1, int(weight.min()))
+
+    buckets = {}
+
+    _file(buckets, seeds, dist[seeds] // width)
+
+    while buckets:
+
+        # Expand the closest window:
+
+        window = min(buckets)
+
+        if limit is not None and window * width > limit:
+
+            return
+
+        front = np.concatenate(buckets.pop(window))
+        front = front[dist[front] // width == window]
+
+        if limit is not None:
+
+            front = front[dist[front] <= limit]
+
+        if front.size == 0:
+
+            continue
+
+        front = _unique(front, owner)
+
+        # These positions are final, nothing can improve them:
+
+        free[front] = False
+
+        near = (front[:, None] + offsets).ravel()
+
+        if weight is None:
+
+            new = (dist[front][:, None] + costs).ravel()
+
+        else:
+
+            # Walking from the new position to the goal means moving onto the one we came from:
+
+            new = (dist[front][:, None] + costs * weight[front][:, None]).ravel()
+
+        keep = free[near]
+
+        near = near[keep]
+        new = new[keep]
+
+        old = dist[near]
+        better = (old == UNREACHABLE) | (old > new)
+
+        near = near[better]
+        new = new[better]
+
+        if near.size == 0:
+
+            continue
+
+        # Sort so the lowest distance wins when a position is reached more than once:
+
+        order = np.argsort(new, kind='stable')[::-1]
+        near = near[order]
+        new = new[order]
+
+        dist[near] = new
+
+        _file(buckets, near, new // width)
+
+
+def _file(buckets, near, windows):
+
+    """
+    Files positions into the buckets of the given windows.
+
+    Positions that lost out to a lower distance are filed as well,
+    they are skipped when their window is expanded.
+    A single expansion only reaches a few windows, so we simply check each one.
+    """
+
+    for window in range(int(windows.min()), int(windows.max()) + 1):
+
+        part = near[windows == window]
+
+        if part.size:
+
+            buckets.setdefault(window, []).append(part)
+
+
+def relax(passable, values, costs=None, scale=1):
+
+    """
+    Lowers the given values until no position is more than a move higher than its neighbors.
+
+    Each passable position ends up with the lowest of its own value,
+    and the value of any other position plus the cost of walking from here to there.
+    This is Dijkstra's algorithm started from every position at once,
+    and is what turns a combination of distance maps back into something entities can walk downhill on.
+    For example, a negated distance map(fleeing) would otherwise lead entities into corners.
+
+    Moves are allowed in all eight directions, and cost 'scale' times the move cost of the position moved onto.
+    Impassable positions keep their value, and are never walked through.
+
+    :param passable: 2D boolean array(height, width) marking traversable positions
+    :type passable: np.ndarray
+    :param values: 2D integer array(height, width) of starting values, may be negative
+    :type values: np.ndarray
+    :param costs: 2D integer array(height, width) of move costs, None if every move costs the same
+    :type costs: np.ndarray, None
+    :param scale: Cost of a move onto a position with a move cost of 1
+    :type scale: int
+    :return: 2D integer array(height, width) of relaxed values
+    :rtype: np.ndarray
+    """
+
+    height, width = passable.shape
+    stride = width + 2
+
+    final = np.array(values, dtype=np.int64)
+
+    if not passable.any():
+
+        return final
+
+    # Shift the values so the lowest is 0, as our buckets can't go negative:
+
+    low = int(final[passable].min())
+
+    free = np.zeros((height + 2, stride), dtype=bool)
+    free[1:-1, 1:-1] = passable
+    free = free.ravel()
+
+    dist = np.full(free.shape, UNREACHABLE, dtype=np.int64)
+    dist.reshape(height + 2, stride)[1:-1, 1:-1][passable] = final[passable] - low
+
+    weight = np.full((height + 2, stride), scale, dtype=np.int64)
+
+    if costs is not None:
+
+        weight[1:-1, 1:-1] = costs * scale
+
+    offsets = np.array([-stride - 1, -stride, -stride + 1, -1, 1, stride - 1, stride, stride + 1])
+
+    # Every passable position starts with its own value:
+
+    _buckets(free, dist, np.empty(free.shape, dtype=np.int64), np.flatnonzero(free), [(1, offsets)], None, weight.ravel())
+
+    final[passable] = dist.reshape(height + 2, stride)[1:-1, 1:-1][passable] + low
+
+    return final
+
+
+def descend(dist, x, y, metric='chebyshev', costs=None):
+
+    """
+    Gets the neighboring position that leads to the goal the quickest.
+
+    This is how a tracker follows a distance map to its goal.
+    We pick the neighbor with the lowest distance plus the cost of moving onto it,
+    so the metric and move costs the map was built with must be given here as well.
+    Unreachable positions are never chosen.
+
+    The distance map and costs can be NumPy arrays, or lists of rows.
+
+    :param dist: Distance map from 'distance_map()'
+    :type dist: np.ndarray, list
+    :param x: X cordnet to start at
+    :type x: int
+    :param y: Y cordnet to start at
+    :type y: int
+    :param metric: Name of the metric the map was built with
+    :type metric: str
+    :param costs: Move costs the map was built with, None if every move costs the same
+    :type costs: np.ndarray, list, None
+    :return: Position to move to, or None if no neighbor is closer
+    :rtype: tuple, None
+    """
+
+    straight, diagonal = METRICS[metric]
+
+    height = len(dist)
+    width = len(dist[0])
+
+    current = dist[y][x]
+
+    best = None
+    lowest = None
+
+    for near_y in range(max(y - 1, 0), min(y + 2, height)):
+
+        row = dist[near_y]
+
+        for near_x in range(max(x - 1, 0), min(x + 2, width)):
+
+            value = row[near_x]
+
+            if value == UNREACHABLE or (current != UNREACHABLE and value >= current):
+
+                continue
+
+            step = straight if near_x == x or near_y == y else diagonal
+
+            if step is None:
+
+                # Diagonal moves are not allowed:
+
+                continue
+
+            if costs is not None:
+
+                step *= costs[near_y][near_x]
+
+            if lowest is None or value + step < lowest:
+
+                best = (near_x, near_y)
+                lowest = value + step
+
+    return best
+
+
+def follow(dist, x, y, metric='chebyshev', costs=None, steps=None):
+
+    """
+    Follows a distance map downhill until we reach a goal.
+
+    The distance map and costs can be NumPy arrays, or lists of rows.
+    If you are following the same map many times,
+    converting them once with 'tolist()' is much faster.
+
+    Optionally, a dictionary can be given to share work between many walks on the same map.
+    We record the step we take from each position,
+    and simply reuse it if a later walk passes through the same position.
+
+    :param dist: Distance map from 'distance_map()'
+    :type dist: np.ndarray, list
+    :param x: X cordnet to start at
+    :type x: int
+    :param y: Y cordnet to start at
+    :type y: int
+    :param metric: Name of the metric the map was built with
+    :type metric: str
+    :param costs: Move costs the map was built with, None if every move costs the same
+    :type costs: np.ndarray, list, None
+    :param steps: Dictionary mapping positions to the next position downhill
+    :type steps: dict, None
+    :return: List of positions to the goal, not including the start. Empty if no goal can be reached
+    :rtype: list
+    """
+
+    if steps is None:
+
+        steps = {}
+
+    if dist[y][x] == UNREACHABLE:
+
+        return []
+
+    final = []
+    pos = (x, y)
+
+    while dist[pos[1]][pos[0]] != 0:
+
+        best = steps.get(pos)
+
+        if best is None:
+
+            best = descend(dist, pos[0], pos[1], metric, costs)
+
+            if best is None:
+
+                # Can't get any closer:
+
+                return []
+
+            steps[pos] = best
+
+        pos = best
+
+        final.append(pos)
+
+    return final
@@ -7,13 +7,16 @@ tilemaps handle the logic of entity movement, and keeps everything organized.
 
 from engine.characters.base import EntityCharacter
 from engine.characters.input import Player
-from engine.characters.tiles import Fog
 
 import sys
 from itertools import count
 import math
 
+import numpy as np
+
 from engine.curses.base import BaseWindow
+from engine.pathfinding.components import ComponentIndex
+from engine.vision.rays import line_table
 
 
 class BaseTileMap(object):
@@ -49,6 +52,38 @@ class BaseTileMap(object):
 
         self.tilemap: list  # 3D array representing the screen
 
+        self.obstacles: list  # 2D array counting the static obstacles at each position
+        self.version = 0  # Passability version, incremented each time a position changes passability
+        self._watchers = []  # Callables notified when a position changes passability
+        self._passability = None  # Cached passability grid, along with the version it was built at
+
+        self.costs: list  # 2D array summing the extra move cost of the objects at each position
+        self.cost_version = 0  # Cost version, incremented each time a position changes cost
+        self._costed = 0  # Number of objects on the tilemap with a move cost
+        self._cost_watchers = []  # Callables notified when a position changes cost
+        self._cost_grid = None  # Cached cost grid, along with the version it was built at
+
+        self.occluders: list  # 2D array counting the objects blocking sight at each position
+        self.opacity_version = 0  # Opacity version, incremented each time a position changes opacity
+        self._sight_watchers = []  # Callables notified when a position changes opacity
+        self._opacity = None  # Cached opacity grid, along with the version it was built at
+
+        self._mutation_watchers = []  # Callables notified each time an object is added or removed
+
+        self.paths = None  # Optional pathfinding service, updated at the start of each round
+        self.reservations = None  # Optional reservation table for cooperative trackers, updated at the start of each round
+        self.landmarks = None  # Optional landmark tables, giving searches a tighter heuristic
+        self.desires = None  # Desire maps shared by DesireMove autoruns, updated at the start of each round
+        self.walkers = None  # Optional batched random walk system, stepped at the start of each round
+        self.perception = None  # Optional perception service, answering what observers can see each round
+        self.activity = None  # Optional activity manager, putting far away entities to sleep
+        self.sight = None  # Cached line of sight checks, created the first time a path is smoothed
+        self.vision = None  # Optional field of view cache, shared by everything that looks around
+        self.lights = None  # Optional light map, keeping the brightness of each position
+        self.fog = None  # Optional fog of war, hiding what the viewer can't see when rendering
+        self.memory = None  # Optional explored memory, remembering what the fog of war revealed
+        self._components = None  # Component labels, created the first time reachability is checked
+
         # Create our tilemap:
 
         self._init_tilemap()
@@ -81,6 +116,12 @@ class BaseTileMap(object):
 
         self.tilemap = final
 
+        # Nothing blocks movement yet:
+
+        self.obstacles = [[0] * self.width for _ in range(self.height)]
+        self.costs = [[0] * self.width for _ in range(self.height)]
+        self.occluders = [[0] * self.width for _ in range(self.height)]
+
     def fill(self, obj):
 
         """
@@ -253,13 +294,15 @@ class BaseTileMap(object):
 
         return None
 
-    def move(self, obj, x, y):
+    def move(self, obj, x, y, src=None):
 
         """
         Moves the given object to a position in the list.
 
         First we find the object in the list,
         then we move it to it's new position.
+        If the caller already knows where the object is,
+        it can be given as 'src' so we skip the search.
 
         :param obj: Object to move
         :type obj: BaseCharacter
@@ -267,9 +310,15 @@ class BaseTileMap(object):
         :type x: int
         :param y: Y cordnet to move it to
         :type y: int
+        :param src: Current (x, y) position of the object, None to search for it
+        :type src: tuple, None
         """
 
-        tile = self.find_object(obj)
+        if src is None:
+
+            tile = self.find_object(obj)
+
+            src = (tile.x, tile.y)
 
         # Check if movement is valid:
 
@@ -277,11 +326,13 @@ class BaseTileMap(object):
 
         # Remove the object from it's original position:
 
-        self.tilemap[tile.y][tile.x].remove(obj)
+        self.tilemap[src[1]][src[0]].remove(obj)
+        self._track(obj, src[0], src[1], -1)
 
         # Add the object to it's new position:
 
         self.tilemap[y][x].append(obj)
+        self._track(obj, x, y, 1)
 
         # Sort the list at that position:
 
@@ -376,6 +427,7 @@ class BaseTileMap(object):
         # Adding object at coordinate:
 
         self.tilemap[y][x].append(obj)
+        self._track(obj, x, y, 1)
 
         # Sort the objects at that position
         self.tilemap[y][x].sort(key=self._get_priority)
@@ -384,6 +436,7 @@ class BaseTileMap(object):
 
         """
         Removes the object(s) from the tilemap
+        The object is then told to let go of anything it holds on the tilemap(see 'BaseCharacter.release()').
         :param obj: Object to be removed
         :type obj: BaseCharacter
         :param findall: Boolean determining if we should find all matching objects
@@ -393,12 +446,16 @@ class BaseTileMap(object):
 
             objTile = self.find_object(obj)
             self.tilemap[objTile.y][objTile.x].remove(obj)
+            self._track(obj, objTile.x, objTile.y, -1)
 
         else:
 
-            for tile in self.tilemap.find_object(obj, True):
+            for tile in self.find_object(obj, True):
 
                 self.tilemap[tile.y][tile.x].remove(obj)
+                self._track(obj, tile.x, tile.y, -1)
+
+        obj.release()
 
     def remove_obj_by_type(self, obj, findall=False):
 
@@ -412,12 +469,18 @@ class BaseTileMap(object):
         if not findall:
 
             objTile = self.find_object_type(obj)
-            self.tilemap[objTile.y][objTile.x].remove(obj)
+            self.tilemap[objTile.y][objTile.x].remove(objTile.obj)
+            self._track(objTile.obj, objTile.x, objTile.y, -1)
+
+            objTile.obj.release()
 
         else:
 
-            for tile in self.tilemap.find_object_type(obj, True):
-                self.tilemap[tile.y][tile.x].remove(obj)
+            for tile in self.find_object_type(obj, True):
+                self.tilemap[tile.y][tile.x].remove(tile.obj)
+                self._track(tile.obj, tile.x, tile.y, -1)
+
+                tile.obj.release()
 
     def remove_obj_by_coords(self, x, y, z=0):
 
@@ -425,15 +488,353 @@ class BaseTileMap(object):
 
             z += 1
 
+        obj = self.tilemap[y][x][z]
+
+        self._track(obj, x, y, -1)
+
         del self.tilemap[y][x][z]
 
+        obj.release()
+
+    def is_passable(self, x, y):
+
+        """
+        Determines if the position can be walked through.
+
+        We only consider static obstacles, such as walls and chests.
+        Entities are not counted, as they move each round
+        and are dealt with when the move is actually made(see 'EntityCharacter.check_tile()').
+
+        :param x: X cordnet
+        :type x: int
+        :param y: Y cordnet
+        :type y: int
+        :return: True if the position is in bounds and not obstructed
+        :rtype: bool
+        """
+
+        return 0 <= x < self.width and 0 <= y < self.height and self.obstacles[y][x] == 0
+
+    def reachable(self, start, goal):
+
+        """
+        Determines if the goal can be reached from the start.
+
+        The first time we are called, we label the connected components of the tilemap.
+        The labels are kept up to date as obstacles are added and removed,
+        so after that, each check is O(1).
+
+        :param start: Position to start at
+        :type start: tuple
+        :param goal: Position to reach
+        :type goal: tuple
+        :return: True if there is a path between the positions
+        :rtype: bool
+        """
+
+        if self._components is None:
+
+            self._components = ComponentIndex(self)
+
+        return self._components.connected(start, goal)
+
+    def passability(self):
+
+        """
+        Gets the passability grid of the tilemap as a NumPy array.
+
+        The array is indexed as [y, x], and is True where 'is_passable()' would be True.
+        We cache the grid, and only rebuild it when our passability version changes.
+        Do not modify the returned array!
+
+        :return: 2D boolean array(height, width)
+        :rtype: np.ndarray
+        """
+
+        if self._passability is None or self._passability[0] != self.version:
+
+            # Out of date, rebuild it:
+
+            grid = np.array(self.obstacles, dtype=np.int32).reshape(self.height, self.width) == 0
+            grid.flags.writeable = False
+
+            self._passability = (self.version, grid)
+
+        return self._passability[1]
+
+    def move_cost(self, x, y):
+
+        """
+        Gets the cost of moving onto a position.
+
+        Moving onto a position costs 1, plus the 'move_cost' of each object there.
+        Costs are never lower than 1, so a move never costs less than on an empty tilemap.
+
+        :param x: X cordnet
+        :type x: int
+        :param y: Y cordnet
+        :type y: int
+        :return: Cost of moving onto the position
+        :rtype: int
+        """
+
+        return max(1, 1 + self.costs[y][x])
+
+    def cost_grid(self):
+
+        """
+        Gets the move cost of each position as a NumPy array.
+
+        The array is indexed as [y, x], and holds what 'move_cost()' would return.
+        Like 'passability()', the grid is cached and only rebuilt when our cost version changes.
+        If no object on the tilemap has a move cost, we return None,
+        so pathfinders can stick to their faster unit cost searches.
+
+        :return: 2D integer array(height, width), or None if every move costs 1
+        :rtype: np.ndarray, None
+        """
+
+        if not self._costed:
+
+            return None
+
+        if self._cost_grid is None or self._cost_grid[0] != self.cost_version:
+
+            # Out of date, rebuild it:
+
+            grid = np.maximum(1, 1 + np.array(self.costs, dtype=np.int32).reshape(self.height, self.width))
+            grid.flags.writeable = False
+
+            self._cost_grid = (self.cost_version, grid)
+
+        return self._cost_grid[1]
+
+    def is_opaque(self, x, y):
+
+        """
+        Determines if the position blocks line of sight.
+
+        Positions out of bounds are considered opaque,
+        so vision never leaks off the edge of the tilemap.
+
+        :param x: X cordnet
+        :type x: int
+        :param y: Y cordnet
+        :type y: int
+        :return: True if the position can't be seen through
+        :rtype: bool
+        """
+
+        return not (0 <= x < self.width and 0 <= y < self.height) or self.occluders[y][x] > 0
+
+    def opacity(self):
+
+        """
+        Gets the opacity grid of the tilemap as a NumPy array.
+
+        The array is indexed as [y, x], and is True where 'is_opaque()' would be True.
+        Like 'passability()', the grid is cached and only rebuilt when our opacity version changes.
+        Do not modify the returned array!
+
+        :return: 2D boolean array(height, width)
+        :rtype: np.ndarray
+        """
+
+        if self._opacity is None or self._opacity[0] != self.opacity_version:
+
+            # Out of date, rebuild it:
+
+            grid = np.array(self.occluders, dtype=np.int32).reshape(self.height, self.width) > 0
+            grid.flags.writeable = False
+
+            self._opacity = (self.opacity_version, grid)
+
+        return self._opacity[1]
+
+    def watch(self, call, costs=False):
+
+        """
+        Registers a callable to be notified when a position changes passability.
+
+        The callable will be invoked with the X and Y cordnets of the position
+        each time it becomes blocked or unblocked.
+        Planners use this to repair their searches instead of starting over.
+
+        If 'costs' is True, the callable is also invoked when the move cost of a position changes.
+
+        :param call: Callable to invoke
+        :type call: function
+        :param costs: Determines if we also notify about cost changes
+        :type costs: bool
+        """
+
+        self._watchers.append(call)
+
+        if costs:
+
+            self._cost_watchers.append(call)
+
+    def unwatch(self, call):
+
+        """
+        Removes a callable previously registered with 'watch()'.
+
+        :param call: Callable to remove
+        :type call: function
+        """
+
+        if call in self._watchers:
+
+            self._watchers.remove(call)
+
+        if call in self._cost_watchers:
+
+            self._cost_watchers.remove(call)
+
+        if call in self._sight_watchers:
+
+            self._sight_watchers.remove(call)
+
+        if call in self._mutation_watchers:
+
+            self._mutation_watchers.remove(call)
+
+    def watch_sight(self, call):
+
+        """
+        Registers a callable to be notified when a position changes opacity.
+
+        The callable will be invoked with the X and Y cordnets of the position
+        each time it starts or stops blocking line of sight.
+        Use 'unwatch()' to remove it.
+
+        :param call: Callable to invoke
+        :type call: function
+        """
+
+        self._sight_watchers.append(call)
+
+    def watch_mutations(self, call):
+
+        """
+        Registers a callable to be notified each time an object is added to or removed from a position.
+
+        The callable will be invoked with the object, the X and Y cordnets, and 1 if it was added or -1 if removed.
+        Moving an object is a removal followed by an addition.
+        Use 'unwatch()' to remove it.
+
+        :param call: Callable to invoke
+        :type call: function
+        """
+
+        self._mutation_watchers.append(call)
+
+    def _track(self, obj, x, y, delta):
+
+        """
+        Updates the obstacle count and cost at a position after an object was added or removed.
+
+        Only static obstacles(objects that can't be traversed and can't move) are counted.
+        If the position changes passability, we bump our version and notify the watchers.
+        Objects with a move cost change the cost of the position,
+        so we bump our cost version and notify the cost watchers.
+        Objects blocking sight are counted the same way,
+        bumping our opacity version and notifying the sight watchers.
+        Mutation watchers are notified of every object, whatever it is.
+
+        :param obj: Object that was added or removed
+        :type obj: BaseCharacter
+        :param x: X cordnet
+        :type x: int
+        :param y: Y cordnet
+        :type y: int
+        :param delta: 1 if the object was added, -1 if it was removed
+        :type delta: int
+        """
+
+        for call in self._mutation_watchers:
+
+            call(obj, x, y, delta)
+
+        if obj.move_cost:
+
+            # Position changed cost, let everyone know:
+
+            self.costs[y][x] += obj.move_cost * delta
+            self._costed += delta
+            self.cost_version += 1
+
+            for call in self._cost_watchers:
+
+                call(x, y)
+
+        if obj.blocks_sight:
+
+            before = self.occluders[y][x]
+
+            self.occluders[y][x] = before + delta
+
+            if (before == 0) != (self.occluders[y][x] == 0):
+
+                # Opacity changed, let everyone know:
+
+                self.opacity_version += 1
+
+                for call in self._sight_watchers:
+
+                    call(x, y)
+
+        if obj.can_traverse or obj.can_move:
+
+            # Not an obstacle, nothing to do:
+
+            return
+
+        before = self.obstacles[y][x]
+
+        self.obstacles[y][x] = before + delta
+
+        if (before == 0) != (self.obstacles[y][x] == 0):
+
+            # Passability changed, let everyone know:
+
+            self.version += 1
+
+            for call in self._watchers:
+
+                call(x, y)
+
     def update(self):
 
         """
         Calls the 'move' method on all entities and refreshes our collection.
         We also invoke the autoruns attached to the entities.
+
+        If we have a pathfinding service, it is updated first,
+        so paths resolved since the last round are ready for the autoruns.
+        The same goes for our reservation table and desire maps, which move on to the new round.
+
+        If we have an activity manager, entities it puts to sleep are skipped this round.
+        It picks them out before anything moves,
+        so random walkers can skip the same ones.
+        Random walkers are then all moved at once, before the other entities,
+        and our perception service works out what everyone can see from where they ended up.
+        We only search for our entities once, the walkers bring the tiles of those they moved up to date,
+        and our perception service is given the same tiles.
         """
 
+        if self.paths is not None:
+
+            self.paths.update()
+
+        if self.reservations is not None:
+
+            self.reservations.update()
+
+        if self.desires is not None:
+
+            self.desires.update()
+
         cords = self.find_object_type(EntityCharacter, findall=True)
 
         # Check to see if there are any valid entities:
@@ -444,6 +845,25 @@ class BaseTileMap(object):
 
             return
 
+        everyone = cords
+
+        if self.activity is not None:
+
+            # Only bother with the entities that are awake:
+
+            cords = self.activity.filter(cords)
+
+        if self.walkers is not None:
+
+            self.walkers.update()
+            self.walkers.refresh(everyone)
+
+        if self.perception is not None:
+
+            # Everyone can be seen, even the entities that are asleep:
+
+            self.perception.update(everyone)
+
         # Sort them in order of priority:
 
         cords.sort(key=self._get_move_priority)
@@ -612,6 +1032,10 @@ class BaseTileMap(object):
         Because tilemaps only work with ints,
         we will automatically convert the returned value into an integer.
 
+        If the function is one of the WalkingFunctions(in discrete and parametric mode, without arguments),
+        we don't call it at all, and instead apply its precomputed table of offsets(see 'line_table()').
+        The positions returned are exactly the same.
+
         :param start_x: X cordnet to start at
         :type start_x: int
         :param start_y: Y cordnet to start at
@@ -635,6 +1059,49 @@ class BaseTileMap(object):
 
             args = []
 
+        table = None
+
+        if isinstance(func, WalkingFunctions) and par and discrete and not args:
+
+            # We can use a precomputed table, long enough to leave the tilemap:
+
+            table = func.table(max(self.width, self.height) + 1, step_size)
+
+        if table is not None:
+
+            xs = table[0] + start_x
+            ys = table[1] + start_y
+
+            # Stop once the X cordnet is out of bounds:
+
+            inside = (xs >= 0) & (xs < self.width)
+            end = inside.size if inside.all() else int(np.argmin(inside))
+
+            xs = xs[:end]
+            ys = ys[:end]
+
+            # Skip or stop at Y cordnets that are out of bounds:
+
+            inside = (ys >= 0) & (ys < self.height)
+
+            if ignore_bounds:
+
+                xs = xs[inside]
+                ys = ys[inside]
+
+            else:
+
+                end = inside.size if inside.all() else int(np.argmin(inside))
+
+                xs = xs[:end]
+                ys = ys[:end]
+
+            for x, y in zip(xs[:num_steps].tolist(), ys[:num_steps].tolist()):
+
+                yield self.get(x, y)
+
+            return
+
         # Determine the starting value:
 
         start = 0
@@ -738,6 +1205,27 @@ class Tile:
         self.obj = obj
         self.list = pos_list
 
+    def relocate(self, x, y, pos_list):
+
+        """
+        Points us at the new position of our object, after it was moved.
+
+        Tiles are kept around for a whole round, so anything that moves an entity mid round
+        can bring its tile up to date with this instead of searching the tilemap again.
+
+        :param x: X cordnet the object is at now
+        :type x: int
+        :param y: Y cordnet the object is at now
+        :type y: int
+        :param pos_list: List of objects at that position
+        :type pos_list: list
+        """
+
+        self.x = x
+        self.y = y
+        self.list = pos_list
+        self.z = next(z for z, obj in enumerate(pos_list) if obj is self.obj)
+
     def return_obj(self):
 
         """
@@ -848,6 +1336,33 @@ class WalkingFunctions:
 
         return self.selection(self, *args)
 
+    def table(self, length, step_size=1):
+
+        """
+        Gets our offsets as a precomputed table(see 'line_table()').
+
+        :param length: Number of steps in the table
+        :type length: int
+        :param step_size: How much the step increases each time
+        :type step_size: int
+        :return: X and Y offset arrays, or None if our function has no table
+        :rtype: tuple, None
+        """
+
+        if self.selection is WalkingFunctions.vertical_line:
+
+            return line_table(None, length, step_size)
+
+        if self.selection is WalkingFunctions.horizontal_line:
+
+            return line_table(0, length, step_size)
+
+        if self.selection is WalkingFunctions.line:
+
+            return line_table(self.slope, length, step_size)
+
+        return None
+
     def vertical_line(self, step):
 
         """
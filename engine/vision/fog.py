@@ -0,0 +1,162 @@
+"""
+Fog of war, kept as a visibility layer instead of objects on the tilemap.
+
+Fog used to be a character(see 'Fog' in tiles.py) added to every hidden position,
+and cleared by searching the whole tilemap for it.
+Each change in vision meant thousands of list mutations and re-sorts.
+
+Instead, we keep a boolean mask of the visible positions,
+recomputed from the field of view of a viewer(usually the player)
+only when the viewer moves, or something changes opacity.
+The DisplayWindow consults the mask when rendering, and skips the hidden positions.
+Nothing is ever added to or removed from the tilemap.
+
+If the tilemap has an explored memory(see 'ExploredMemory'),
+we feed it the change each time the mask is recomputed.
+
+Fog is attached to a tilemap by setting 'BaseTileMap.fog'.
+
+We currently have the following:
+
+    > FogOfWar - Visibility mask following a viewer
+"""
+
+import numpy as np
+
+from engine.vision.fov import field_of_view
+
+
+class FogOfWar(object):
+
+    """
+    FogOfWar - Visibility mask following a viewer.
+
+    The mask is True where the viewer can see.
+    We remember the position, radius and opacity version the mask was computed for,
+    so asking for it again costs nothing until one of them changes.
+    If the tilemap has a field of view cache(see 'FieldOfViewCache'), we look through it.
+
+    Fog can be turned off by setting 'enabled' to False,
+    in which case everything is visible.
+    If the viewer is not on the tilemap, nothing is visible.
+    """
+
+    def __init__(self, tilemap, viewer, radius=None):
+
+        """
+        :param tilemap: Tilemap to hide
+        :type tilemap: BaseTileMap
+        :param viewer: Entity we see through
+        :type viewer: EntityCharacter
+        :param radius: Distance the viewer can see, None to use the 'radius' of the viewer
+        :type radius: int, None
+        """
+
+        self.tilemap = tilemap  # Tilemap we hide
+        self.viewer = viewer  # Entity we see through
+        self.radius = radius  # Distance the viewer can see, None to use the 'radius' of the viewer
+        self.enabled = True  # Determines if we hide anything
+
+        self.computes = 0  # Number of times we computed the field of view ourselves
+
+        self._key = None  # (x, y, radius, opacity version) our mask was computed for
+        self._pos = None  # Last known position of the viewer
+        self._mask = np.zeros((tilemap.height, tilemap.width), dtype=bool)  # Positions the viewer can see
+        self._clear = np.ones((tilemap.height, tilemap.width), dtype=bool)  # Mask used when we are disabled
+
+        self._mask.flags.writeable = False
+        self._clear.flags.writeable = False
+
+    def mask(self):
+
+        """
+        Gets the visibility mask.
+
+        Do not modify the returned array!
+
+        :return: 2D boolean array(height, width), True where the position is visible
+        :rtype: np.ndarray
+        """
+
+        if not self.enabled:
+
+            return self._clear
+
+        pos = self._locate()
+
+        if pos is None:
+
+            # Nobody to see through:
+
+            key = None
+
+        else:
+
+            radius = getattr(self.viewer, 'radius', None) if self.radius is None else self.radius
+            key = (pos[0], pos[1], radius, self.tilemap.opacity_version)
+
+        if key != self._key:
+
+            # Something changed, look again:
+
+            before = self._mask
+
+            if key is None:
+
+                self._mask = np.zeros((self.tilemap.height, self.tilemap.width), dtype=bool)
+
+            elif self.tilemap.vision is not None:
+
+                self._mask = self.tilemap.vision.get(pos[0], pos[1], radius)
+
+            else:
+
+                self._mask = field_of_view(self.tilemap, pos[0], pos[1], radius)
+
+                self.computes += 1
+
+            self._mask.flags.writeable = False
+            self._key = key
+
+            if self.tilemap.memory is not None:
+
+                self.tilemap.memory.update(before, self._mask)
+
+        return self._mask
+
+    def is_visible(self, x, y):
+
+        """
+        Determines if a position is visible.
+
+        :param x: X cordnet
+        :type x: int
+        :param y: Y cordnet
+        :type y: int
+        :return: True if the position is not hidden by fog
+        :rtype: bool
+        """
+
+        return bool(self.mask()[y, x])
+
+    def _locate(self):
+
+        """
+        Finds the viewer.
+
+        Checking the list at the last known position is cheap,
+        so we only search the tilemap if the viewer is not where we left it.
+
+        :return: Position of the viewer, None if it is not on the tilemap
+        :rtype: tuple, None
+        """
+
+        if self._pos is not None and any(obj is self.viewer for obj in self.tilemap.tilemap[self._pos[1]][self._pos[0]]):
+
+            return self._pos
+
+        tile = self.tilemap.find_object(self.viewer)
+
+        self._pos = None if tile is None else (tile.x, tile.y)
+
+        return self._pos
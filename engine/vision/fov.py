@@ -0,0 +1,323 @@
+"""
+Field of view, using recursive shadowcasting.
+
+The old 'look()' routine(see dump.py) went over every wall on the tilemap,
+and projected its shadow by adding Fog objects, costing O(walls x area) each time.
+Shadowcasting instead sweeps outwards from the viewer one octant at a time,
+row by row, and keeps track of the slopes that are still visible.
+When a row hits something opaque, the rest of the octant is split around it,
+so positions in shadow are never looked at.
+The work done is proportional to the area we can actually see,
+so vision is cheap enough to compute every round.
+
+Vision works off the opacity layer of the tilemap(see 'BaseTileMap.occluders'),
+where objects with 'blocks_sight' set(such as walls) are counted.
+Opaque positions are visible themselves, they just hide what is behind them.
+
+We currently have the following:
+
+    > shadowcast - Computes the visible positions from an origin over an opacity grid
+    > field_of_view - Computes the visible positions on a tilemap, as a visibility bitmap
+    > FieldOfViewCache - LRU cache of field of view results, invalidated only where opacity changed
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+
+# Multipliers transforming each octant onto the first one, as (xx, xy, yx, yy):
+
+OCTANTS = (
+    (1, 0, 0, 1),
+    (0, 1, 1, 0),
+    (0, -1, 1, 0),
+    (-1, 0, 0, 1),
+    (-1, 0, 0, -1),
+    (0, -1, -1, 0),
+    (0, 1, -1, 0),
+    (1, 0, 0, -1),
+)
+
+
+def shadowcast(opaque, width, height, x, y, radius=None):
+
+    """
+    Computes the visible positions from an origin.
+
+    We sweep each octant with an explicit stack instead of recursion,
+    so huge radiuses can't run out of stack.
+    Each entry on the stack is a row to scan, along with the start and end slopes still visible.
+
+    Positions count as visible if their center is within the radius(euclidean distance),
+    and the origin is always visible.
+
+    :param opaque: Opacity grid as a list of rows, truthy where sight is blocked
+    :type opaque: list
+    :param width: Width of the grid
+    :type width: int
+    :param height: Height of the grid
+    :type height: int
+    :param x: X cordnet to look from
+    :type x: int
+    :param y: Y cordnet to look from
+    :type y: int
+    :param radius: Distance we can see, None for no limit
+    :type radius: int, None
+    :return: Flat indices(y * width + x) of each visible position, may contain duplicates
+    :rtype: list
+    """
+
+    if radius is None:
+
+        radius = max(width, height)
+
+    limit = radius * radius
+    final = [y * width + x]
+
+    for xx, xy, yx, yy in OCTANTS:
+
+        stack = [(1, 1.0, 0.0)]
+
+        while stack:
+
+            row, start, end = stack.pop()
+
+            if start < end:
+
+                continue
+
+            new_start = start
+
+            for depth in range(row, radius + 1):
+
+                blocked = False
+                dy = -depth
+
+                for dx in range(-depth, 1):
+
+                    # Slopes of the left and right edges of this position:
+
+                    left = (dx - 0.5) / (dy + 0.5)
+                    right = (dx + 0.5) / (dy - 0.5)
+
+                    if start < right:
+
+                        continue
+
+                    if end > left:
+
+                        break
+
+                    cur_x = x + dx * xx + dy * xy
+                    cur_y = y + dx * yx + dy * yy
+
+                    inside = 0 <= cur_x < width and 0 <= cur_y < height
+
+                    if inside and dx * dx + dy * dy <= limit:
+
+                        final.append(cur_y * width + cur_x)
+
+                    wall = not inside or opaque[cur_y][cur_x]
+
+                    if blocked:
+
+                        if wall:
+
+                            # Still in shadow, move the start past this position:
+
+                            new_start = right
+
+                            continue
+
+                        # Out of the shadow, carry on from where it ended:
+
+                        blocked = False
+                        start = new_start
+
+                    elif wall and depth < radius:
+
+                        # Hit something, scan the visible part before it on the next row:
+
+                        blocked = True
+
+                        stack.append((depth + 1, start, left))
+
+                        new_start = right
+
+                if blocked:
+
+                    break
+
+    return final
+
+
+def field_of_view(tilemap, x, y, radius=None):
+
+    """
+    Computes the positions visible from an origin on a tilemap.
+
+    :param tilemap: Tilemap to look around
+    :type tilemap: BaseTileMap
+    :param x: X cordnet to look from
+    :type x: int
+    :param y: Y cordnet to look from
+    :type y: int
+    :param radius: Distance we can see, None for no limit
+    :type radius: int, None
+    :return: 2D boolean array(height, width), True where the position is visible
+    :rtype: np.ndarray
+    """
+
+    visible = np.zeros(tilemap.height * tilemap.width, dtype=bool)
+
+    visible[shadowcast(tilemap.occluders, tilemap.width, tilemap.height, x, y, radius)] = True
+
+    return visible.reshape(tilemap.height, tilemap.width)
+
+
+class FieldOfViewCache(object):
+
+    """
+    FieldOfViewCache - LRU cache of field of view results, invalidated only where opacity changed.
+
+    The player often stands still or steps back and forth,
+    and NPCs check what they can see each round,
+    so the same fields of view are computed over and over.
+    We cache each result by its (x, y, radius),
+    and a repeated query is a dictionary lookup.
+
+    Results are only valid for the opacity they were computed against.
+    Instead of throwing everything away when the opacity version changes,
+    we watch the tilemap for opacity changes,
+    and only drop the results that actually looked at the changed position.
+    Shadowcasting reads the opacity of every position it scans, and nothing else.
+    Scanned positions within the radius are all marked as visible,
+    so a change only matters if it is inside the square around the origin,
+    and either visible or outside the circle of the radius.
+    Changes far away, or hidden behind walls, leave the result alone.
+
+    We hold at most 'limit' positions worth of results,
+    dropping the least recently used ones when we go over.
+    Once you are done with a cache, be sure to call 'close()'
+    so the tilemap stops notifying us!
+    """
+
+    def __init__(self, tilemap, limit=2 ** 22):
+
+        """
+        :param tilemap: Tilemap to compute fields of view on
+        :type tilemap: BaseTileMap
+        :param limit: Maximum number of positions to hold across all results
+        :type limit: int
+        """
+
+        self.tilemap = tilemap  # Tilemap we compute fields of view on
+        self.limit = limit  # Maximum number of positions to hold across all results
+
+        self.hits = 0  # Number of queries answered from the cache
+        self.misses = 0  # Number of fields of view computed
+        self.dropped = 0  # Number of results dropped because their opacity changed
+
+        self._results = OrderedDict()  # Visibility bitmap for each (x, y, radius), least recently used first
+
+        # Start listening to the tilemap:
+
+        tilemap.watch_sight(self._notify)
+
+    def __len__(self):
+
+        return len(self._results)
+
+    def close(self):
+
+        """
+        Stops listening to the tilemap, and forgets our results.
+        """
+
+        self.tilemap.unwatch(self._notify)
+        self._results.clear()
+
+    def get(self, x, y, radius=None):
+
+        """
+        Gets the positions visible from an origin.
+
+        Results are shared between callers, do not modify the returned array!
+
+        :param x: X cordnet to look from
+        :type x: int
+        :param y: Y cordnet to look from
+        :type y: int
+        :param radius: Distance we can see, None for no limit
+        :type radius: int, None
+        :return: 2D boolean array(height, width), True where the position is visible
+        :rtype: np.ndarray
+        """
+
+        key = (x, y, radius)
+        final = self._results.get(key)
+
+        if final is not None:
+
+            self.hits += 1
+            self._results.move_to_end(key)
+
+            return final
+
+        self.misses += 1
+
+        final = field_of_view(self.tilemap, x, y, radius)
+        final.flags.writeable = False
+
+        self._results[key] = final
+
+        while len(self._results) * final.size > self.limit and len(self._results) > 1:
+
+            # Over our limit, drop the least recently used:
+
+            self._results.popitem(last=False)
+
+        return final
+
+    def _notify(self, x, y):
+
+        """
+        Drops the results that looked at a position that changed opacity.
+        """
+
+        stale = []
+
+        for key, visible in self._results.items():
+
+            ox, oy, radius = key
+
+            if radius is not None:
+
+                dx = x - ox
+                dy = y - oy
+
+                if max(abs(dx), abs(dy)) > radius:
+
+                    # Outside the area we scanned:
+
+                    continue
+
+                if not visible[y, x] and dx * dx + dy * dy <= radius * radius:
+
+                    # Inside the radius but in shadow, never looked at:
+
+                    continue
+
+            elif not visible[y, x]:
+
+                # In shadow, never looked at:
+
+                continue
+
+            stale.append(key)
+
+        for key in stale:
+
+            del self._results[key]
+
+        self.dropped += len(stale)
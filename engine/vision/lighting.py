@@ -0,0 +1,239 @@
+"""
+Light map, keeping the brightness of each position as lights move around.
+
+Objects give off light if their 'light' attribute is set(such as torches),
+lighting up the positions they can see within that radius,
+fading out the further away they are.
+
+Recomputing every light each round is wasteful, as most of them don't change.
+Instead, we keep the contribution of each light,
+and the sum of all of them as the brightness of each position.
+The tilemap tells us whenever an object is added or removed(see 'BaseTileMap.watch_mutations()'),
+so we only recompute a light when it is added or moved,
+and subtract its contribution when it is removed.
+When a position changes opacity, we only recompute the lights that actually looked at it,
+using the same rules as 'FieldOfViewCache'.
+
+Light is kept as integer levels from 0 to 'LEVELS',
+so adding and subtracting contributions never drifts.
+
+The light map is attached to a tilemap by setting 'BaseTileMap.lights'.
+The DisplayWindow draws positions darker than 'DARK' dimmed.
+
+We currently have the following:
+
+    > LightMap - Brightness of each position, updated as lights and walls change
+"""
+
+import numpy as np
+
+from engine.vision.fov import shadowcast
+
+LEVELS = 255  # Brightness of a fully lit position
+
+DARK = 48  # Brightness below which positions are drawn dimmed
+
+
+class LightMap(object):
+
+    """
+    LightMap - Brightness of each position, updated as lights and walls change.
+
+    A light lights up the positions it can see within its radius,
+    at full brightness on top of it, fading out to nothing just past the radius.
+    Brightness from several lights adds up, and is capped at 'LEVELS'.
+    Ambient light is added everywhere.
+
+    Lights are tracked by object and position,
+    so changing the 'light' of an object already on the tilemap has no effect until it is moved.
+    Once you are done with a light map, be sure to call 'close()'
+    so the tilemap stops notifying us!
+    """
+
+    def __init__(self, tilemap, ambient=0):
+
+        """
+        :param tilemap: Tilemap to light up
+        :type tilemap: BaseTileMap
+        :param ambient: Brightness of every position without any lights, between 0 and 'LEVELS'
+        :type ambient: int
+        """
+
+        self.tilemap = tilemap  # Tilemap we light up
+        self.ambient = ambient  # Brightness of every position without any lights
+
+        self.casts = 0  # Number of light contributions we computed
+
+        self._total = np.zeros(tilemap.height * tilemap.width, dtype=np.int32)  # Summed contributions, flattened
+        self._lights = {}  # Contribution of each light, as [obj, indices, levels], keyed by (ID, x, y)
+        self._dirty = set()  # Lights that need to be recomputed
+        self._brightness = None  # Cached brightness grid, None if out of date
+
+        # Find the lights already on the tilemap:
+
+        for x, y, z, obj in tilemap._iterate():
+
+            self._mutated(obj, x, y, 1)
+
+        # Start listening to the tilemap:
+
+        tilemap.watch_mutations(self._mutated)
+        tilemap.watch_sight(self._occluded)
+
+    def __len__(self):
+
+        return len(self._lights)
+
+    def close(self):
+
+        """
+        Stops listening to the tilemap.
+        """
+
+        self.tilemap.unwatch(self._mutated)
+        self.tilemap.unwatch(self._occluded)
+
+    def brightness(self):
+
+        """
+        Gets the brightness of each position.
+
+        Any lights that changed since the last call are brought up to date first.
+        Do not modify the returned array!
+
+        :return: 2D integer array(height, width), from 0 to 'LEVELS'
+        :rtype: np.ndarray
+        """
+
+        if self._dirty:
+
+            self._refresh()
+
+        if self._brightness is None:
+
+            grid = np.minimum(self._total + self.ambient, LEVELS).astype(np.uint8).reshape(self.tilemap.height,
+                                                                                            self.tilemap.width)
+            grid.flags.writeable = False
+
+            self._brightness = grid
+
+        return self._brightness
+
+    def is_lit(self, x, y):
+
+        """
+        Determines if a position is bright enough to see clearly.
+
+        :param x: X cordnet
+        :type x: int
+        :param y: Y cordnet
+        :type y: int
+        :return: True if the position is at least as bright as 'DARK'
+        :rtype: bool
+        """
+
+        return bool(self.brightness()[y, x] >= DARK)
+
+    def _mutated(self, obj, x, y, delta):
+
+        """
+        Tracks lights being added and removed.
+        """
+
+        if not obj.light:
+
+            return
+
+        key = (id(obj), x, y)
+
+        if delta > 0:
+
+            # New light, work it out later:
+
+            self._lights[key] = [obj, None, None]
+            self._dirty.add(key)
+
+            return
+
+        entry = self._lights.pop(key, None)
+
+        self._dirty.discard(key)
+
+        if entry is not None and entry[1] is not None:
+
+            # Light is gone, take away what it added:
+
+            self._total[entry[1]] -= entry[2]
+            self._brightness = None
+
+    def _occluded(self, x, y):
+
+        """
+        Marks the lights that looked at a position that changed opacity.
+        """
+
+        flat = y * self.tilemap.width + x
+
+        for key, (obj, indices, levels) in self._lights.items():
+
+            if indices is None:
+
+                continue
+
+            _, lx, ly = key
+            dx = x - lx
+            dy = y - ly
+
+            if max(abs(dx), abs(dy)) > obj.light:
+
+                # Outside the area the light scanned:
+
+                continue
+
+            num = np.searchsorted(indices, flat)
+            seen = num < indices.size and indices[num] == flat
+
+            if not seen and dx * dx + dy * dy <= obj.light * obj.light:
+
+                # Inside the radius but in shadow, never looked at:
+
+                continue
+
+            self._dirty.add(key)
+
+    def _refresh(self):
+
+        """
+        Recomputes the contribution of each dirty light.
+        """
+
+        width = self.tilemap.width
+
+        for key in self._dirty:
+
+            entry = self._lights[key]
+            obj, indices, levels = entry
+            _, x, y = key
+
+            if indices is not None:
+
+                self._total[indices] -= levels
+
+            # Light up what the light can see, fading out with distance:
+
+            indices = np.unique(shadowcast(self.tilemap.occluders, width, self.tilemap.height, x, y, obj.light))
+
+            dx = indices % width - x
+            dy = indices // width - y
+
+            levels = np.rint(LEVELS * (1 - np.sqrt(dx * dx + dy * dy) / (obj.light + 1))).astype(np.int32)
+
+            self._total[indices] += levels
+
+            entry[1] = indices
+            entry[2] = levels
+
+            self.casts += 1
+
+        self._dirty.clear()
+        self._brightness = None
@@ -0,0 +1,188 @@
+"""
+Explored memory, remembering what was seen once it is out of view.
+
+Roguelike vision needs three states for each position:
+visible, never seen, and seen before but not visible now.
+The last state is drawn dimmed, showing what the position looked like when we last saw it.
+
+We keep one small integer per position, indexing into a palette of remembered glyphs,
+where 0 means the position was never seen.
+Most tilemaps only have a handful of distinct glyphs(floors, walls, doors),
+so the layer is one byte per position, and only grows to two if the palette overflows.
+
+The memory is only updated from the change in the field of view:
+positions entering view are marked as explored,
+and positions leaving view have their glyph remembered.
+This is driven by the fog of war(see 'FogOfWar') whenever it recomputes its mask.
+
+Memory is attached to a tilemap by setting 'BaseTileMap.memory',
+and can be saved and loaded alongside the map.
+
+We currently have the following:
+
+    > ExploredMemory - Remembered glyph of each explored position
+"""
+
+import json
+
+import numpy as np
+
+
+class ExploredMemory(object):
+
+    """
+    ExploredMemory - Remembered glyph of each explored position.
+
+    The glyph of a position is the (char, attrib) of its most relevant object that can't move,
+    so we remember the terrain and items, not the entities walking over them.
+    A position without such objects is remembered as blank.
+    """
+
+    def __init__(self, tilemap):
+
+        """
+        :param tilemap: Tilemap to remember
+        :type tilemap: BaseTileMap
+        """
+
+        self.tilemap = tilemap  # Tilemap we remember
+
+        self.glyphs = np.zeros((tilemap.height, tilemap.width), dtype=np.uint8)  # Palette index of each position, 0 if never seen
+        self.palette = [None]  # Remembered glyphs, as (char, attrib) pairs
+
+        self._index = {}  # Palette index of each glyph
+
+    def update(self, before, after):
+
+        """
+        Updates the memory from a change in the field of view.
+
+        :param before: Visibility mask before the change
+        :type before: np.ndarray
+        :param after: Visibility mask after the change
+        :type after: np.ndarray
+        """
+
+        ys, xs = np.nonzero(before != after)
+
+        for x, y in zip(xs.tolist(), ys.tolist()):
+
+            self.remember(x, y)
+
+    def remember(self, x, y):
+
+        """
+        Remembers what a position looks like right now.
+
+        :param x: X cordnet
+        :type x: int
+        :param y: Y cordnet
+        :type y: int
+        """
+
+        glyph = (' ', ())
+
+        for obj in self.tilemap.tilemap[y][x]:
+
+            if not obj.can_move:
+
+                glyph = (obj.char, tuple(obj.attrib))
+
+                break
+
+        index = self._index.get(glyph)
+
+        if index is None:
+
+            index = len(self.palette)
+
+            if index > np.iinfo(self.glyphs.dtype).max:
+
+                # Palette overflowed, make room:
+
+                self.glyphs = self.glyphs.astype(np.uint16)
+
+            self.palette.append(glyph)
+            self._index[glyph] = index
+
+        self.glyphs[y, x] = index
+
+    def explored(self):
+
+        """
+        Gets the positions that have been seen.
+
+        :return: 2D boolean array(height, width), True where the position was seen
+        :rtype: np.ndarray
+        """
+
+        return self.glyphs != 0
+
+    def glyph(self, x, y):
+
+        """
+        Gets the remembered glyph of a position.
+
+        :param x: X cordnet
+        :type x: int
+        :param y: Y cordnet
+        :type y: int
+        :return: Remembered (char, attrib) pair, None if the position was never seen
+        :rtype: tuple, None
+        """
+
+        return self.palette[self.glyphs[y, x]]
+
+    def remembered(self, visible):
+
+        """
+        Gets the remembered glyphs of the explored positions that are not visible.
+
+        :param visible: Visibility mask
+        :type visible: np.ndarray
+        :return: List of (x, y, char, attrib) tuples
+        :rtype: list
+        """
+
+        ys, xs = np.nonzero((self.glyphs != 0) & ~visible)
+
+        return [(x, y) + self.palette[self.glyphs[y, x]] for x, y in zip(xs.tolist(), ys.tolist())]
+
+    def save(self, file):
+
+        """
+        Saves the memory to a file.
+
+        We store the palette indices as is, along with the palette itself,
+        so the file stays at a byte or two per position before compression.
+
+        :param file: Path or file object to save to
+        :type file: str, file
+        """
+
+        palette = [[char, list(attrib)] for char, attrib in self.palette[1:]]
+
+        np.savez_compressed(file, glyphs=self.glyphs, palette=np.array(json.dumps(palette)))
+
+    def load(self, file):
+
+        """
+        Loads a memory previously saved with 'save()'.
+
+        :param file: Path or file object to load from
+        :type file: str, file
+        :raises ValueError: If the saved memory is not the size of our tilemap
+        """
+
+        with np.load(file) as data:
+
+            glyphs = data['glyphs']
+            palette = json.loads(str(data['palette']))
+
+        if glyphs.shape != self.glyphs.shape:
+
+            raise ValueError("Saved memory is {}, but the tilemap is {}".format(glyphs.shape, self.glyphs.shape))
+
+        self.glyphs = glyphs
+        self.palette = [None] + [(char, tuple(attrib)) for char, attrib in palette]
+        self._index = {glyph: num for num, glyph in enumerate(self.palette) if glyph is not None}
@@ -0,0 +1,274 @@
+"""
+Batched perception, answering every "can I see it?" question of the round at once.
+
+Enemies check if they can see the player each round,
+and each check is its own line of sight problem, walked one position at a time in python.
+With many observers, this adds up quickly.
+
+Instead, observers register with a perception service attached to the tilemap.
+At the start of each round, we find the targets close enough to each observer
+using a spatial hash(targets bucketed into square cells),
+and then march every (observer, target) ray at once with NumPy,
+stepping all of them along their Bresenham lines together over the opacity grid.
+Observers then simply look up what they saw.
+
+The service is attached to a tilemap by setting 'BaseTileMap.perception',
+and is updated at the start of each round.
+
+We currently have the following:
+
+    > line_of_sight - Checks many rays for line of sight at once
+    > PerceptionService - Answers what each registered observer can see each round
+"""
+
+import numpy as np
+
+from engine.characters.base import EntityCharacter
+from engine.characters.input import Player
+
+
+def line_of_sight(opaque, ox, oy, tx, ty):
+
+    """
+    Checks many rays for line of sight at once.
+
+    Each ray follows the same Bresenham line as 'bresenham()' in smoothing.py.
+    Every ray takes one step each iteration, and drops out once it reaches its end or is blocked,
+    so we iterate as many times as the longest ray is long, no matter how many rays there are.
+    Like 'LineOfSight', the ends themselves are not checked.
+
+    :param opaque: Opacity grid, True where sight is blocked(see 'BaseTileMap.opacity()')
+    :type opaque: np.ndarray
+    :param ox: X cordnet of each ray's origin
+    :type ox: np.ndarray, list
+    :param oy: Y cordnet of each ray's origin
+    :type oy: np.ndarray, list
+    :param tx: X cordnet of each ray's target
+    :type tx: np.ndarray, list
+    :param ty: Y cordnet of each ray's target
+    :type ty: np.ndarray, list
+    :return: Boolean array, True for each ray that is clear
+    :rtype: np.ndarray
+    """
+
+    x = np.array(ox, dtype=np.int64)
+    y = np.array(oy, dtype=np.int64)
+    tx = np.asarray(tx, dtype=np.int64)
+    ty = np.asarray(ty, dtype=np.int64)
+
+    dx = np.abs(tx - x)
+    dy = -np.abs(ty - y)
+    sx = np.where(tx > x, 1, -1)
+    sy = np.where(ty > y, 1, -1)
+    error = dx + dy
+
+    clear = np.ones(x.size, dtype=bool)
+    active = np.flatnonzero((x != tx) | (y != ty))
+
+    while active.size:
+
+        # Take a step along every active ray:
+
+        double = 2 * error[active]
+
+        step_x = double >= dy[active]
+        step_y = double <= dx[active]
+
+        error[active] += np.where(step_x, dy[active], 0) + np.where(step_y, dx[active], 0)
+        x[active] += np.where(step_x, sx[active], 0)
+        y[active] += np.where(step_y, sy[active], 0)
+
+        # Rays that reached their target are done, the rest must be able to see through:
+
+        moving = (x[active] != tx[active]) | (y[active] != ty[active])
+        active = active[moving]
+
+        blocked = opaque[y[active], x[active]]
+
+        clear[active[blocked]] = False
+        active = active[~blocked]
+
+    return clear
+
+
+class PerceptionService(object):
+
+    """
+    PerceptionService - Answers what each registered observer can see each round.
+
+    Observers are registered with 'add()', along with how far they can see.
+    Each round, we find every target within that distance(euclidean, like the field of view),
+    and check line of sight to all of them in one batch.
+    'sees()' and 'can_see()' then answer from those results for the rest of the round.
+
+    Targets are any entities of the 'target' type, which is the player by default.
+    """
+
+    def __init__(self, tilemap, target=Player, radius=20, size=16):
+
+        """
+        :param tilemap: Tilemap our observers are on
+        :type tilemap: BaseTileMap
+        :param target: Type of the entities observers look for
+        :type target: type
+        :param radius: Distance observers can see when they don't give one
+        :type radius: int
+        :param size: Width and height of each cell in the spatial hash
+        :type size: int
+        """
+
+        self.tilemap = tilemap  # Tilemap our observers are on
+        self.target = target  # Type of the entities observers look for
+        self.radius = radius  # Distance observers can see when they don't give one
+        self.size = size  # Width and height of each cell in the spatial hash
+
+        self.tick = 0  # Number of rounds we have been updated
+        self.rays = 0  # Number of rays checked last round
+
+        self._observers = {}  # (entity, radius) of each observer, keyed by ID
+        self._seen = {}  # Targets each observer saw this round, keyed by ID
+
+    def __len__(self):
+
+        return len(self._observers)
+
+    def add(self, observer, radius=None):
+
+        """
+        Registers an observer.
+
+        :param observer: Entity that looks around
+        :type observer: EntityCharacter
+        :param radius: Distance the observer can see, None for our default
+        :type radius: int, None
+        """
+
+        self._observers[id(observer)] = (observer, self.radius if radius is None else radius)
+
+    def remove(self, observer):
+
+        """
+        Stops answering for an observer.
+
+        :param observer: Entity to stop looking around for
+        :type observer: EntityCharacter
+        """
+
+        self._observers.pop(id(observer), None)
+        self._seen.pop(id(observer), None)
+
+    def sees(self, observer):
+
+        """
+        Gets the targets an observer saw this round.
+
+        :param observer: Registered observer
+        :type observer: EntityCharacter
+        :return: List of targets in sight
+        :rtype: list
+        """
+
+        return self._seen.get(id(observer), [])
+
+    def can_see(self, observer, target):
+
+        """
+        Determines if an observer saw a target this round.
+
+        :param observer: Registered observer
+        :type observer: EntityCharacter
+        :param target: Target to check for
+        :type target: EntityCharacter
+        :return: True if the target was in sight
+        :rtype: bool
+        """
+
+        return any(obj is target for obj in self.sees(observer))
+
+    def update(self, tiles=None):
+
+        """
+        Works out what every observer can see.
+
+        Method invoked by the tilemap at the start of each round.
+        The tilemap already found every entity this round, so it gives us those tiles
+        instead of us searching the whole tilemap again.
+        They must be where the entities are now!
+
+        :param tiles: Tiles of every entity on the tilemap, None to search for them
+        :type tiles: list, None
+        """
+
+        self.tick += 1
+        self.rays = 0
+        self._seen = {}
+
+        if not self._observers:
+
+            return
+
+        if tiles is None:
+
+            tiles = self.tilemap.find_object_type(EntityCharacter, findall=True) or []
+
+        positions = {id(tile.obj): (tile.x, tile.y) for tile in tiles}
+        targets = [tile for tile in tiles if isinstance(tile.obj, self.target)]
+
+        # Bucket the targets into our spatial hash:
+
+        cells = {}
+
+        for num, tile in enumerate(targets):
+
+            cells.setdefault((tile.x // self.size, tile.y // self.size), []).append(num)
+
+        # Gather the targets close enough to each observer:
+
+        pairs = []
+
+        for key, (observer, radius) in list(self._observers.items()):
+
+            pos = positions.get(key)
+
+            if pos is None or not observer.is_alive:
+
+                # Observer is gone:
+
+                del self._observers[key]
+
+                continue
+
+            x, y = pos
+
+            for cell_y in range((y - radius) // self.size, (y + radius) // self.size + 1):
+
+                for cell_x in range((x - radius) // self.size, (x + radius) // self.size + 1):
+
+                    for num in cells.get((cell_x, cell_y), ()):
+
+                        tile = targets[num]
+
+                        if tile.obj is not observer and (tile.x - x) ** 2 + (tile.y - y) ** 2 <= radius * radius:
+
+                            pairs.append((key, x, y, num))
+
+        self.rays = len(pairs)
+
+        if not pairs:
+
+            return
+
+        # Check every ray at once:
+
+        keys, ox, oy, nums = zip(*pairs)
+
+        tx = [targets[num].x for num in nums]
+        ty = [targets[num].y for num in nums]
+
+        clear = line_of_sight(self.tilemap.opacity(), ox, oy, tx, ty)
+
+        for key, num, seen in zip(keys, nums, clear.tolist()):
+
+            if seen:
+
+                self._seen.setdefault(key, []).append(targets[num].obj)
@@ -0,0 +1,204 @@
+"""
+Precomputed ray tables, so tracing across the tilemap doesn't call python each step.
+
+Lines, rays and cones are the same shape wherever they start,
+so we compute them once as tables of integer (X, Y) offsets from the origin,
+and cache them by their shape(slope or direction, and length).
+Applying a table is then a handful of array operations:
+add the origin, cut it off where it leaves the tilemap,
+and gather the values of a layer(such as 'BaseTileMap.opacity()') at those positions.
+
+Projectiles, vision and traces can find what they hit with 'first_hit()',
+without stepping through the positions one at a time.
+'BaseTileMap.traverse_function()' also uses these tables for WalkingFunctions,
+instead of calling the function at each step.
+
+Tables are shared, do not modify them!
+
+We currently have the following:
+
+    > line_table - Offsets along a line with a given slope, like 'WalkingFunctions'
+    > ray_table - Offsets along the Bresenham ray to a relative target
+    > cone_table - Offsets inside a cone facing a direction
+    > clip - Applies a table at an origin, cutting it off where it leaves the tilemap
+    > first_hit - Finds the first position along a table where a layer is set
+"""
+
+import math
+from functools import lru_cache
+
+import numpy as np
+
+from engine.pathfinding.smoothing import bresenham
+
+
+def _freeze(xs, ys):
+
+    """
+    Converts offsets into read only arrays, so cached tables can't be changed by accident.
+    """
+
+    xs = np.array(xs, dtype=np.int64)
+    ys = np.array(ys, dtype=np.int64)
+
+    xs.flags.writeable = False
+    ys.flags.writeable = False
+
+    return xs, ys
+
+
+@lru_cache(maxsize=1024)
+def line_table(slope, length, step_size=1):
+
+    """
+    Gets the offsets along a line with a given slope.
+
+    The offsets are exactly what the 'WalkingFunctions' line functions return in parametric mode,
+    the X offset being the step, and the Y offset being the step times the slope(truncated to an int).
+
+    :param slope: Slope of the line, 0 for horizontal, None for vertical
+    :type slope: int, float, None
+    :param length: Number of steps in the table
+    :type length: int
+    :param step_size: How much the step increases each time
+    :type step_size: int
+    :return: X and Y offsets, starting at the origin
+    :rtype: tuple
+    """
+
+    steps = range(0, length * step_size, step_size) if step_size else [0] * length
+
+    if slope is None:
+
+        return _freeze([0] * length, steps)
+
+    return _freeze(steps, [int(step * slope) for step in steps])
+
+
+@lru_cache(maxsize=4096)
+def ray_table(dx, dy):
+
+    """
+    Gets the offsets along the Bresenham ray to a relative target.
+
+    The ray is the same as 'bresenham()' in smoothing.py,
+    so it agrees with line of sight checks.
+
+    :param dx: X offset of the target
+    :type dx: int
+    :param dy: Y offset of the target
+    :type dy: int
+    :return: X and Y offsets, not including the origin, ending at the target
+    :rtype: tuple
+    """
+
+    ray = bresenham((0, 0), (dx, dy))
+
+    return _freeze([pos[0] for pos in ray], [pos[1] for pos in ray])
+
+
+@lru_cache(maxsize=256)
+def cone_table(dx, dy, radius, spread=90):
+
+    """
+    Gets the offsets inside a cone facing a direction.
+
+    A position is inside the cone if it is within the radius(euclidean distance),
+    and the angle between it and the direction is at most half the spread.
+    Offsets are sorted nearest first, so scanning a cone finds close things first.
+
+    :param dx: X part of the direction the cone faces, such as 1 for right
+    :type dx: int
+    :param dy: Y part of the direction the cone faces, such as -1 for up
+    :type dy: int
+    :param radius: Distance the cone reaches
+    :type radius: int
+    :param spread: Angle of the cone in degrees
+    :type spread: int, float
+    :return: X and Y offsets, not including the origin
+    :rtype: tuple
+    """
+
+    ys, xs = np.mgrid[-radius:radius + 1, -radius:radius + 1]
+
+    distance = np.sqrt(xs * xs + ys * ys)
+    facing = (xs * dx + ys * dy) / np.maximum(distance * math.hypot(dx, dy), 1e-9)
+
+    inside = (distance <= radius) & (distance > 0) & (facing >= math.cos(math.radians(spread) / 2) - 1e-9)
+
+    order = np.argsort(distance[inside], kind='stable')
+
+    return _freeze(xs[inside][order], ys[inside][order])
+
+
+def clip(width, height, x, y, xs, ys, stop=True):
+
+    """
+    Applies a table at an origin, cutting it off where it leaves the tilemap.
+
+    :param width: Width of the tilemap
+    :type width: int
+    :param height: Height of the tilemap
+    :type height: int
+    :param x: X cordnet of the origin
+    :type x: int
+    :param y: Y cordnet of the origin
+    :type y: int
+    :param xs: X offsets of the table
+    :type xs: np.ndarray
+    :param ys: Y offsets of the table
+    :type ys: np.ndarray
+    :param stop: Determines if we stop at the first position out of bounds, instead of skipping them
+    :type stop: bool
+    :return: X and Y cordnets of the positions in bounds
+    :rtype: tuple
+    """
+
+    px = xs + x
+    py = ys + y
+
+    inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+
+    if stop:
+
+        end = int(np.argmin(inside)) if not inside.all() else inside.size
+
+        return px[:end], py[:end]
+
+    return px[inside], py[inside]
+
+
+def first_hit(grid, x, y, xs, ys):
+
+    """
+    Finds the first position along a table where a layer is set.
+
+    For example, a projectile flying right can find the first thing it hits with:
+
+        first_hit(tilemap.passability() == False, x, y, *ray_table(10, 0))
+
+    :param grid: 2D boolean array(height, width), True where we hit something
+    :type grid: np.ndarray
+    :param x: X cordnet of the origin
+    :type x: int
+    :param y: Y cordnet of the origin
+    :type y: int
+    :param xs: X offsets of the table
+    :type xs: np.ndarray
+    :param ys: Y offsets of the table
+    :type ys: np.ndarray
+    :return: Position of the first hit, None if we hit nothing before the table ends or leaves the tilemap
+    :rtype: tuple, None
+    """
+
+    px, py = clip(grid.shape[1], grid.shape[0], x, y, xs, ys)
+
+    hits = grid[py, px]
+
+    if not hits.any():
+
+        return None
+
+    num = int(np.argmax(hits))
+
+    return int(px[num]), int(py[num])
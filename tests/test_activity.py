@@ -0,0 +1,85 @@
+"""
+Tests for activity management, and entities catching up on the rounds they missed.
+"""
+
+import unittest
+
+from unittest import mock
+
+from engine.activity import DetailManager
+from engine.characters.auto.move import RandomMove
+from engine.characters.base import EntityCharacter
+from engine.characters.npcs import NPC
+from engine.tilemaps import BaseTileMap
+
+
+class Focus(EntityCharacter):
+
+    pass
+
+
+class TestCatchUp(unittest.TestCase):
+
+    def test_npc_scatters_once(self):
+
+        tilemap = BaseTileMap(20, 20, None)
+
+        wanderer = NPC()
+        walker = NPC()
+
+        tilemap.add(wanderer, 5, 5)
+        tilemap.add(walker, 15, 15)
+
+        walker.auto.add(RandomMove())
+
+        # NPCs wander on their own, unless a random move autorun does it for them:
+
+        with mock.patch('engine.characters.npcs.scatter') as npc_scatter, \
+                mock.patch('engine.characters.auto.move.scatter') as move_scatter:
+
+            wanderer.catch_up(10)
+
+            self.assertEqual((npc_scatter.call_count, move_scatter.call_count), (1, 0))
+
+            walker.catch_up(10)
+
+            self.assertEqual((npc_scatter.call_count, move_scatter.call_count), (1, 1))
+
+    def test_tiles_follow_catch_up(self):
+
+        tilemap = BaseTileMap(64, 64, None)
+        tilemap.add(Focus(), 0, 0)
+
+        # Everything past the first region is updated every 4 rounds:
+
+        manager = DetailManager(radius=4, margin=0, linger=0, focus=Focus, tiers=((8, 2), (16, 4)), size=8)
+
+        for num in range(60):
+
+            tilemap.add(NPC(), 10 + num % 50, 10 + num // 50 * 20)
+
+        caught = 0
+
+        for _ in range(12):
+
+            cords = tilemap.find_object_type(EntityCharacter, findall=True)
+
+            with mock.patch('engine.characters.auto.walkers.random.gauss', return_value=3):
+
+                manager.filter(cords)
+
+            caught += manager.caught
+
+            # Every tile points at where its entity is now:
+
+            for tile in cords:
+
+                self.assertIs(tilemap.tilemap[tile.y][tile.x][tile.z], tile.obj)
+                self.assertIs(tile.list, tilemap.tilemap[tile.y][tile.x])
+
+        self.assertGreater(caught, 0)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
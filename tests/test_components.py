@@ -0,0 +1,165 @@
+"""
+Tests for the connected component index.
+
+Labels are kept up to date as walls come and go,
+so we check them against labelling the tilemap from scratch after each change.
+"""
+
+import random
+import unittest
+
+from collections import deque
+
+from engine.characters.tiles import Wall
+from engine.pathfinding.components import BLOCKED, ComponentIndex
+from engine.pathfinding.dstar import NEIGHBORS
+from engine.tilemaps import BaseTileMap
+
+
+def fresh_labels(tilemap):
+
+    """
+    Labels the components of the tilemap from scratch, with a breadth first flood from each position.
+    """
+
+    labels = {}
+
+    for y in range(tilemap.height):
+
+        for x in range(tilemap.width):
+
+            if (x, y) in labels or not tilemap.is_passable(x, y):
+
+                continue
+
+            label = len(labels)
+            labels[(x, y)] = label
+            queue = deque([(x, y)])
+
+            while queue:
+
+                pos = queue.popleft()
+
+                for dx, dy in NEIGHBORS:
+
+                    near = (pos[0] + dx, pos[1] + dy)
+
+                    if near not in labels and tilemap.is_passable(*near):
+
+                        labels[near] = label
+                        queue.append(near)
+
+    return labels
+
+
+class TestComponentIndex(unittest.TestCase):
+
+    def check_labels(self, tilemap, index):
+
+        """
+        Checks that the index splits the tilemap into the same components as labelling it from scratch.
+        """
+
+        expected = fresh_labels(tilemap)
+        forward = {}
+        backward = {}
+        sizes = {}
+
+        for y in range(tilemap.height):
+
+            for x in range(tilemap.width):
+
+                label = index.label(x, y)
+
+                if (x, y) not in expected:
+
+                    self.assertEqual(label, BLOCKED)
+
+                    continue
+
+                self.assertNotEqual(label, BLOCKED)
+
+                # Labels must map one to one onto the fresh ones:
+
+                self.assertEqual(forward.setdefault(label, expected[(x, y)]), expected[(x, y)])
+                self.assertEqual(backward.setdefault(expected[(x, y)], label), label)
+
+                sizes[label] = sizes.get(label, 0) + 1
+
+        for label, size in sizes.items():
+
+            self.assertEqual(index.sizes[label], size)
+
+    def test_matches_fresh_labels(self):
+
+        for seed in range(10):
+
+            rng = random.Random(seed)
+            tilemap = BaseTileMap(20, 20, None)
+
+            walls = []
+
+            for _ in range(160):
+
+                walls.append(Wall())
+                tilemap.add(walls[-1], rng.randrange(20), rng.randrange(20))
+
+            index = ComponentIndex(tilemap)
+
+            self.check_labels(tilemap, index)
+
+            for _ in range(60):
+
+                if walls and rng.random() < 0.5:
+
+                    tilemap.remove_obj(walls.pop(rng.randrange(len(walls))))
+
+                else:
+
+                    walls.append(Wall())
+                    tilemap.add(walls[-1], rng.randrange(20), rng.randrange(20))
+
+                self.check_labels(tilemap, index)
+
+            # Reachability agrees with the labels:
+
+            expected = fresh_labels(tilemap)
+
+            for _ in range(50):
+
+                start = (rng.randrange(20), rng.randrange(20))
+                goal = (rng.randrange(20), rng.randrange(20))
+
+                if start in expected and goal in expected and max(abs(start[0] - goal[0]), abs(start[1] - goal[1])) > 1:
+
+                    self.assertEqual(index.connected(start, goal), expected[start] == expected[goal])
+
+            index.close()
+
+    def test_wall_splits_and_merges(self):
+
+        tilemap = BaseTileMap(5, 9, None)
+        index = ComponentIndex(tilemap)
+
+        # A full column of walls splits the tilemap in two:
+
+        column = [Wall() for _ in range(5)]
+
+        for y, wall in enumerate(column):
+
+            tilemap.add(wall, 4, y)
+
+        self.assertFalse(index.connected((0, 2), (8, 2)))
+
+        # Opening one position joins them back up:
+
+        tilemap.remove_obj(column[2])
+
+        self.assertTrue(index.connected((0, 2), (8, 2)))
+
+        index.close()
+
+
+if __name__ == '__main__':
+
+    unittest.main()
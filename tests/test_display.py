@@ -0,0 +1,143 @@
+"""
+Tests for drawing tilemaps with the DisplayWindow.
+
+We don't have a terminal to draw to,
+so the DisplayWindow is given a fake curses window that keeps what is drawn on a fake screen,
+and complains like curses does when given more than one attribute.
+"""
+
+import curses
+import unittest
+
+from unittest import mock
+
+from engine.characters.tiles import Floor, Wall
+from engine.curses.display import DisplayWindow
+from engine.vision.fog import FogOfWar
+from engine.vision.lighting import LightMap
+from engine.vision.memory import ExploredMemory
+
+COLORS = {'yellow': 1 << 8, 'gray_blue_one': 2 << 8, 'gray_blue_two': 3 << 8}  # Fake color pair values
+
+
+class FakeWindow(object):
+
+    """
+    Curses window that keeps the char and attribute drawn at each position.
+    """
+
+    def __init__(self, height, width):
+
+        self.height = height
+        self.width = width
+        self.screen = {}  # (char, attrib) drawn at each (x, y)
+
+    def getmaxyx(self):
+
+        return self.height, self.width
+
+    def addstr(self, y, x, content, *attrib):
+
+        if len(attrib) > 1:
+
+            raise TypeError('addstr requires 1 to 4 arguments')
+
+        for num, char in enumerate(content):
+
+            self.screen[(x + num, y)] = (char, attrib[0] if attrib else curses.A_NORMAL)
+
+    insstr = addstr
+
+    def erase(self):
+
+        self.screen = {}
+
+    def refresh(self):
+
+        pass
+
+    def keypad(self, flag):
+
+        pass
+
+    def scrollok(self, flag):
+
+        pass
+
+    def idlok(self, flag):
+
+        pass
+
+
+def make_display(width=8, height=3):
+
+    """
+    Creates a DisplayWindow drawing to a fake window, without starting curses.
+    """
+
+    with mock.patch.multiple(curses, noecho=mock.DEFAULT, cbreak=mock.DEFAULT, start_color=mock.DEFAULT):
+
+        display = DisplayWindow(FakeWindow(height, width))
+
+    display.colorPairs.update(COLORS)
+
+    return display
+
+
+class TestDisplayWindow(unittest.TestCase):
+
+    def test_remembered_cell_dimmed(self):
+
+        display = make_display()
+        tilemap = display.tilemap
+
+        viewer = Floor()
+
+        tilemap.add(viewer, 0, 0)
+        tilemap.add(Wall(), 6, 1)
+
+        tilemap.memory = ExploredMemory(tilemap)
+        tilemap.fog = FogOfWar(tilemap, viewer, radius=1)
+
+        # The wall was seen before, but is out of view now:
+
+        tilemap.memory.remember(6, 1)
+
+        display._render()
+
+        self.assertEqual(display.win.screen[(6, 1)], ('W', COLORS['yellow'] | curses.A_DIM))
+
+    def test_dark_cells_dimmed(self):
+
+        display = make_display()
+        tilemap = display.tilemap
+
+        for x in range(tilemap.width):
+
+            tilemap.add(Wall(), x, 0)
+
+        # No lights and no ambient light, so everything is too dark:
+
+        tilemap.lights = LightMap(tilemap, ambient=0)
+
+        display._render()
+
+        for x in range(tilemap.width):
+
+            self.assertEqual(display.win.screen[(x, 0)], ('W', COLORS['yellow'] | curses.A_DIM))
+
+        # Lighting everything up draws the walls again, without dimming:
+
+        tilemap.lights.close()
+        tilemap.lights = LightMap(tilemap, ambient=255)
+
+        display._render()
+
+        for x in range(tilemap.width):
+
+            self.assertEqual(display.win.screen[(x, 0)], ('W', COLORS['yellow']))
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,236 @@
+"""
+Tests for the incremental D* Lite planner, and the trackers that use it.
+
+Plans are checked against a plain Dijkstra search from scratch,
+while the goal moves, the searcher moves, and walls and mud come and go.
+"""
+
+import heapq
+import random
+import unittest
+
+from engine.characters.auto.move import TrackerMove
+from engine.characters.base import EntityCharacter
+from engine.characters.tiles import Mud, Wall
+from engine.pathfinding.dstar import DStarLite, INF, NEIGHBORS
+from engine.tilemaps import BaseTileMap
+
+
+def dijkstra(tilemap, start, goal):
+
+    """
+    Cost of the cheapest path from the start to the goal, searched from scratch.
+    """
+
+    best = {start: 0}
+    heap = [(0, start)]
+
+    while heap:
+
+        cost, pos = heapq.heappop(heap)
+
+        if pos == goal:
+
+            return cost
+
+        if cost > best[pos]:
+
+            continue
+
+        for dx, dy in NEIGHBORS:
+
+            near = (pos[0] + dx, pos[1] + dy)
+
+            if not tilemap.is_passable(*near):
+
+                continue
+
+            new = cost + tilemap.move_cost(*near)
+
+            if new < best.get(near, INF):
+
+                best[near] = new
+
+                heapq.heappush(heap, (new, near))
+
+    return INF
+
+
+def free_position(tilemap, rng):
+
+    """
+    Picks a random passable position.
+    """
+
+    while True:
+
+        pos = (rng.randrange(tilemap.width), rng.randrange(tilemap.height))
+
+        if tilemap.is_passable(*pos):
+
+            return pos
+
+
+class Target(EntityCharacter):
+
+    pass
+
+
+class Tracker(EntityCharacter):
+
+    def start(self):
+
+        self.auto.add(TrackerMove(Target, incremental=True))
+
+
+class TestDStarLite(unittest.TestCase):
+
+    def check_path(self, tilemap, planner):
+
+        """
+        Checks the plan and path of a planner against a search from scratch.
+        """
+
+        expected = dijkstra(tilemap, planner.start, planner.goal)
+
+        self.assertEqual(planner.plan(), expected)
+
+        path = planner.path()
+
+        if expected == INF:
+
+            self.assertEqual(path, [])
+
+            return
+
+        last = planner.start
+
+        for pos in path:
+
+            self.assertEqual(max(abs(pos[0] - last[0]), abs(pos[1] - last[1])), 1)
+            self.assertTrue(tilemap.is_passable(*pos))
+
+            last = pos
+
+        self.assertEqual(last, planner.goal)
+        self.assertEqual(sum(tilemap.move_cost(*pos) for pos in path), expected)
+
+    def test_matches_dijkstra(self):
+
+        for seed in range(20):
+
+            rng = random.Random(seed)
+            tilemap = BaseTileMap(16, 16, None)
+
+            walls = []
+            mud = []
+
+            for _ in range(50):
+
+                walls.append(Wall())
+                tilemap.add(walls[-1], rng.randrange(16), rng.randrange(16))
+
+            for _ in range(40):
+
+                mud.append(Mud())
+                tilemap.add(mud[-1], rng.randrange(16), rng.randrange(16))
+
+            planner = DStarLite(tilemap, free_position(tilemap, rng), free_position(tilemap, rng))
+
+            self.check_path(tilemap, planner)
+
+            for _ in range(15):
+
+                change = rng.randrange(5)
+
+                if change == 0:
+
+                    walls.append(Wall())
+                    tilemap.add(walls[-1], *free_position(tilemap, rng))
+
+                elif change == 1 and walls:
+
+                    tilemap.remove_obj(walls.pop(rng.randrange(len(walls))))
+
+                elif change == 2:
+
+                    mud.append(Mud())
+                    tilemap.add(mud[-1], rng.randrange(16), rng.randrange(16))
+
+                elif change == 3:
+
+                    planner.move_goal(free_position(tilemap, rng))
+
+                else:
+
+                    step = planner.next_step()
+
+                    if step is not None:
+
+                        planner.move_start(step)
+
+                if not tilemap.is_passable(*planner.start) or not tilemap.is_passable(*planner.goal):
+
+                    # A wall landed on us, start somewhere else:
+
+                    planner.move_start(free_position(tilemap, rng))
+                    planner.move_goal(free_position(tilemap, rng))
+
+                self.check_path(tilemap, planner)
+
+            planner.close()
+
+    def test_tracker_releases_planner(self):
+
+        tilemap = BaseTileMap(10, 10, None)
+
+        # The reachability index watches the tilemap for good, build it before counting:
+
+        tilemap.reachable((0, 0), (9, 9))
+
+        before = (len(tilemap._watchers), len(tilemap._cost_watchers))
+
+        tracker = Tracker()
+        target = Target()
+
+        tilemap.add(tracker, 1, 1)
+        tilemap.add(target, 8, 8)
+
+        tilemap.update()
+
+        self.assertEqual((len(tilemap._watchers), len(tilemap._cost_watchers)), (before[0] + 1, before[1] + 1))
+
+        # Dead trackers are removed, and let go of their planner:
+
+        tracker.is_alive = False
+
+        tilemap.update()
+
+        self.assertEqual((len(tilemap._watchers), len(tilemap._cost_watchers)), before)
+
+    def test_tracker_releases_planner_without_target(self):
+
+        tilemap = BaseTileMap(10, 10, None)
+
+        # The reachability index watches the tilemap for good, build it before counting:
+
+        tilemap.reachable((0, 0), (9, 9))
+
+        before = (len(tilemap._watchers), len(tilemap._cost_watchers))
+
+        tracker = Tracker()
+        target = Target()
+
+        tilemap.add(tracker, 1, 1)
+        tilemap.add(target, 8, 8)
+
+        tilemap.update()
+        tilemap.remove_obj(target)
+        tilemap.update()
+
+        self.assertEqual((len(tilemap._watchers), len(tilemap._cost_watchers)), before)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Tests for the field of view cache.
+
+Cached results are only dropped where opacity changed,
+so we check every answer against computing the field of view from scratch.
+"""
+
+import random
+import unittest
+
+import numpy as np
+
+from engine.characters.tiles import Wall
+from engine.tilemaps import BaseTileMap
+from engine.vision.fov import FieldOfViewCache, field_of_view
+
+
+class TestFieldOfViewCache(unittest.TestCase):
+
+    def test_matches_fresh_results(self):
+
+        for seed in range(5):
+
+            rng = random.Random(seed)
+            tilemap = BaseTileMap(24, 24, None)
+            cache = FieldOfViewCache(tilemap)
+
+            walls = []
+
+            for _ in range(60):
+
+                walls.append(Wall())
+                tilemap.add(walls[-1], rng.randrange(24), rng.randrange(24))
+
+            # A handful of origins, asked about over and over like NPCs standing around:
+
+            origins = [(rng.randrange(24), rng.randrange(24), rng.choice([3, 6, 10, None])) for _ in range(6)]
+
+            for _ in range(100):
+
+                if rng.random() < 0.3:
+
+                    if walls and rng.random() < 0.5:
+
+                        tilemap.remove_obj(walls.pop(rng.randrange(len(walls))))
+
+                    else:
+
+                        walls.append(Wall())
+                        tilemap.add(walls[-1], rng.randrange(24), rng.randrange(24))
+
+                x, y, radius = rng.choice(origins)
+
+                self.assertTrue(np.array_equal(cache.get(x, y, radius), field_of_view(tilemap, x, y, radius)))
+
+            self.assertGreater(cache.hits, 0)
+
+            cache.close()
+
+    def test_far_changes_keep_results(self):
+
+        tilemap = BaseTileMap(30, 30, None)
+        cache = FieldOfViewCache(tilemap)
+
+        cache.get(5, 5, 4)
+
+        # Outside the radius, the result is kept:
+
+        tilemap.add(Wall(), 25, 25)
+        cache.get(5, 5, 4)
+
+        self.assertEqual((cache.hits, cache.misses, cache.dropped), (1, 1, 0))
+
+        # Inside view, it is dropped:
+
+        tilemap.add(Wall(), 6, 5)
+        cache.get(5, 5, 4)
+
+        self.assertEqual((cache.hits, cache.misses, cache.dropped), (1, 2, 1))
+
+        cache.close()
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Tests for batched perception.
+
+The tilemap hands the perception service the entities it found at the start of the round,
+after random walkers have moved some of them,
+so we check what observers see against a service that searches the tilemap itself.
+"""
+
+import random
+import unittest
+
+from unittest import mock
+
+from engine.characters.auto.walkers import RandomWalkers
+from engine.characters.base import EntityCharacter
+from engine.characters.npcs import NPC
+from engine.characters.tiles import Wall
+from engine.tilemaps import BaseTileMap
+from engine.vision.perception import PerceptionService
+
+
+class Target(EntityCharacter):
+
+    pass
+
+
+class TestPerceptionService(unittest.TestCase):
+
+    def test_matches_search(self):
+
+        rng = random.Random(0)
+        tilemap = BaseTileMap(30, 30, None)
+
+        for _ in range(120):
+
+            tilemap.add(Wall(), rng.randrange(30), rng.randrange(30))
+
+        tilemap.walkers = RandomWalkers(tilemap, seed=0)
+        tilemap.perception = PerceptionService(tilemap, target=Target, radius=8, size=8)
+
+        # The searching service answers for the same observers:
+
+        searching = PerceptionService(tilemap, target=Target, radius=8, size=8)
+        observers = []
+
+        for num in range(40):
+
+            entity = NPC() if num % 4 else Target()
+
+            tilemap.add(entity, rng.randrange(30), rng.randrange(30))
+
+            if isinstance(entity, NPC):
+
+                observers.append(entity)
+
+                tilemap.perception.add(entity)
+                searching.add(entity)
+
+        moved = 0
+
+        for _ in range(10):
+
+            with mock.patch.object(tilemap, 'find_object_type', wraps=tilemap.find_object_type) as find:
+
+                tilemap.update()
+
+            # We only search for entities once a round:
+
+            self.assertEqual(find.call_count, 1)
+
+            searching.update()
+
+            moved += tilemap.walkers.moved
+
+            for observer in observers:
+
+                self.assertEqual([id(obj) for obj in tilemap.perception.sees(observer)],
+                                 [id(obj) for obj in searching.sees(observer)])
+
+        self.assertGreater(moved, 0)
+        self.assertGreater(searching.rays, 0)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
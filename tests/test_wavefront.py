@@ -0,0 +1,103 @@
+"""
+Tests for distance maps built with whole array wavefront expansion.
+
+Every metric is checked against building the same map position by position in plain python,
+with and without move costs.
+"""
+
+import heapq
+import random
+import unittest
+
+import numpy as np
+
+from engine.pathfinding.benchmark import MAPS, python_distances
+from engine.pathfinding.wavefront import UNREACHABLE, distance_map, relax
+
+
+def python_relax(passable, values, costs, scale):
+
+    """
+    Relaxes the values with a plain python Dijkstra, started from every passable position at once.
+    """
+
+    height, width = passable.shape
+
+    final = np.array(values, dtype=np.int64)
+    heap = [(int(final[y, x]), (x, y)) for y in range(height) for x in range(width) if passable[y, x]]
+
+    heapq.heapify(heap)
+
+    while heap:
+
+        current, (x, y) = heapq.heappop(heap)
+
+        if current > final[y, x]:
+
+            continue
+
+        new = current + scale * (1 if costs is None else int(costs[y, x]))
+
+        for near_y in range(max(y - 1, 0), min(y + 2, height)):
+
+            for near_x in range(max(x - 1, 0), min(x + 2, width)):
+
+                if passable[near_y, near_x] and new < final[near_y, near_x]:
+
+                    final[near_y, near_x] = new
+
+                    heapq.heappush(heap, (new, (near_x, near_y)))
+
+    return final
+
+
+class TestDistanceMap(unittest.TestCase):
+
+    def test_matches_python(self):
+
+        for name in ('walls', 'rooms', 'maze', 'swamp'):
+
+            for seed in range(3):
+
+                rng = random.Random(seed)
+                tilemap = MAPS[name](24, rng)
+
+                passable = tilemap.passability()
+                goal = (rng.randrange(24), rng.randrange(24))
+
+                for costs in (None, tilemap.cost_grid()):
+
+                    for metric in ('manhattan', 'chebyshev', 'octile'):
+
+                        expected = np.array(python_distances(passable.tolist(), goal, metric,
+                                                             None if costs is None else costs.tolist()))
+
+                        self.assertTrue(np.array_equal(distance_map(passable, [goal], metric, costs=costs), expected))
+
+                        # Everything past the limit is unreachable:
+
+                        limit = int(expected.max()) // 2
+
+                        expected[expected > limit] = UNREACHABLE
+
+                        self.assertTrue(np.array_equal(distance_map(passable, [goal], metric, limit, costs), expected))
+
+    def test_relax_matches_python(self):
+
+        for seed in range(5):
+
+            rng = random.Random(seed)
+            tilemap = MAPS['swamp'](20, rng)
+
+            passable = tilemap.passability()
+            values = np.array([[rng.randrange(-200, 200) for _ in range(20)] for _ in range(20)])
+
+            for costs in (None, tilemap.cost_grid()):
+
+                self.assertTrue(np.array_equal(relax(passable, values, costs, 10),
+                                               python_relax(passable, values, costs, 10)))
+
+
+if __name__ == '__main__':
+
+    unittest.main()